@@ -6,9 +6,10 @@ import subprocess
 class AssistantCmdHandlerAction(InteractionAction):
     """Handles execution of commands using temporary files with timeout support."""
 
+    REUSABLE = True
+
     def __init__(self, session):
         self.session = session
-        self._default_timeout = self._get_default_timeout()
 
     def _get_default_timeout(self):
         """Get default timeout from config"""
@@ -33,7 +34,7 @@ class AssistantCmdHandlerAction(InteractionAction):
             kwargs['encoding'] = encoding
 
         # Use provided timeout or fall back to default
-        effective_timeout = timeout if timeout is not None else self._default_timeout
+        effective_timeout = timeout if timeout is not None else self._get_default_timeout()
 
         try:
             with tempfile.NamedTemporaryFile(**kwargs) as temp_file:
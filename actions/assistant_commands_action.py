@@ -1,5 +1,6 @@
 import re
 from base_classes import InteractionAction
+from core.tool_registry import get_tool_registry
 
 
 class AssistantCommandsAction(InteractionAction):
@@ -31,8 +32,9 @@ class AssistantCommandsAction(InteractionAction):
     """
     def __init__(self, session):
         self.session = session
-        # Build dynamic registry from tool action classes
-        self.commands = self._build_commands_dynamic()
+        # Dynamic registry from tool action classes, cached on the session
+        # until config overrides, agent mode, MCP tools or user actions change
+        self.commands = get_tool_registry(session).commands(session, self._build_commands_dynamic)
 
     # ---- Dynamic registry construction ------------------------------------
     def _build_commands_dynamic(self) -> dict:
@@ -214,6 +216,22 @@ class AssistantCommandsAction(InteractionAction):
         Shape per spec:
           { name, description, parameters: {type:'object', properties:{...}, required:[...]} }
         """
+        registry = get_tool_registry(self.session)
+        if registry.commands(self.session, self._build_commands_dynamic) == self.commands:
+            out_specs, name_map = registry.specs(self.session, self._build_tool_specs)
+        else:
+            # Registry edited on this instance: build from it directly
+            out_specs, name_map = self._build_tool_specs()
+
+        # Store mapping for providers to translate tool_call names back
+        try:
+            self.session.set_user_data('__tool_api_to_cmd__', name_map)
+        except Exception:
+            pass
+        return out_specs
+
+    def _build_tool_specs(self) -> tuple:
+        """Canonical specs and the API name → canonical command map for self.commands."""
         import re, json as _json
 
         # 1) Build raw entries with canonical names and function identity
@@ -285,13 +303,7 @@ class AssistantCommandsAction(InteractionAction):
                 'function': fn_key,  # keep for provider-side optional dedup/debug
                 'canonical_name': chosen['canonical_name'],
             })
-
-        # Store mapping for providers to translate tool_call names back
-        try:
-            self.session.set_user_data('__tool_api_to_cmd__', name_map)
-        except Exception:
-            pass
-        return out_specs
+        return out_specs, name_map
 
     def run(self, response: str = None):
         # Backstop: sanitize out <think> ... </think> segments so parser
@@ -5,6 +5,7 @@ import os
 from typing import Any, Dict, Optional
 from utils.tool_args import get_str, get_bool
 from core.mode_runner import run_completion
+from core.token_counter import context_token_counts
 
 
 class AssistantFileToolAction(StepwiseAction):
@@ -257,9 +258,7 @@ class AssistantFileToolAction(StepwiseAction):
                                     meta = d.get('metadata') if isinstance(d, dict) and isinstance(d.get('metadata'), dict) else {}
                                     tokens = int(meta.get('token_count') or 0)
                                     if not tokens:
-                                        content = d.get('content') if isinstance(d, dict) else None
-                                        if isinstance(content, str) and content:
-                                            tokens = int(self.token_counter.count_tiktoken(content))
+                                        tokens = context_token_counts(self.token_counter, [files[-1].get('context')])[0]
                             except Exception:
                                 pass
                         try:
@@ -367,9 +366,7 @@ class AssistantFileToolAction(StepwiseAction):
                 ctx = item.get('context') if isinstance(item, dict) else None
                 data = ctx.get() if hasattr(ctx, 'get') else None
                 if isinstance(data, dict) and data.get('name') == name:
-                    content = data.get('content') or ''
-                    if content:
-                        return int(self.token_counter.count_tiktoken(str(content)))
+                    return context_token_counts(self.token_counter, [ctx])[0]
             return 0
         except Exception:
             return 0
@@ -385,10 +382,8 @@ class AssistantFileToolAction(StepwiseAction):
                 if not isinstance(data, dict):
                     continue
                 meta = data.get('metadata') if isinstance(data.get('metadata'), dict) else {}
-                if meta.get('original_file') == abs_path:
-                    content = data.get('content') or ''
-                    if content:
-                        return int(self.token_counter.count_tiktoken(str(content)))
+                if meta.get('original_file') == abs_path and data.get('content'):
+                    return context_token_counts(self.token_counter, [ctx])[0]
             # Fallback: basename match for markitdown entries
             base = os.path.basename(abs_path)
             for item in reversed(files):
@@ -399,10 +394,8 @@ class AssistantFileToolAction(StepwiseAction):
                 meta = data.get('metadata') if isinstance(data.get('metadata'), dict) else {}
                 if meta.get('converter') == 'markitdown':
                     orig = str(meta.get('original_file') or '')
-                    if orig.endswith(base):
-                        content = data.get('content') or ''
-                        if content:
-                            return int(self.token_counter.count_tiktoken(str(content)))
+                    if orig.endswith(base) and data.get('content'):
+                        return context_token_counts(self.token_counter, [ctx])[0]
             return 0
         except Exception:
             return 0
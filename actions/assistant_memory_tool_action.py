@@ -21,6 +21,8 @@ class AssistantMemoryToolAction(InteractionAction):
                   * "all" clears every memory.
                   * Otherwise, clears all memories for that project.
     """
+    REUSABLE = True
+
     def __init__(self, session):
         self.session = session
         # Register the schema for the memories table.
@@ -3,9 +3,12 @@ from __future__ import annotations
 from typing import Any, Dict, List, Optional
 
 from base_classes import InteractionAction
-from rag.fs_utils import load_rag_config, read_text
+from rag.fs_utils import load_rag_config, load_rag_cache_bytes, load_rag_backends, load_rag_query_cache_settings, read_text
 from core.provider_factory import ProviderFactory
-from rag.search import search
+from rag.cache import get_index_cache
+from rag.filters import build_filters
+from rag.query_cache import get_query_cache
+from rag.search import search, search_many, SEARCH_MODES
 
 
 class AssistantRagsearchToolAction(InteractionAction):
@@ -15,15 +18,24 @@ class AssistantRagsearchToolAction(InteractionAction):
 
     Inputs (args):
       - query (str, required): search query text (falls back to content)
+      - queries (str|list, optional): more related queries (one per line, or a list),
+        searched in the same batch as `query`; one embedding call and one scan per index
       - index (str, optional): single index name
       - indexes (str|list, optional): comma-separated or list of index names
       - k (int, optional): top-K results (default from [RAG].top_k)
       - preview_lines (int, optional): lines per hit (default from [RAG].preview_lines)
       - per_index_cap (int, optional): cap per index
       - threshold (float, optional): similarity threshold to filter results
+      - mode (str, optional): 'vector' (default from [RAG].search_mode), 'lexical' (BM25,
+        no embedding call) or 'hybrid' (reciprocal rank fusion of both)
+      - include / exclude (str|list, optional): path globs relative to the index root
+        (comma-separated), e.g. 'docs/api/**'
+      - exts (str|list, optional): file extensions to keep, e.g. 'md,py'
+      - modified_after (str, optional): YYYY-MM-DD, ISO datetime, or an age like '7d'
+      Filters are applied to chunk metadata before scoring, so only matching rows are scanned.
 
     Notes:
-      - Requires [TOOLS].embedding_provider and [TOOLS].embedding_model.
+      - Requires [TOOLS].embedding_provider and [TOOLS].embedding_model (except in lexical mode).
       - Attaches a single consolidated summary under the 'rag' context.
     """
 
@@ -40,7 +52,8 @@ class AssistantRagsearchToolAction(InteractionAction):
     def tool_spec(cls, session) -> dict:
         return {
             'args': [
-                'query', 'index', 'indexes', 'k', 'preview_lines', 'per_index_cap', 'threshold', 'desc'
+                'query', 'queries', 'index', 'indexes', 'k', 'preview_lines', 'per_index_cap', 'threshold', 'mode',
+                'include', 'exclude', 'exts', 'modified_after', 'desc'
             ],
             'description': (
                 "Search local RAG indexes and attach a consolidated results block to context. "
@@ -50,12 +63,25 @@ class AssistantRagsearchToolAction(InteractionAction):
             'schema': {
                 'properties': {
                     'query': {"type": "string", "description": "Semantic search query."},
+                    'queries': {
+                        "type": "string",
+                        "description": "Optional extra related queries, one per line; all are searched in one batch with 'query'.",
+                    },
                     'index': {"type": "string", "description": "Single index name to search."},
                     'indexes': {"type": "string", "description": "Comma-separated list of index names."},
                     'k': {"type": "integer", "description": "Top-K results to return."},
                     'preview_lines': {"type": "integer", "description": "Preview lines per hit in the summary."},
                     'per_index_cap': {"type": "integer", "description": "Cap results per index."},
                     'threshold': {"type": "number", "description": "Minimum cosine similarity threshold (0.0–1.0)."},
+                    'mode': {
+                        "type": "string",
+                        "enum": ["vector", "lexical", "hybrid"],
+                        "description": "vector = semantic; lexical = exact terms/identifiers (BM25, fastest); hybrid = both fused.",
+                    },
+                    'include': {"type": "string", "description": "Only files matching these globs (comma-separated, relative to the index root), e.g. 'docs/api/**'."},
+                    'exclude': {"type": "string", "description": "Skip files matching these globs (comma-separated)."},
+                    'exts': {"type": "string", "description": "Only these file extensions (comma-separated), e.g. 'md,py'."},
+                    'modified_after': {"type": "string", "description": "Only files modified after this date (YYYY-MM-DD) or within an age like '7d'."},
                     'content': {"type": "string", "description": "Fallback for 'query' when omitted."},
                     'desc': {"type": "string", "description": "Optional short description for UI/status; ignored by execution.", "default": ""}
                 }
@@ -76,9 +102,15 @@ class AssistantRagsearchToolAction(InteractionAction):
     def run(self, args: Dict[str, Any], content: str = ""):
         args = args or {}
 
-        # Resolve query
+        # Resolve queries: 'query' first, then any extra 'queries' (deduplicated, order kept)
         query = (args.get('query') or content or '').strip()
-        if not query:
+        raw_queries = args.get('queries')
+        if isinstance(raw_queries, (list, tuple)):
+            extra = [str(q).strip() for q in raw_queries]
+        else:
+            extra = [q.strip() for q in str(raw_queries or '').splitlines()]
+        query_list = list(dict.fromkeys(q for q in [query, *extra] if q))
+        if not query_list:
             self.session.add_context('assistant', {
                 'name': 'rag_error',
                 'content': 'RAGSEARCH: missing query.'
@@ -140,33 +172,6 @@ class AssistantRagsearchToolAction(InteractionAction):
             })
             return
 
-        # Embedding provider + model (explicit only; no fallback)
-        tools = self.session.get_tools()
-        embedding_model = (tools.get('embedding_model') or '').strip()
-        embedding_provider = (tools.get('embedding_provider') or '').strip()
-        if not embedding_model or not embedding_provider:
-            self.session.add_context('assistant', {
-                'name': 'rag_error',
-                'content': 'RAGSEARCH: set [TOOLS].embedding_provider and [TOOLS].embedding_model first.'
-            })
-            return
-
-        try:
-            provider = ProviderFactory.instantiate_by_name(
-                embedding_provider,
-                registry=self.session._registry,
-                session=self.session,
-                isolated=True,
-            )
-        except Exception:
-            provider = None
-        if not provider or not hasattr(provider, 'embed'):
-            self.session.add_context('assistant', {
-                'name': 'rag_error',
-                'content': f"RAGSEARCH: embedding provider '{embedding_provider}' unavailable or lacks embed()."
-            })
-            return
-
         # Tuning knobs (defaults from [RAG], allow overrides via args)
         try:
             rag_opts = self.session.get_all_options_from_section('RAG') or {}
@@ -198,123 +203,229 @@ class AssistantRagsearchToolAction(InteractionAction):
             pic_raw = _rag_opt('per_index_cap', None)
         per_index_cap = None if pic_raw is None else _int(pic_raw, None)
         threshold = _float(args.get('threshold', None), _float(_rag_opt('similarity_threshold', 0.0) or 0.0, 0.0))
+        mode = str(args.get('mode') or _rag_opt('search_mode', 'vector') or 'vector').strip().lower()
+        if mode not in SEARCH_MODES:
+            self.session.add_context('assistant', {
+                'name': 'rag_error',
+                'content': f"RAGSEARCH: unknown mode '{mode}' (use {', '.join(SEARCH_MODES)})."
+            })
+            return
+        try:
+            filters = build_filters(
+                include=args.get('include'),
+                exclude=args.get('exclude'),
+                exts=args.get('exts'),
+                modified_after=args.get('modified_after'),
+            )
+        except ValueError as e:
+            self.session.add_context('assistant', {
+                'name': 'rag_error',
+                'content': f"RAGSEARCH: {e}."
+            })
+            return
+
+        # Embedding provider + model (explicit only; no fallback); lexical search needs neither
+        provider = None
+        tools = self.session.get_tools()
+        embedding_model = (tools.get('embedding_model') or '').strip()
+        embedding_provider = (tools.get('embedding_provider') or '').strip()
+        if mode != 'lexical' and (not embedding_model or not embedding_provider):
+            self.session.add_context('assistant', {
+                'name': 'rag_error',
+                'content': 'RAGSEARCH: set [TOOLS].embedding_provider and [TOOLS].embedding_model first.'
+            })
+            return
+
+        if mode != 'lexical':
+            try:
+                provider = ProviderFactory.instantiate_by_name(
+                    embedding_provider,
+                    registry=self.session._registry,
+                    session=self.session,
+                    isolated=True,
+                )
+            except Exception:
+                provider = None
+        if mode != 'lexical' and (not provider or not hasattr(provider, 'embed')):
+            self.session.add_context('assistant', {
+                'name': 'rag_error',
+                'content': f"RAGSEARCH: embedding provider '{embedding_provider}' unavailable or lacks embed()."
+            })
+            return
+
+        # Repeated queries (auto-submit loops, hooks) skip the embedding round trip
+        embed_query_fn = None
+        if provider:
+            embed_query_fn = lambda batch: provider.embed(batch, model=embedding_model)
+            try:
+                qs = load_rag_query_cache_settings(self.session)
+                query_cache = get_query_cache(vector_db, qs['entries'], qs['ttl'])
+            except Exception:
+                query_cache = None
+            if query_cache is not None:
+                embed_query_fn = query_cache.wrap(embed_query_fn, embedding_provider, embedding_model)
+
+        # Per-index ANN tuning (IVF nprobe, quantized rescore depth) from [RAG.<name>]
+        try:
+            ann_options = {
+                n: {'nprobe': c.get('nprobe'), 'rescore': c.get('rescore')}
+                for n, c in load_rag_backends(self.session).items()
+            }
+        except Exception:
+            ann_options = None
 
         # Log search begin (summary only)
         try:
             self.session.utils.logger.rag_event('search_begin', {
-                'query_len': len(query),
+                'query_len': len(query_list[0]),
+                'queries': len(query_list),
                 'indexes': index_names,
+                'mode': mode,
+                'filters': sorted(filters) if filters else [],
             }, component='rag.search')
         except Exception:
             pass
 
-        # Execute search
+        # Execute search (indexes are served from the process-wide cache when unchanged)
         try:
-            res = search(
+            get_index_cache().set_max_bytes(load_rag_cache_bytes(self.session))
+        except Exception:
+            pass
+        try:
+            opts = dict(
                 indexes=indexes,
                 names=index_names,
                 vector_db=vector_db,
-                embed_query_fn=lambda batch: provider.embed(batch, model=embedding_model),
-                query=query,
+                embed_query_fn=embed_query_fn,
                 k=max(1, top_k),
                 preview_lines=max(0, preview_lines),
                 per_index_cap=per_index_cap,
+                threshold=(threshold if threshold and threshold > 0.0 else None),
+                ann_options=ann_options,
+                mode=mode,
+                filters=filters,
             )
+            if len(query_list) == 1:
+                one = search(query=query_list[0], **opts)
+                res = {'results': [one.get('results', []) or []], 'stats': one.get('stats')}
+            else:
+                # Related queries share one embedding call and one scan per index
+                res = search_many(queries=query_list, **opts)
         except Exception as e:
             self.session.add_context('assistant', {
                 'name': 'rag_error',
                 'content': f'RAGSEARCH failed: {e}'
             })
             return
-
-        results = list(res.get('results', []) or [])
-        # Apply threshold if set
-        try:
-            if threshold and threshold > 0.0:
-                results = [r for r in results if float(r.get('score') or 0.0) >= threshold]
-        except Exception:
-            pass
+        finally:
+            if hasattr(embed_query_fn, 'event') and (embed_query_fn.hits or embed_query_fn.misses):
+                try:
+                    self.session.utils.logger.rag_event('query_cache', embed_query_fn.event(), component='rag.search')
+                except Exception:
+                    pass
 
         # Group by file and merge adjacent line ranges (mirror LoadRagAction defaults)
         group_by_file = bool(_rag_opt('group_by_file', True))
         merge_adjacent = bool(_rag_opt('merge_adjacent', True))
         merge_gap = _int(_rag_opt('merge_gap', 5) or 5, 5)
 
-        grouped: List[Dict[str, Any]] = []
-        if group_by_file:
+        per_query: List[List[Dict[str, Any]]] = []
+        for results in (res.get('results') or [])[:len(query_list)]:
+            results = list(results or [])
+            # Apply threshold if set (cosine scores only; BM25/RRF scores are on other scales)
             try:
-                from collections import defaultdict
-                by_path: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
-                for r in results:
-                    by_path[r['path']].append(r)
-                for path, items in by_path.items():
-                    items.sort(key=lambda r: (int(r.get('line_start') or 0), -float(r.get('score') or 0.0)))
-                    acc: List[Dict[str, Any]] = []
-                    for r in items:
-                        if not acc:
-                            acc.append(dict(r))
-                            continue
-                        prev = acc[-1]
-                        gap = int(r.get('line_start') or 0) - int(prev.get('line_end') or 0)
-                        if merge_adjacent and r['path'] == prev['path'] and gap >= 0 and gap <= merge_gap:
-                            prev['line_end'] = max(int(prev['line_end']), int(r['line_end']))
-                            prev['score'] = max(float(prev['score']), float(r['score']))
-                            prev_prev = prev.get('preview') or []
-                            now_prev = r.get('preview') or []
-                            prev['preview'] = list(dict.fromkeys(prev_prev + now_prev))
-                        else:
-                            acc.append(dict(r))
-                    grouped.extend(acc)
+                if mode == 'vector' and threshold and threshold > 0.0:
+                    results = [r for r in results if float(r.get('score') or 0.0) >= threshold]
             except Exception:
-                grouped = list(results)
-        else:
-            grouped = list(results)
-
-        # Re-apply top_k after grouping
-        grouped.sort(key=lambda r: float(r.get('score') or 0.0), reverse=True)
-        grouped = grouped[: max(1, top_k)]
+                pass
+            grouped = self._group_results(results, group_by_file, merge_adjacent, merge_gap)
+            # Re-apply top_k after grouping
+            grouped.sort(key=lambda r: float(r.get('score') or 0.0), reverse=True)
+            per_query.append(grouped[: max(1, top_k)])
+        total = sum(len(g) for g in per_query)
 
         # Log search done summary
         try:
             self.session.utils.logger.rag_event('search_done', {
-                'results': len(grouped),
+                'results': total,
+                'queries': len(query_list),
                 'top_k': max(1, top_k),
                 'threshold': threshold,
             }, component='rag.search')
         except Exception:
             pass
 
-        # Build readable summary block
+        # Build readable summary block (one section per query)
         lines: List[str] = []
-        header = f"RAG results (query: {query})"
-        lines.append(header)
-        for i, item in enumerate(grouped, start=1):
-            try:
-                score = float(item.get('score') or 0.0)
-            except Exception:
-                score = 0.0
-            path = item.get('path')
-            ls = int(item.get('line_start') or 0)
-            le = int(item.get('line_end') or 0)
-            idx = item.get('index')
-            lines.append(f"{i:>2}. [{score:.3f}] ({idx}) {path}#L{ls}-L{le}")
-            prev_lines = item.get('preview') or []
-            for pl in prev_lines:
+        for q, grouped in zip(query_list, per_query):
+            lines.append(f"RAG results (query: {q})")
+            for i, item in enumerate(grouped, start=1):
                 try:
-                    lines.append(f"      {pl}")
+                    score = float(item.get('score') or 0.0)
                 except Exception:
-                    continue
-            lines.append("")
+                    score = 0.0
+                path = item.get('path')
+                ls = int(item.get('line_start') or 0)
+                le = int(item.get('line_end') or 0)
+                idx = item.get('index')
+                lines.append(f"{i:>2}. [{score:.3f}] ({idx}) {path}#L{ls}-L{le}")
+                prev_lines = item.get('preview') or []
+                for pl in prev_lines:
+                    try:
+                        lines.append(f"      {pl}")
+                    except Exception:
+                        continue
+                lines.append("")
         content_block = "\n".join(lines)
+        label = query_list[0] if len(query_list) == 1 else " | ".join(query_list)
 
         # Attach to 'rag' context for grounding
-        self.session.add_context('rag', {'name': f"RAG: {query}", 'content': content_block})
+        self.session.add_context('rag', {'name': f"RAG: {label}", 'content': content_block})
 
         # Optional: brief assistant feedback for visibility
         try:
+            if len(query_list) == 1:
+                feedback = f"Attached RAG results for '{label}' ({total} items)."
+            else:
+                feedback = f"Attached RAG results for {len(query_list)} queries ({total} items)."
             self.session.add_context('assistant', {
                 'name': 'assistant_feedback',
-                'content': f"Attached RAG results for '{query}' ({len(grouped)} items)."
+                'content': feedback,
             })
         except Exception:
             pass
+
+    @staticmethod
+    def _group_results(
+        results: List[Dict[str, Any]], group_by_file: bool, merge_adjacent: bool, merge_gap: int,
+    ) -> List[Dict[str, Any]]:
+        """Group hits by file and merge near-contiguous line ranges."""
+        if not group_by_file:
+            return list(results)
+        grouped: List[Dict[str, Any]] = []
+        try:
+            from collections import defaultdict
+            by_path: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+            for r in results:
+                by_path[r['path']].append(r)
+            for path, items in by_path.items():
+                items.sort(key=lambda r: (int(r.get('line_start') or 0), -float(r.get('score') or 0.0)))
+                acc: List[Dict[str, Any]] = []
+                for r in items:
+                    if not acc:
+                        acc.append(dict(r))
+                        continue
+                    prev = acc[-1]
+                    gap = int(r.get('line_start') or 0) - int(prev.get('line_end') or 0)
+                    if merge_adjacent and r['path'] == prev['path'] and gap >= 0 and gap <= merge_gap:
+                        prev['line_end'] = max(int(prev['line_end']), int(r['line_end']))
+                        prev['score'] = max(float(prev['score']), float(r['score']))
+                        prev_prev = prev.get('preview') or []
+                        now_prev = r.get('preview') or []
+                        prev['preview'] = list(dict.fromkeys(prev_prev + now_prev))
+                    else:
+                        acc.append(dict(r))
+                grouped.extend(acc)
+        except Exception:
+            grouped = list(results)
+        return grouped
@@ -23,10 +23,10 @@ class BuildTurnPromptAction(InteractionAction):
     `{{message_id}}` or `{{turn:id}}` can be filled from session/turn metadata.
     """
 
+    REUSABLE = True
+
     def __init__(self, session):
         self.session = session
-        # Build a resolver using the session config (merged base + user)
-        self._resolver = PromptResolver(self.session.config)
 
     # ---- helpers ---------------------------------------------------------
     def _normalize_source(self, value: Any) -> Optional[str] | object:
@@ -147,7 +147,8 @@ class BuildTurnPromptAction(InteractionAction):
             return ""
 
         try:
-            resolved = self._resolver.resolve(source)
+            # Fresh resolver (it memoizes) so edited prompt files apply next turn
+            resolved = PromptResolver(self.session.config).resolve(source)
         except Exception:
             resolved = source
         if not isinstance(resolved, str) or not resolved:
@@ -1,4 +1,5 @@
 from base_classes import StepwiseAction, Completed, InteractionNeeded
+from core.token_counter import context_token_counts
 
 
 class ClearContextAction(StepwiseAction):
@@ -42,8 +43,7 @@ class ClearContextAction(StepwiseAction):
             for i, c in enumerate(contexts):
                 name = (c['context'].get().get('name') if hasattr(c['context'], 'get') else str(c['context']))
                 try:
-                    content_text = c['context'].get().get('content', '') if hasattr(c['context'], 'get') else ''
-                    tokens = self.token_counter.count_tiktoken(content_text) if content_text else 0
+                    tokens = context_token_counts(self.token_counter, [c['context']])[0] if hasattr(c['context'], 'get') else 0
                 except Exception:
                     tokens = 0
                 options.append(f"{i}: {name} ({tokens} tokens)")
@@ -1,5 +1,5 @@
-import tiktoken
 from base_classes import InteractionAction
+from core.token_counter import get_token_counter
 import json
 
 
@@ -8,6 +8,8 @@ class CountTokensAction(InteractionAction):
     Class for counting tokens in a message
     """
 
+    REUSABLE = True
+
     def __init__(self, session):
         self.session = session
 
@@ -33,53 +35,57 @@ class CountTokensAction(InteractionAction):
     @staticmethod
     def count_tiktoken(messages, model="gpt-4"):
         """Returns the number of tokens used"""
-        if messages is not None:
-            try:
-                encoding = tiktoken.encoding_for_model(model)
-            except KeyError:
-                try:
-                    self.session.ui.emit('warning', {'message': 'Warning: model not found. Using cl100k_base encoding.'})
-                except Exception:
-                    pass
-                encoding = tiktoken.get_encoding("cl100k_base")
+        if messages is None:
+            return 0
+        counter = get_token_counter()
 
-            tokens_per_message = 3
-            tokens_per_name = 1
+        tokens_per_message = 3
+        tokens_per_name = 1
 
+        if isinstance(messages, str):
+            # If messages is a string, simply count it
+            return counter.count(messages, model)
+        if isinstance(messages, dict):
+            try:
+                # If messages is a dictionary, convert it to a string and count
+                return counter.count(json.dumps(messages), model)
+            except TypeError:
+                # If JSON serialization fails, convert to string first
+                return counter.count(str(messages), model)
+        if isinstance(messages, list):
+            # If messages is a list, count every value of every message in one batch
+            values = []
             num_tokens = 0
+            for message in messages:
+                num_tokens += tokens_per_message
+                for key, value in message.items():
+                    if isinstance(value, dict):
+                        try:
+                            # If the value is a dictionary, convert it to a string
+                            value = json.dumps(value)
+                        except TypeError:
+                            # If JSON serialization fails, convert to string first
+                            value = str(value)
+                    values.append(str(value))
+                    if key == "role":
+                        num_tokens += tokens_per_name
+            num_tokens += sum(counter.count_many(values, model))
+            num_tokens += 3  # every reply is primed with <|start|>assistant<|message|>
+            return num_tokens
+        # For any other type, convert to string
+        return counter.count(str(messages), model)
 
-            if isinstance(messages, str):
-                # If messages is a string, simply encode and count
-                num_tokens = len(encoding.encode(messages, disallowed_special=()))
-            elif isinstance(messages, dict):
-                try:
-                    # If messages is a dictionary, convert it to a string and count
-                    messages_str = json.dumps(messages)
-                    num_tokens = len(encoding.encode(messages_str, disallowed_special=()))
-                except TypeError:
-                    # If JSON serialization fails, convert to string first
-                    messages_str = str(messages)
-                    num_tokens = len(encoding.encode(messages_str, disallowed_special=()))
-            elif isinstance(messages, list):
-                # If messages is a list, process each message
-                for message in messages:
-                    num_tokens += tokens_per_message
-                    for key, value in message.items():
-                        if isinstance(value, dict):
-                            try:
-                                # If the value is a dictionary, convert it to a string
-                                value = json.dumps(value)
-                            except TypeError:
-                                # If JSON serialization fails, convert to string first
-                                value = str(value)
-                        num_tokens += len(encoding.encode(str(value), disallowed_special=()))
-                        if key == "role":
-                            num_tokens += tokens_per_name
-                num_tokens += 3  # every reply is primed with <|start|>assistant<|message|>
-            else:
-                # For any other type, convert to string
-                num_tokens = len(encoding.encode(str(messages), disallowed_special=()))
-        else:
-            num_tokens = 0
+    @staticmethod
+    def count_tiktoken_many(texts, model="gpt-4") -> list:
+        """Token counts for many texts in one call (cached by content hash)."""
+        return get_token_counter().count_many(list(texts or []), model)
 
-        return num_tokens
+    @staticmethod
+    def count_context(context, model="gpt-4") -> int:
+        """Tokens in a context object's content; the count is stored on the object."""
+        return get_token_counter().count_context(context, model)
+
+    @staticmethod
+    def count_contexts(contexts, model="gpt-4") -> list:
+        """`count_context` for many context objects in one call."""
+        return get_token_counter().count_contexts(list(contexts or []), model)
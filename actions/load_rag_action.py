@@ -3,8 +3,11 @@ from __future__ import annotations
 from typing import List
 
 from base_classes import InteractionAction
-from rag.fs_utils import load_rag_config
+from rag.fs_utils import load_rag_config, load_rag_cache_bytes, load_rag_backends, load_rag_query_cache_settings
 from core.provider_factory import ProviderFactory
+from rag.cache import get_index_cache
+from rag.filters import build_filters
+from rag.query_cache import get_query_cache
 from rag.search import search
 import os
 from rag.fs_utils import read_text
@@ -16,6 +19,9 @@ class LoadRagAction(InteractionAction):
     Usage:
       - load rag              -> query across active/all indexes
       - load rag <name>       -> query a specific index
+      - load rag [<name>] include=docs/api/** ext=md,py after=7d
+                              -> restrict to matching files before scoring
+                                 (also: exclude=<globs>; after= takes YYYY-MM-DD or an age)
 
     Extras:
       - Preview lines: controlled by optional numeric arg, e.g., "load rag 3".
@@ -35,8 +41,33 @@ class LoadRagAction(InteractionAction):
         except Exception:
             return False
 
+    # key=value filter tokens -> build_filters keyword
+    _FILTER_KEYS = {
+        'include': 'include', 'exclude': 'exclude',
+        'ext': 'exts', 'exts': 'exts',
+        'after': 'modified_after', 'modified_after': 'modified_after',
+    }
+
     def run(self, args: List[str] | None = None):
-        args = args or []
+        args = list(args or [])
+        # Pull out key=value filter tokens; the rest are positional (index, preview lines)
+        filter_args = {}
+        positional: List[str] = []
+        for a in args:
+            key, sep, value = str(a).partition('=')
+            if sep and key.strip().lower() in self._FILTER_KEYS:
+                filter_args[self._FILTER_KEYS[key.strip().lower()]] = value.strip()
+            else:
+                positional.append(a)
+        args = positional
+        try:
+            filters = build_filters(**filter_args)
+        except ValueError as e:
+            try:
+                self.session.ui.emit('error', {'message': str(e)})
+            except Exception:
+                pass
+            return False
         # Parse args: optional index name and/or preview lines number
         index_name = None
         preview_lines = 0
@@ -136,6 +167,14 @@ class LoadRagAction(InteractionAction):
             threshold = float(_get_rag_opt('similarity_threshold', 0.0) or 0.0)
         except Exception:
             threshold = 0.0
+        # Per-index ANN tuning (IVF nprobe, quantized rescore depth) from [RAG.<name>]
+        try:
+            ann_options = {
+                n: {'nprobe': c.get('nprobe'), 'rescore': c.get('rescore')}
+                for n, c in load_rag_backends(self.session).items()
+            }
+        except Exception:
+            ann_options = None
         attach_mode = str(_get_rag_opt('attach_mode', 'summary') or 'summary').strip().lower()
         try:
             budget = int(_get_rag_opt('total_chars_budget', 20000) or 20000)
@@ -148,6 +187,19 @@ class LoadRagAction(InteractionAction):
         except Exception:
             merge_gap = 5
 
+        # Loaded indexes stay resident across queries (and later calls) until they change
+        try:
+            get_index_cache().set_max_bytes(load_rag_cache_bytes(self.session))
+        except Exception:
+            pass
+
+        # Repeated queries are answered from the persistent query embedding cache
+        try:
+            qs = load_rag_query_cache_settings(self.session)
+            query_cache = get_query_cache(vector_db, qs['entries'], qs['ttl'])
+        except Exception:
+            query_cache = None
+
         # Interactive query loop
         while True:
             # Ask for query
@@ -159,19 +211,30 @@ class LoadRagAction(InteractionAction):
                 return True
 
             # Perform search
+            embed_query_fn = lambda batch: provider.embed(batch, model=embedding_model)
+            if query_cache is not None:
+                embed_query_fn = query_cache.wrap(embed_query_fn, embedding_provider, embedding_model)
             try:
                 res = search(
                     indexes=indexes,
                     names=index_names,
                     vector_db=vector_db,
-                    embed_query_fn=lambda batch: provider.embed(batch, model=embedding_model),
+                    embed_query_fn=embed_query_fn,
                     query=query,
                     k=top_k,
                     preview_lines=max(0, int(preview_lines or preview_default)),
                     per_index_cap=per_index_cap,
+                    threshold=(threshold if threshold and threshold > 0.0 else None),
+                    ann_options=ann_options,
+                    filters=filters,
                 )
             except Exception:
                 res = None
+            if query_cache is not None and (embed_query_fn.hits or embed_query_fn.misses):
+                try:
+                    self.session.utils.logger.rag_event('query_cache', embed_query_fn.event(), component='rag.search')
+                except Exception:
+                    pass
             if res is None:
                 try:
                     self.session.ui.emit('error', {'message': 'Embedding error during query. Check [TOOLS].embedding_* settings.'})
@@ -275,6 +338,8 @@ class LoadRagAction(InteractionAction):
                     hint_parts.append(f"per_index_cap={per_index_cap}")
                 if threshold and threshold > 0.0:
                     hint_parts.append(f"threshold={threshold:.2f}")
+                if filters:
+                    hint_parts.append("filters=" + "+".join(sorted(filters)))
                 if hint_parts:
                     out.write("(" + ", ".join(hint_parts) + ")")
                 out.write()
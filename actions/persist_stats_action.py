@@ -6,9 +6,11 @@ class PersistStatsAction(InteractionAction):
     """
     Action for persisting usage statistics to database
     """
+
+    REUSABLE = True
+
     def __init__(self, session):
         self.session = session
-        self.provider = session.get_provider()
 
         # Define stats schema with typing and behavior
         self.stats_schema = {
@@ -54,10 +56,12 @@ class PersistStatsAction(InteractionAction):
         """
         Persist current usage statistics to the database
         """
-        if not self.provider:
+        # Looked up per run: the provider is replaced when the model changes
+        provider = self.session.get_provider()
+        if not provider:
             return
 
-        current_stats = self.provider.get_usage()
+        current_stats = provider.get_usage()
         if not current_stats:
             return
 
@@ -1,5 +1,6 @@
 from base_classes import InteractionAction
 from core.input_limits import enforce_interactive_gate
+from core.token_counter import context_token_counts
 from contextlib import nullcontext
 
 
@@ -7,6 +8,9 @@ class ProcessContextsAction(InteractionAction):
     """
     Class for processing contexts
     """
+
+    REUSABLE = True
+
     def __init__(self, session):
         self.session = session
         self.token_counter = self.session.get_action('count_tokens')
@@ -71,6 +75,13 @@ class ProcessContextsAction(InteractionAction):
                 if (not auto_submit) and (show_context_summary or show_context_details):
                     output.write()
 
+                # One batch for every text context; counts are kept on the context objects
+                text_contexts = [c for c in contexts if c['type'] != 'image']
+                token_counts = dict(zip(
+                    (id(c) for c in text_contexts),
+                    context_token_counts(self.token_counter, [c['context'] for c in text_contexts]),
+                ))
+
                 for idx, context in enumerate(contexts):
                     if context['type'] == 'image':
                         if show_context_summary:
@@ -84,7 +95,7 @@ class ProcessContextsAction(InteractionAction):
 
                     context_data = context['context'].get()
                     content = context_data.get('content', '')
-                    tokens = self.token_counter.count_tiktoken(content) if content else 0
+                    tokens = token_counts.get(id(context), 0) if content else 0
                     total_tokens += tokens
 
                     if show_context_summary:
@@ -4,6 +4,7 @@ import re
 from typing import Any, List, Optional, Tuple
 
 from base_classes import InteractionAction
+from contexts.chat_context import select_window
 
 
 class PromptTemplateChatAction(InteractionAction):
@@ -40,21 +41,10 @@ class PromptTemplateChatAction(InteractionAction):
         except Exception:
             params = {}
         context_sent = params.get("context_sent", "all")
-        if context_sent in ("none", "last_1"):
-            return msgs[-1:] if msgs else []
-        if context_sent == "all":
-            return msgs
         try:
-            parts = str(context_sent).split("_")
-            if len(parts) == 2 and parts[1].isdigit():
-                n = int(parts[1])
-                if parts[0] == "first":
-                    return msgs[:n]
-                if parts[0] == "last":
-                    return msgs[-n:]
+            return select_window(msgs, context_sent)
         except Exception:
-            pass
-        return msgs
+            return msgs
 
     def _parse_spec(self, spec: str) -> Tuple[str, dict]:
         """Split chat spec into base mode and modifiers.
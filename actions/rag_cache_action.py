@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from typing import List
+
+from base_classes import InteractionAction
+from rag.fs_utils import load_rag_config, load_rag_embedding_cache_bytes
+from rag.embedding_cache import EmbeddingCache
+
+
+class RagCacheAction(InteractionAction):
+    """Inspect or shrink the shared embedding cache under [RAG].vector_db.
+
+    Usage:
+      - rag cache stats          -> entries, signatures, payload/file size, cap
+      - rag cache prune          -> evict least recently used vectors down to [RAG].embedding_cache_mb
+      - rag cache prune <mb>     -> evict down to <mb> megabytes (0 empties the cache)
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    @staticmethod
+    def can_run(session) -> bool:
+        try:
+            return bool(session.get_option('RAG', 'active', fallback=False))
+        except Exception:
+            return False
+
+    def _emit(self, kind: str, message: str) -> None:
+        try:
+            self.session.ui.emit(kind, {'message': message})
+        except Exception:
+            pass
+
+    def run(self, args: List[str] | None = None):
+        args = args or []
+        sub = (args[0] if args else 'stats').strip().lower()
+        _, _, vector_db, _ = load_rag_config(self.session)
+        if not vector_db:
+            self._emit('error', "RAG requires [RAG].vector_db to be set.")
+            return False
+        cache = EmbeddingCache.for_vector_db(vector_db, load_rag_embedding_cache_bytes(self.session))
+        try:
+            if sub == 'prune':
+                target = None
+                if len(args) > 1:
+                    try:
+                        target = max(0, int(float(args[1]) * 1024 * 1024))
+                    except Exception:
+                        self._emit('error', f"Invalid size '{args[1]}' (expected megabytes)")
+                        return False
+                removed = cache.prune(target, vacuum=True)
+                self._emit('status', f"Pruned {removed} cached embedding(s)")
+            elif sub != 'stats':
+                self._emit('error', "Usage: rag cache stats|prune [mb]")
+                return False
+            st = cache.stats()
+        finally:
+            cache.close()
+        mb = 1024 * 1024
+        block = "\n".join([
+            "RAG Embedding Cache",
+            f"  file:       {st['path']}",
+            f"  entries:    {st['entries']} (signatures={st['signatures']})",
+            f"  vectors:    {st['bytes'] / mb:.1f} MB of {st['max_bytes'] / mb:.0f} MB cap",
+            f"  on disk:    {st['file_bytes'] / mb:.1f} MB",
+        ])
+        try:
+            self.session.utils.output.write(block)
+        except Exception:
+            self._emit('status', block)
+        return True
@@ -2,8 +2,9 @@ from __future__ import annotations
 
 from typing import List, Dict, Any
 from base_classes import InteractionAction
-from rag.fs_utils import load_rag_config
+from rag.fs_utils import load_rag_config, load_rag_cache_bytes
 from rag.vector_store import NaiveStore
+from rag.cache import get_index_cache
 import os
 
 
@@ -46,10 +47,39 @@ class RagStatusAction(InteractionAction):
                 counts = m.get('counts') or {}
                 lines.append(f"  counts:  files={counts.get('files', 0)} chunks={counts.get('chunks', 0)}")
                 lines.append(f"  dim:     {m.get('vector_dim')}")
+                ann = m.get('ann') or {}
+                if ann:
+                    lines.append(f"  backend: {m.get('backend')} (nlist={ann.get('nlist')}, trained_on={ann.get('trained_on')})")
+                else:
+                    lines.append(f"  backend: {m.get('backend') or 'naive'}")
+                vec = m.get('vectors') or {}
+                if vec:
+                    lines.append(f"  vectors: {vec.get('format')} {vec.get('dtype')} ({vec.get('file')})")
+                quant = m.get('quantization') or {}
+                if quant:
+                    recall = quant.get('recall')
+                    recall_s = f"{recall:.3f}" if isinstance(recall, (int, float)) else 'n/a'
+                    lines.append(
+                        f"  quantized: {'+'.join(quant.get('kinds') or [])} (rescore={quant.get('rescore')}, "
+                        f"recall@{quant.get('recall_k')}={recall_s} vs exact over {quant.get('recall_queries')} queries)"
+                    )
+                dedup = m.get('dedup') or {}
+                if dedup:
+                    lines.append(
+                        f"  dedup:   {dedup.get('mode')} (threshold={dedup.get('threshold')}, "
+                        f"duplicate chunks={dedup.get('duplicates')})"
+                    )
             # Consistency info
             lines.append(f"  loaded:  chunks={r.get('chunks_loaded', 0)} embeddings={r.get('embeddings_loaded', 0)}")
             if r.get('chunks_loaded') != r.get('embeddings_loaded'):
                 lines.append("  note: chunk/embedding count mismatch (re-run 'rag update')")
+        cache = get_index_cache().stats()
+        mb = 1024 * 1024
+        lines.append(
+            f"Index cache: entries={cache['entries']} size={cache['bytes'] / mb:.1f}/{cache['max_bytes'] / mb:.0f} MB "
+            f"mapped={cache.get('mapped_bytes', 0) / mb:.1f} MB "
+            f"hits={cache['hits']} misses={cache['misses']} evictions={cache['evictions']} invalidations={cache['invalidations']}"
+        )
         return lines
 
     def run(self, args: List[str] | None = None):
@@ -82,6 +112,11 @@ class RagStatusAction(InteractionAction):
         else:
             names = active if active else list(indexes.keys())
 
+        try:
+            get_index_cache().set_max_bytes(load_rag_cache_bytes(self.session))
+        except Exception:
+            pass
+
         rows: List[Dict[str, Any]] = []
         for name in names:
             root = indexes[name]
@@ -114,8 +149,8 @@ class RagStatusAction(InteractionAction):
                     embs = []
                     row['error'] = f"embeddings: {e}"
                 row['chunks_loaded'] = len(chunks or [])
-                row['embeddings_loaded'] = len(embs or [])
-                row['ok'] = bool(chunks and embs and len(chunks) == len(embs))
+                row['embeddings_loaded'] = len(embs) if embs is not None else 0
+                row['ok'] = bool(chunks and len(chunks) == row['embeddings_loaded'])
 
             rows.append(row)
 
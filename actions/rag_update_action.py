@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 from base_classes import InteractionAction
-from typing import List
+from typing import Any, Dict, Iterable, List
 
-from rag.fs_utils import load_rag_config, load_rag_filters, load_rag_exts, load_rag_max_bytes
+from rag.fs_utils import load_rag_config, load_rag_filters, load_rag_exts, load_rag_max_bytes, load_rag_backends, load_rag_extract_settings, load_rag_embed_settings, load_rag_embedding_cache_bytes
 from core.provider_factory import ProviderFactory
 from rag.indexer import update_index
+from rag.embedding_cache import EmbeddingCache
 from typing import Optional
 import os
 
@@ -50,23 +51,51 @@ class RagUpdateAction(InteractionAction):
     def run(self, args: List[str] | None = None):
         args = args or []
         target = args[0] if args else None
+        ctx = self._prepare(target)
+        if ctx is None:
+            return False
+
+        # Log update start
+        try:
+            self.session.utils.logger.rag_event('update_begin', {
+                'indexes': list(ctx['indexes'].keys()),
+                'active': list(ctx['active'] or []),
+                'vector_db': ctx['vector_db'],
+                'target': target,
+            }, component='rag.update')
+        except Exception:
+            pass
+
+        # Process each index
+        try:
+            for name in ctx['names']:
+                self._update_one(ctx, name)
+        finally:
+            if ctx['embedding_cache'] is not None:
+                ctx['embedding_cache'].close()
+        return True
+
+    def _prepare(self, target: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Resolve config, target indexes and the embedder; None after emitting an error."""
         indexes, active, vector_db, embedding_model = load_rag_config(self.session)
         if not vector_db:
             try:
                 self.session.ui.emit('error', {'message': "RAG requires [RAG].vector_db to be set."})
             except Exception:
                 pass
-            return False
+            return None
         filters = load_rag_filters(self.session)
         exts = load_rag_exts(self.session)
         max_bytes = load_rag_max_bytes(self.session)
+        backends = load_rag_backends(self.session)
+        extract = load_rag_extract_settings(self.session)
 
         if not indexes:
             try:
                 self.session.ui.emit('error', {'message': "No [RAG] indexes configured. Define [RAG].indexes and per-index sections like [RAG.notes] with path=... in config.ini."})
             except Exception:
                 pass
-            return False
+            return None
 
         names: List[str]
         if target:
@@ -75,7 +104,7 @@ class RagUpdateAction(InteractionAction):
                     self.session.ui.emit('error', {'message': f"Unknown RAG index '{target}'. Known: {', '.join(indexes.keys())}"})
                 except Exception:
                     pass
-                return False
+                return None
             names = [target]
         else:
             names = active if active else list(indexes.keys())
@@ -86,28 +115,48 @@ class RagUpdateAction(InteractionAction):
                 self.session.ui.emit('error', {'message': 'RAG requires [TOOLS].embedding_provider and [TOOLS].embedding_model to be set.'})
             except Exception:
                 pass
-            return False
+            return None
+
+        embed_opts = load_rag_embed_settings(self.session, (self.session.get_tools().get('embedding_provider') or '').strip() or None)
 
         # Ensure vector_db exists
         try:
             self.session.utils.fs.ensure_directory(vector_db)
         except Exception:
             pass
-
-        # Log update start
-        try:
-            self.session.utils.logger.rag_event('update_begin', {
-                'indexes': list(indexes.keys()),
-                'active': list(active or []),
-                'vector_db': vector_db,
-                'target': target,
-            }, component='rag.update')
-        except Exception:
-            pass
-
-        # Process each index
-        for name in names:
-            root = indexes[name]
+        cache_bytes = load_rag_embedding_cache_bytes(self.session)
+        embedding_cache = EmbeddingCache.for_vector_db(vector_db, cache_bytes) if cache_bytes > 0 else None
+        return {
+            'indexes': indexes,
+            'active': active,
+            'vector_db': vector_db,
+            'embedding_model': embedding_model,
+            'names': names,
+            'filters': filters,
+            'exts': exts,
+            'max_bytes': max_bytes,
+            'backends': backends,
+            'extract': extract,
+            'prov': prov,
+            'embed_opts': embed_opts,
+            'embedding_cache': embedding_cache,
+        }
+
+    def _update_one(
+        self,
+        ctx: Dict[str, Any],
+        name: str,
+        changed_paths: Optional[Iterable[str]] = None,
+    ) -> Dict[str, Any]:
+        """Run `update_index` for one index and report the outcome.
+
+        changed_paths restricts the update to those files (see `rag watch`).
+        """
+        indexes, filters, exts, max_bytes = ctx['indexes'], ctx['filters'], ctx['exts'], ctx['max_bytes']
+        prov, embedding_model = ctx['prov'], ctx['embedding_model']
+        extract = ctx['extract']
+        root = indexes[name]
+        if changed_paths is None:
             try:
                 inc = filters.get(name, {}).get('include') if filters else None
                 exc = filters.get(name, {}).get('exclude') if filters else None
@@ -123,38 +172,60 @@ class RagUpdateAction(InteractionAction):
                 self.session.ui.emit('status', {'message': f"Indexing {name}: {root}{suffix}{ext_suffix}{size_suffix}"})
             except Exception:
                 pass
-            # Build an embedding signature to avoid mixing vector backends/dims
-            sig = {
-                'provider': prov.__class__.__name__,
-                'embedding_id': embedding_model,
-            }
-            try:
-                self.session.utils.logger.rag_event('index_begin', {'name': name, 'root': root}, component='rag.update')
-            except Exception:
-                pass
-            stats = update_index(
-                index_name=name,
-                root_path=root,
-                vector_db=vector_db,
-                embed_fn=lambda batch: prov.embed(batch, model=embedding_model),
-                embedding_model=embedding_model,
-                embedding_signature=sig,
-                include_globs=(filters.get(name, {}).get('include') if filters else None),
-                exclude_globs=(filters.get(name, {}).get('exclude') if filters else None),
-                exts=exts,
-                max_bytes=max_bytes,
-            )
+        # Build an embedding signature to avoid mixing vector backends/dims
+        sig = {
+            'provider': prov.__class__.__name__,
+            'embedding_id': embedding_model,
+        }
+        try:
+            self.session.utils.logger.rag_event('index_begin', {'name': name, 'root': root}, component='rag.update')
+        except Exception:
+            pass
+        bcfg = ctx['backends'].get(name, {}) if ctx['backends'] else {}
+        stats = update_index(
+            index_name=name,
+            root_path=root,
+            vector_db=ctx['vector_db'],
+            embed_fn=lambda batch: prov.embed(batch, model=embedding_model),
+            embedding_model=embedding_model,
+            embedding_signature=sig,
+            include_globs=(filters.get(name, {}).get('include') if filters else None),
+            exclude_globs=(filters.get(name, {}).get('exclude') if filters else None),
+            exts=exts,
+            max_bytes=max_bytes,
+            backend=str(bcfg.get('backend') or 'naive'),
+            ann_options={'nlist': bcfg.get('nlist'), 'min_chunks': bcfg.get('min_chunks'), 'rescore': bcfg.get('rescore')},
+            quantization=bcfg.get('quantization'),
+            dedup=bcfg.get('dedup'),
+            dedup_threshold=bcfg.get('dedup_threshold'),
+            extract_workers=int(extract.get('workers') or 1),
+            extract_timeout=extract.get('timeout'),
+            embed_options=ctx['embed_opts'],
+            embedding_cache=ctx['embedding_cache'],
+            changed_paths=changed_paths,
+        )
+        try:
+            skipped = stats.get('skipped')
+            if skipped:
+                self.session.ui.emit('status', {'message': f"Up to date {name}: files={stats['files']} chunks={stats['chunks']} -> {stats['index_dir']}"})
+            else:
+                self.session.ui.emit('status', {'message': (
+                    f"Indexed {name}: files={stats['files']} changed={stats.get('files_changed', 0)} "
+                    f"removed={stats.get('files_removed', 0)} chunks={stats['chunks']} embedded={stats['embedded']}"
+                    + (f" cached={stats['cached']}" if stats.get('cached') else '')
+                    + (f" resumed={stats['resumed']}" if stats.get('resumed') else '')
+                    + (f" deduped={stats['deduped']}" if stats.get('deduped') else '')
+                    + f" -> {stats['index_dir']}"
+                )})
+            if stats.get('extract_timeouts'):
+                self.session.ui.emit('warning', {'message': (
+                    f"Extraction timed out for {len(stats['extract_timeouts'])} file(s) in {name}; "
+                    "they will be retried on the next update."
+                )})
             try:
-                skipped = stats.get('skipped')
-                if skipped:
-                    self.session.ui.emit('status', {'message': f"Up to date {name}: files={stats['files']} chunks={stats['chunks']} -> {stats['index_dir']}"})
-                else:
-                    self.session.ui.emit('status', {'message': f"Indexed {name}: files={stats['files']} chunks={stats['chunks']} embedded={stats['embedded']} -> {stats['index_dir']}"})
-                try:
-                    self.session.utils.logger.rag_event('index_done', {'name': name, **stats}, component='rag.update')
-                except Exception:
-                    pass
+                self.session.utils.logger.rag_event('index_done', {'name': name, **stats}, component='rag.update')
             except Exception:
                 pass
-
-        return True
+        except Exception:
+            pass
+        return stats
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+from actions.rag_update_action import RagUpdateAction
+from rag.watch import DEFAULT_DEBOUNCE_S, DEFAULT_POLL_INTERVAL_S, InotifyWatcher, open_watcher, watch
+
+
+class RagWatchAction(RagUpdateAction):
+    """User command to keep RAG indexes fresh as files change.
+
+    Usage:
+      - rag watch            -> watch all active (or all defined) indexes
+      - rag watch <name>     -> watch only the named index
+      - rag watch [<name>] poll
+                             -> force the polling watcher (e.g. network mounts)
+
+    Runs a normal `rag update` first, then watches the index roots (inotify on
+    Linux, polling elsewhere), debounces bursts of changes and re-indexes only
+    the touched files. Runs until interrupted (Ctrl-C).
+
+    Options ([RAG]): watch_debounce (seconds of quiet before re-indexing,
+    default 1.0), watch_interval (polling period, default 2.0).
+    """
+
+    def __init__(self, session):
+        super().__init__(session)
+        self.stop_event = threading.Event()
+
+    def _float_opt(self, name: str, default: float) -> float:
+        try:
+            raw = (self.session.get_all_options_from_section('RAG') or {}).get(name)
+            return float(raw) if raw not in (None, '') else default
+        except Exception:
+            return default
+
+    def run(self, args: List[str] | None = None):
+        args = [str(a) for a in (args or [])]
+        polling = any(a.strip().lower() in ('poll', '--poll') for a in args)
+        rest = [a for a in args if a.strip().lower() not in ('poll', '--poll')]
+        target = rest[0] if rest else None
+        ctx = self._prepare(target)
+        if ctx is None:
+            return False
+
+        debounce = self._float_opt('watch_debounce', DEFAULT_DEBOUNCE_S)
+        interval = self._float_opt('watch_interval', DEFAULT_POLL_INTERVAL_S)
+        roots = {name: ctx['indexes'][name] for name in ctx['names']}
+        try:
+            # Catch up with changes made while nobody was watching
+            for name in ctx['names']:
+                self._update_one(ctx, name)
+
+            watcher = open_watcher(
+                {os.path.realpath(os.path.expanduser(r)) for r in roots.values()},
+                polling=polling, interval=interval, ignore=[ctx['vector_db']],
+            )
+            kind = 'inotify' if isinstance(watcher, InotifyWatcher) else f'polling every {interval:g}s'
+            self._emit('status', f"Watching {', '.join(roots)} ({kind}); Ctrl-C to stop")
+            try:
+                self.session.utils.logger.rag_event('watch_begin', {
+                    'indexes': list(roots), 'watcher': kind, 'debounce': debounce,
+                }, component='rag.watch')
+            except Exception:
+                pass
+            try:
+                watch(roots, lambda name, paths: self._on_batch(ctx, name, paths), debounce=debounce,
+                      interval=interval, stop=self.stop_event, watcher=watcher)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                watcher.close()
+            self._emit('status', 'Stopped watching RAG indexes')
+        finally:
+            if ctx['embedding_cache'] is not None:
+                ctx['embedding_cache'].close()
+        return True
+
+    def _on_batch(self, ctx: Dict[str, Any], name: str, paths: Set[str]) -> Optional[Dict[str, Any]]:
+        try:
+            self.session.utils.logger.rag_event('watch_batch', {'name': name, 'paths': len(paths)}, component='rag.watch')
+        except Exception:
+            pass
+        try:
+            return self._update_one(ctx, name, changed_paths=sorted(paths))
+        except Exception as e:
+            # Keep watching; the next batch (or a full 'rag update') retries
+            self._emit('error', f"Re-indexing {name} failed: {e}")
+            return None
+
+    def _emit(self, kind: str, message: str) -> None:
+        try:
+            self.session.ui.emit(kind, {'message': message})
+        except Exception:
+            pass
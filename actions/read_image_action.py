@@ -13,6 +13,8 @@ IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.heif')
 class ReadImageAction(InteractionAction):
     """Add an image context or, if vision unsupported, add a summary as multiline input."""
 
+    REUSABLE = True
+
     def __init__(self, session):
         self.session = session
 
@@ -7,6 +7,8 @@ import re
 
 class ReprintChatAction(InteractionAction):
 
+    REUSABLE = True
+
     def __init__(self, session):
         self.session = session
 
@@ -196,6 +196,8 @@ class UserCommandsRegistryAction(InteractionAction):
                 'sub': {
                     'update': {'type': 'action', 'name': 'rag_update'},
                     'status': {'type': 'action', 'name': 'rag_status'},
+                    'cache':  {'type': 'action', 'name': 'rag_cache'},
+                    'watch':  {'type': 'action', 'name': 'rag_watch'},
                 },
             },
         }
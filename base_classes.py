@@ -99,8 +99,14 @@ class InteractionContext(ABC):
 class InteractionAction(ABC):
     """
     Abstract class for interaction actions
+
+    Session.get_action() constructs a new instance per call. Actions that keep
+    no per-call state (everything derived from the session on use) may set
+    REUSABLE = True so the session hands out one shared instance per name.
     """
 
+    REUSABLE = False
+
     @abstractmethod
     def run(self, *args, **kwargs):
         pass
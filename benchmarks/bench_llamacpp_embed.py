@@ -0,0 +1,109 @@
+"""Throughput of LlamaCppProvider.embed: batched decode vs one input per decode.
+
+Usage:
+  python benchmarks/bench_llamacpp_embed.py /path/to/embedding-model.gguf [--texts 256] [--words 120]
+      [--context-size 4096] [--n-batch 2048] [--n-gpu-layers -1] [--rounds 3]
+
+Prints one JSON line per path (texts/s, tokens/s, seconds) plus the minimum
+cosine similarity between the two paths' vectors, which should be ~1.0.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from providers.llamacpp_provider import LlamaCppProvider
+
+
+class _Session:
+    """Just enough of Session for the provider's embedding path."""
+
+    def __init__(self, params, init):
+        self.params = params
+        self.init = init
+
+    def get_params(self):
+        return dict(self.params)
+
+    def get_all_options_from_provider(self, name):
+        return {'llamacpp_init': dict(self.init)}
+
+    def get_all_options_from_model(self, name):
+        return {}
+
+
+def _corpus(n: int, words: int, seed: int = 0):
+    rng = random.Random(seed)
+    vocab = [w for w in (
+        'index vector search query chunk embedding model batch decode token context memory file path '
+        'cache update watch filter score rank lexical hybrid quantized cluster centroid latency throughput '
+        'the a of to and in is for on with as by this that from at be are it or was'
+    ).split()]
+    # Varied lengths, like chunks of real documents
+    return [' '.join(rng.choice(vocab) for _ in range(rng.randint(words // 4, words))) for _ in range(n)]
+
+
+def _run(provider, model, texts, rounds):
+    best = None
+    vecs = None
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        vecs = provider.embed(texts, model=model)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, np.asarray(vecs, dtype=np.float32)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('model')
+    ap.add_argument('--texts', type=int, default=256)
+    ap.add_argument('--words', type=int, default=120)
+    ap.add_argument('--context-size', type=int, default=4096)
+    ap.add_argument('--n-batch', type=int, default=2048)
+    ap.add_argument('--n-gpu-layers', type=int, default=-1)
+    ap.add_argument('--rounds', type=int, default=3)
+    args = ap.parse_args()
+
+    texts = _corpus(args.texts, args.words)
+    params = {'model_path': args.model, 'context_size': args.context_size, 'n_gpu_layers': args.n_gpu_layers}
+    init = {'n_batch': args.n_batch, 'n_ubatch': args.n_batch}
+    results = {}
+    for name, batched in (('per_item', False), ('batched', True)):
+        provider = LlamaCppProvider(_Session(dict(params, embed_batch=batched), init))
+        provider.embed(texts[:2], model=args.model)  # load the model outside the timing
+        llm = provider._get_embed_llm(args.model)
+        n_tokens = sum(len(llm.tokenize(t.encode('utf-8'), add_bos=True)) for t in texts)
+        seconds, vecs = _run(provider, args.model, texts, max(1, args.rounds))
+        fell_back = bool(batched and provider._embed_batch_failed)
+        results[name] = vecs
+        print(json.dumps({
+            'path': name,
+            'texts': len(texts),
+            'tokens': n_tokens,
+            'seconds': round(seconds, 4),
+            'texts_per_s': round(len(texts) / seconds, 1),
+            'tokens_per_s': round(n_tokens / seconds, 1),
+            'fell_back_to_per_item': fell_back,
+        }))
+        provider._close_llama_handle(llm)
+
+    a, b = results['per_item'], results['batched']
+    a = a / np.maximum(np.linalg.norm(a, axis=1, keepdims=True), 1e-12)
+    b = b / np.maximum(np.linalg.norm(b, axis=1, keepdims=True), 1e-12)
+    print(json.dumps({'min_cosine_per_item_vs_batched': round(float(np.min(np.sum(a * b, axis=1))), 6)}))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
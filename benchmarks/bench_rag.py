@@ -0,0 +1,553 @@
+"""Indexing throughput and query latency of the RAG pipeline on a synthetic corpus.
+
+Usage:
+  python benchmarks/bench_rag.py [--files 500] [--words 200:2000] [--mix md:6,txt:3,pdf:1]
+      [--dup-ratio 0.0] [--seed 0] [--dim 256] [--backend naive|ivf] [--quantization int8,binary]
+      [--dedup exact|near] [--extract-workers 1] [--queries 200] [--k 10] [--mode vector|lexical|hybrid]
+      [--workdir DIR] [--out results.json] [--baseline previous.json] [--no-isolate]
+
+Generates a reproducible corpus (markdown, plain text and simple PDFs drawn
+from a Zipf-distributed synthetic vocabulary), indexes it with
+`rag.indexer.update_index` and a deterministic local embedder (hashed bag of
+words, no network or model), then times `rag.search.search` per query.
+
+Reports files/s, chunks/s, bytes extracted and peak RSS for indexing (run in
+a child process so the peak belongs to the update alone), and p50/p95
+latency plus recall@k against exact search (`ann_options` exact=True) for
+queries. Results are printed and written as JSON (`--out`); `--baseline`
+prints the relative change of the headline metrics against an earlier run.
+PDF text is only extracted when pypdf (or PyPDF2) is installed.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from rag.extractors import get_supported_exts, get_versions
+from rag.fs_utils import DEFAULT_EXTS
+from rag.indexer import update_index
+from rag.search import search
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+RESULTS_VERSION = 1
+INDEX_NAME = 'bench'
+DEFAULT_MIX = 'md:6,txt:3,pdf:1'
+CORPUS_KINDS = ('md', 'txt', 'pdf')
+QUERIES_FILE = 'queries.json'
+# Headline metrics compared with --baseline, and whether higher is better
+_HEADLINE = (
+    ('index', 'files_per_s', True),
+    ('index', 'chunks_per_s', True),
+    ('index', 'peak_rss_mb', False),
+    ('search', 'p50_ms', False),
+    ('search', 'p95_ms', False),
+    ('search', 'recall_at_k', True),
+)
+
+
+# --- corpus ------------------------------------------------------------------
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """'md:6,txt:3,pdf:1' -> normalized weights per kind."""
+    weights: Dict[str, float] = {}
+    for part in str(value or '').split(','):
+        if not part.strip():
+            continue
+        kind, _, w = part.partition(':')
+        kind = kind.strip().lower().lstrip('.')
+        if kind not in CORPUS_KINDS:
+            raise ValueError(f"unknown corpus kind '{kind}' (use {', '.join(CORPUS_KINDS)})")
+        weights[kind] = float(w) if w.strip() else 1.0
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError('corpus mix needs at least one positive weight')
+    return {k: w / total for k, w in weights.items() if w > 0}
+
+
+def _vocabulary(rng: random.Random, size: int) -> List[str]:
+    letters = 'abcdefghiklmnoprstuvwy'
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(letters) for _ in range(rng.randint(2, 10))))
+    return sorted(words)
+
+
+class _Writer:
+    """Zipf-distributed sentences and paragraphs over a fixed vocabulary."""
+
+    def __init__(self, seed: int, vocab_size: int = 8000) -> None:
+        self.rng = random.Random(seed)
+        self.vocab = _vocabulary(self.rng, vocab_size)
+        self.rng.shuffle(self.vocab)
+        acc = 0.0
+        self.cum = []
+        for rank in range(1, vocab_size + 1):
+            acc += 1.0 / rank
+            self.cum.append(acc)
+
+    def words(self, n: int) -> List[str]:
+        return self.rng.choices(self.vocab, cum_weights=self.cum, k=n)
+
+    def paragraphs(self, n_words: int) -> List[str]:
+        out: List[str] = []
+        while n_words > 0:
+            size = min(n_words, self.rng.randint(40, 160))
+            words = self.words(size)
+            sentences, i = [], 0
+            while i < len(words):
+                j = i + self.rng.randint(6, 18)
+                sentences.append(' '.join(words[i:j]).capitalize() + '.')
+                i = j
+            out.append(' '.join(sentences))
+            n_words -= size
+        return out
+
+
+def _markdown(w: _Writer, n_words: int) -> str:
+    lines = ['# ' + ' '.join(w.words(4)).title(), '']
+    for i, para in enumerate(w.paragraphs(n_words)):
+        if i and i % 3 == 0:
+            lines += ['## ' + ' '.join(w.words(3)).title(), '']
+        if w.rng.random() < 0.15:
+            lines += ['- ' + ' '.join(w.words(6)) for _ in range(3)] + ['']
+        lines += [para, '']
+    return '\n'.join(lines)
+
+
+def _wrap(text: str, width: int = 90) -> List[str]:
+    lines: List[str] = []
+    cur = ''
+    for word in text.split():
+        if cur and len(cur) + 1 + len(word) > width:
+            lines.append(cur)
+            cur = word
+        else:
+            cur = f'{cur} {word}' if cur else word
+    if cur:
+        lines.append(cur)
+    return lines
+
+
+def write_pdf(path: str, paragraphs: Sequence[str], lines_per_page: int = 60) -> None:
+    """Minimal uncompressed PDF (Helvetica text pages); enough for pypdf to extract."""
+    lines: List[str] = []
+    for para in paragraphs:
+        lines += _wrap(para) + ['']
+    pages = [lines[i:i + lines_per_page] for i in range(0, max(1, len(lines)), lines_per_page)]
+    n_pages = len(pages)
+    # 1: catalog, 2: pages, 3: font, then (page, content) pairs
+    objs: List[bytes] = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        ('<< /Type /Pages /Kids [%s] /Count %d >>'
+         % (' '.join(f'{4 + 2 * i} 0 R' for i in range(n_pages)), n_pages)).encode('ascii'),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    for i, page in enumerate(pages):
+        body = ['BT', '/F1 10 Tf', '12 TL', '50 780 Td']
+        for line in page:
+            esc = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+            body.append(f'({esc}) Tj T*')
+        body.append('ET')
+        stream = '\n'.join(body).encode('latin-1', errors='replace')
+        objs.append(('<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                     '/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % (5 + 2 * i)).encode('ascii'))
+        objs.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for num, obj in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % num + obj + b'\nendobj\n'
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objs) + 1)
+    out += b''.join(b'%010d 00000 n \n' % off for off in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objs) + 1, xref)
+    with open(path, 'wb') as f:
+        f.write(out)
+
+
+def make_corpus(
+    root: str,
+    *,
+    files: int = 500,
+    words: tuple[int, int] = (200, 2000),
+    mix: str = DEFAULT_MIX,
+    dup_ratio: float = 0.0,
+    queries: int = 200,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Write a reproducible corpus under `root` (same arguments, same bytes).
+
+    `dup_ratio` of the files are copies of earlier files (exercises dedup).
+    Queries are short word windows sampled from the generated text and are
+    saved to `root/queries.json`. Returns counts and bytes per kind.
+    """
+    weights = parse_mix(mix)
+    kinds = list(weights)
+    w = _Writer(seed)
+    os.makedirs(root, exist_ok=True)
+    summary: Dict[str, Any] = {k: {'files': 0, 'bytes': 0} for k in kinds}
+    texts: List[str] = []
+    written: List[tuple[str, str]] = []
+    for i in range(int(files)):
+        kind = w.rng.choices(kinds, weights=[weights[k] for k in kinds])[0]
+        sub = os.path.join(root, f'd{i // 100:03d}')
+        os.makedirs(sub, exist_ok=True)
+        path = os.path.join(sub, f'doc{i:05d}.{kind}')
+        if written and w.rng.random() < dup_ratio:
+            src_kind, src = w.rng.choice(written)
+            path = os.path.join(sub, f'doc{i:05d}.{src_kind}')
+            shutil.copyfile(src, path)
+            kind = src_kind
+        else:
+            n = w.rng.randint(*words)
+            if kind == 'pdf':
+                paras = w.paragraphs(n)
+                write_pdf(path, paras)
+                texts.append(' '.join(paras))
+            else:
+                text = _markdown(w, n) if kind == 'md' else '\n\n'.join(w.paragraphs(n)) + '\n'
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                texts.append(text)
+            written.append((kind, path))
+        summary[kind]['files'] += 1
+        summary[kind]['bytes'] += os.path.getsize(path)
+    qs: List[str] = []
+    for _ in range(int(queries) if texts else 0):
+        tokens = w.rng.choice(texts).replace('#', ' ').replace('.', ' ').split()
+        start = w.rng.randrange(max(1, len(tokens) - 8))
+        qs.append(' '.join(tokens[start:start + w.rng.randint(3, 8)]).lower())
+    with open(os.path.join(root, QUERIES_FILE), 'w', encoding='utf-8') as f:
+        json.dump(qs, f)
+    summary['files'] = sum(summary[k]['files'] for k in kinds)
+    summary['bytes'] = sum(summary[k]['bytes'] for k in kinds)
+    summary['queries'] = len(qs)
+    return summary
+
+
+def load_queries(root: str) -> List[str]:
+    with open(os.path.join(root, QUERIES_FILE), encoding='utf-8') as f:
+        return [str(q) for q in json.load(f)]
+
+
+# --- embedder ----------------------------------------------------------------
+
+class HashEmbedder:
+    """Deterministic local embedder: signed feature hashing of words and word
+    bigrams into `dim` buckets (crc32, stable across processes), rotated by a
+    fixed random orthogonal matrix and L2-normalized.
+
+    Texts sharing words land close together, so recall and ranking behave
+    like a (very small) real model without any network or model file. The
+    rotation keeps cosines unchanged but makes vectors dense, as real
+    embeddings are (sparse vectors would defeat binary/int8 codes).
+    """
+
+    def __init__(self, dim: int = 256) -> None:
+        self.dim = int(dim)
+        self.calls = 0
+        self.texts = 0
+        q, _ = np.linalg.qr(np.random.default_rng(self.dim).standard_normal((self.dim, self.dim)))
+        self._rotation = q.astype(np.float32)
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        self.calls += 1
+        self.texts += len(texts)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            tokens = text.lower().split()
+            feats = tokens + [a + ' ' + b for a, b in zip(tokens, tokens[1:])]
+            for h in (zlib.crc32(t.encode('utf-8')) for t in feats):
+                out[i, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        out = out @ self._rotation
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+
+# --- measurements ------------------------------------------------------------
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _dir_bytes(path: str) -> int:
+    total = 0
+    for dirpath, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+def _bytes_extracted(stats: Dict[str, Any], root: str, vector_db: str) -> int:
+    """Text fed to the chunker: text files as read, binary documents as extracted."""
+    extracted_dir = os.path.join(vector_db, INDEX_NAME, 'extracted')
+    total = _dir_bytes(extracted_dir)
+    try:
+        with open(os.path.join(vector_db, INDEX_NAME, 'files.jsonl'), encoding='utf-8') as f:
+            for line in f:
+                rec = json.loads(line)
+                if not str(rec.get('path', '')).lower().endswith(('.pdf', '.docx', '.xlsx')):
+                    total += int(rec.get('size') or 0)
+    except (OSError, ValueError):
+        pass
+    return total
+
+
+def run_index(root: str, vector_db: str, dim: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """One `update_index` run; returns throughput, peak RSS and the update stats."""
+    embedder = HashEmbedder(dim)
+    t0 = time.perf_counter()
+    stats = update_index(
+        index_name=INDEX_NAME, root_path=root, vector_db=vector_db, embed_fn=embedder,
+        embedding_model=f'hash-{dim}', **options,
+    )
+    seconds = time.perf_counter() - t0
+    files = int(stats.get('files') or 0)
+    chunks = int(stats.get('chunks') or 0)
+    return {
+        'seconds': round(seconds, 4),
+        'files': files,
+        'chunks': chunks,
+        'embedded': int(stats.get('embedded') or 0),
+        'files_per_s': round(files / seconds, 2) if seconds else None,
+        'chunks_per_s': round(chunks / seconds, 2) if seconds else None,
+        'bytes_extracted': _bytes_extracted(stats, root, vector_db),
+        'index_bytes': _dir_bytes(os.path.join(vector_db, INDEX_NAME)),
+        'embed_calls': embedder.calls,
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+def _index_child(conn, root: str, vector_db: str, dim: int, options: Dict[str, Any]) -> None:
+    try:
+        conn.send(('ok', run_index(root, vector_db, dim, options)))
+    except BaseException as e:
+        conn.send(('error', f'{type(e).__name__}: {e}'))
+    finally:
+        conn.close()
+
+
+def run_index_isolated(root: str, vector_db: str, dim: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """`run_index` in a fresh (non-daemonic) child so peak RSS covers only the update."""
+    parent, child = multiprocessing.Pipe(duplex=False)
+    proc = multiprocessing.Process(target=_index_child, args=(child, root, vector_db, dim, options))
+    proc.start()
+    child.close()
+    try:
+        status, payload = parent.recv()
+    except EOFError:
+        status, payload = 'error', 'indexing process died'
+    proc.join()
+    if status != 'ok':
+        raise RuntimeError(payload)
+    return payload
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    return round(float(np.percentile(values, q)), 3) if values else None
+
+
+def run_search(
+    root: str,
+    vector_db: str,
+    queries: Sequence[str],
+    *,
+    dim: int,
+    k: int = 10,
+    mode: str = 'vector',
+    ann: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Time `search` per query and compare its hits with exact search.
+
+    The first query pays for loading the index and is reported separately
+    (`cold_ms`); percentiles cover the remaining, warm queries.
+    """
+    embedder = HashEmbedder(dim)
+    indexes = {INDEX_NAME: root}
+    common = dict(indexes=indexes, names=[INDEX_NAME], vector_db=vector_db, embed_query_fn=embedder, k=k, mode=mode)
+    ann_options = {INDEX_NAME: dict(ann or {})}
+    exact_options = {INDEX_NAME: dict(ann or {}, exact=True)}
+    latencies: List[float] = []
+    recalls: List[float] = []
+    cold = None
+    for q in queries:
+        t0 = time.perf_counter()
+        res = search(query=q, ann_options=ann_options, **common)
+        ms = (time.perf_counter() - t0) * 1000.0
+        if cold is None:
+            cold = ms
+        else:
+            latencies.append(ms)
+        truth = search(query=q, ann_options=exact_options, **common)
+        want = {(r['path'], r['line_start'], r['line_end']) for r in truth['results']}
+        if want:
+            got = {(r['path'], r['line_start'], r['line_end']) for r in res['results']}
+            recalls.append(len(want & got) / len(want))
+    return {
+        'queries': len(queries),
+        'k': k,
+        'mode': mode,
+        'cold_ms': round(cold, 3) if cold is not None else None,
+        'p50_ms': _percentile(latencies, 50),
+        'p95_ms': _percentile(latencies, 95),
+        'mean_ms': round(float(np.mean(latencies)), 3) if latencies else None,
+        'qps': round(1000.0 * len(latencies) / sum(latencies), 1) if latencies and sum(latencies) else None,
+        'recall_at_k': round(float(np.mean(recalls)), 4) if recalls else None,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Relative change of the headline metrics (positive = better)."""
+    out: Dict[str, Dict[str, Any]] = {}
+    for section, key, higher_better in _HEADLINE:
+        new = (current.get(section) or {}).get(key)
+        old = (baseline.get(section) or {}).get(key)
+        if not isinstance(new, (int, float)) or not isinstance(old, (int, float)) or not old:
+            continue
+        change = (new - old) / abs(old)
+        out[f'{section}.{key}'] = {
+            'baseline': old,
+            'current': new,
+            'change': round(change if higher_better else -change, 4),
+        }
+    return out
+
+
+# --- CLI -----------------------------------------------------------------------
+
+def _words_range(value: str) -> tuple[int, int]:
+    lo, _, hi = str(value).partition(':')
+    lo_i = int(lo)
+    hi_i = int(hi) if hi else lo_i
+    if lo_i <= 0 or hi_i < lo_i:
+        raise argparse.ArgumentTypeError('words must be N or MIN:MAX with 0 < MIN <= MAX')
+    return lo_i, hi_i
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--files', type=int, default=500)
+    ap.add_argument('--words', type=_words_range, default=(200, 2000), help='words per file, N or MIN:MAX')
+    ap.add_argument('--mix', default=DEFAULT_MIX, help='corpus kinds and weights, e.g. md:6,txt:3,pdf:1')
+    ap.add_argument('--dup-ratio', type=float, default=0.0, help='fraction of files copied from earlier ones')
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--dim', type=int, default=256)
+    ap.add_argument('--backend', default='naive', choices=('naive', 'ivf'))
+    ap.add_argument('--nlist', type=int)
+    ap.add_argument('--nprobe', type=int)
+    ap.add_argument('--ann-min-chunks', type=int, help='IVF only above this many chunks (default 10000)')
+    ap.add_argument('--quantization', help="'int8', 'binary' or 'int8,binary'")
+    ap.add_argument('--rescore', type=int)
+    ap.add_argument('--dedup', choices=('exact', 'near'))
+    ap.add_argument('--extract-workers', type=int, default=1)
+    ap.add_argument('--batch-size', type=int, default=128)
+    ap.add_argument('--queries', type=int, default=200)
+    ap.add_argument('--k', type=int, default=10)
+    ap.add_argument('--mode', default='vector', choices=('vector', 'lexical', 'hybrid'))
+    ap.add_argument('--workdir', help='keep corpus and index here (default: a temporary dir, removed afterwards)')
+    ap.add_argument('--out', help='write results JSON here')
+    ap.add_argument('--baseline', help='earlier results JSON to compare against')
+    ap.add_argument('--no-isolate', action='store_true', help='index in this process (peak RSS then includes the harness)')
+    args = ap.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='rag-bench-')
+    root = os.path.join(workdir, 'corpus')
+    vector_db = os.path.join(workdir, 'vector_db')
+    try:
+        if os.path.isdir(vector_db):
+            shutil.rmtree(vector_db)  # always time a full build
+        t0 = time.perf_counter()
+        corpus = make_corpus(root, files=args.files, words=args.words, mix=args.mix,
+                             dup_ratio=args.dup_ratio, queries=args.queries, seed=args.seed)
+        corpus['seconds'] = round(time.perf_counter() - t0, 4)
+
+        ann: Dict[str, Any] = {}
+        for key, value in (('nlist', args.nlist), ('nprobe', args.nprobe), ('min_chunks', args.ann_min_chunks),
+                           ('rescore', args.rescore)):
+            if value is not None:
+                ann[key] = value
+        options: Dict[str, Any] = {
+            'batch_size': args.batch_size,
+            'backend': args.backend,
+            'ann_options': ann or None,
+            'quantization': args.quantization,
+            'dedup': args.dedup,
+            'extract_workers': args.extract_workers,
+            'exts': set(DEFAULT_EXTS) | get_supported_exts(),
+        }
+        if args.no_isolate:
+            index = run_index(root, vector_db, args.dim, options)
+        else:
+            index = run_index_isolated(root, vector_db, args.dim, options)
+        search_res = run_search(root, vector_db, load_queries(root), dim=args.dim, k=args.k, mode=args.mode, ann=ann)
+
+        config = {k: v for k, v in vars(args).items() if k not in ('out', 'baseline', 'workdir')}
+        config['words'] = list(args.words)
+        results: Dict[str, Any] = {
+            'version': RESULTS_VERSION,
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'extractors': get_versions(),
+            'config': config,
+            'corpus': corpus,
+            'index': index,
+            'search': search_res,
+        }
+        if args.baseline:
+            with open(args.baseline, encoding='utf-8') as f:
+                results['comparison'] = compare(results, json.load(f))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -278,6 +278,29 @@ class ComponentRegistry:
 
         return sorted(list(actions))
 
+    def user_actions_signature(self) -> tuple:
+        """(directory, ((action name, mtime_ns, size), ...)) of the user actions
+        directory, or () when none is configured; changes when files are
+        added, removed or edited."""
+        user_actions_dir = self.config.get_option('DEFAULT', 'user_actions', fallback=None)
+        if not user_actions_dir:
+            return ()
+        user_dir = ConfigManager.resolve_directory_path(user_actions_dir)
+        if not user_dir or not os.path.isdir(user_dir):
+            return ()
+        files = []
+        with os.scandir(user_dir) as it:
+            for entry in it:
+                if entry.name.endswith('_action.py'):
+                    st = entry.stat()
+                    files.append((entry.name[:-10], st.st_mtime_ns, st.st_size))
+        return user_dir, tuple(sorted(files))
+
+    def forget_actions(self, names) -> None:
+        """Drop cached action classes so the next lookup loads them again."""
+        for name in names:
+            self._action_cache.pop(name, None)
+
     def list_available_contexts(self) -> List[str]:
         """List all available context types"""
         return sorted(list(self._context_classes.keys()))
@@ -1,6 +1,91 @@
 from base_classes import InteractionContext
+from core.token_counter import get_token_counter
 from datetime import datetime
+import json
 import random
+import re
+
+
+# Per-turn framing (role, separators), as CountTokensAction counts messages
+TURN_OVERHEAD_TOKENS = 4
+_BUDGET_RE = re.compile(r'^budget_(\d+)(k?)(?:_pin(\d+))?$')
+
+
+def turn_tokens(turn: dict) -> int:
+    """Estimated tokens a turn adds to a request: message, text contexts and
+    tool calls (images are not counted). Context counts are stored on the
+    context objects, so contexts already counted for a summary are free."""
+    counter = get_token_counter()
+    total = TURN_OVERHEAD_TOKENS + counter.count(turn.get('message') or '')
+    contexts = [c.get('context') for c in (turn.get('context') or [])
+                if isinstance(c, dict) and c.get('type') != 'image' and c.get('context') is not None]
+    if contexts:
+        total += sum(counter.count_contexts(contexts))
+    if turn.get('tool_calls'):
+        total += counter.count(json.dumps(turn.get('tool_calls'), default=str))
+    return total
+
+
+def parse_budget(context_sent) -> tuple | None:
+    """(token budget, pinned first turns) for 'budget_<tokens>[k][_pin<n>]', else None."""
+    m = _BUDGET_RE.match(str(context_sent or '').strip().lower())
+    if not m:
+        return None
+    budget = int(m.group(1)) * (1000 if m.group(2) else 1)
+    return budget, int(m.group(3) or 0)
+
+
+def budget_window(turns: list, ledger: list, budget: int, pin: int = 0) -> list:
+    """Largest suffix of `turns` (after the first `pin` turns, kept when they
+    fit) whose ledger tokens fit in `budget`. One pass over the ledger; the
+    last turn is always sent, and tool outputs whose call fell outside the
+    window are dropped from its start."""
+    n = len(turns)
+    if not n:
+        return []
+    pin = max(0, min(int(pin), n - 1))
+    pinned = sum(ledger[:pin])
+    if pinned > budget:
+        pin, pinned = 0, 0
+    remaining = budget - pinned
+    start = n
+    while start > pin and (start == n or ledger[start - 1] <= remaining):
+        remaining -= ledger[start - 1]
+        start -= 1
+    while start < n - 1 and turns[start].get('role') == 'tool':
+        start += 1
+    if start <= pin:
+        return list(turns)
+    return list(turns[:pin]) + list(turns[start:])
+
+
+def select_window(turns: list, context_sent, ledger: list | None = None) -> list:
+    """Provider-visible slice of `turns` for a `context_sent` value:
+    all, none / last_1, last_<n>, first_<n> or budget_<tokens>[k][_pin<n>].
+    Budget windows use `ledger` (per-turn tokens), counted here when omitted."""
+    context_sent = context_sent or 'all'
+    if context_sent == 'none' or context_sent == 'last_1':
+        return turns[-1:] if turns else []
+    if context_sent == 'all':
+        return turns
+    budget = parse_budget(context_sent)
+    if budget is not None:
+        try:
+            if ledger is None:
+                ledger = [turn_tokens(t) for t in turns]
+        except Exception:
+            # No tokenizer available: send everything rather than guess
+            return turns
+        return budget_window(turns, ledger, *budget)
+    parts = str(context_sent).split('_')
+    if len(parts) == 2 and parts[1].isdigit():
+        n = int(parts[1])
+        if parts[0] == 'first':
+            return turns[:n]
+        elif parts[0] == 'last':
+            return turns[-n:]
+    # Default to returning all if the option is not recognized
+    return turns
 
 
 class ChatContext(InteractionContext):
@@ -8,6 +93,8 @@ class ChatContext(InteractionContext):
         self.context_data = context_data
         self.session = session
         self.conversation = []  # list to hold the file name and content
+        # Token ledger aligned with conversation: [turn, message, tokens or None]
+        self._ledger = []
 
     def add(self, message, role='user', context=None, extra=None):
         # If the conversation is empty and the role isn't 'user', insert a blank 'user' message first
@@ -64,6 +151,8 @@ class ChatContext(InteractionContext):
             meta['index'] = len(self.conversation) + 1
         turn['meta'] = meta
         self.conversation.append(turn)
+        # Counted lazily (token_ledger), so adding a turn never tokenizes
+        self._ledger.append([turn, turn.get('message'), None])
 
     @staticmethod
     def _short_id(index_hint: int | None, suffix_len: int = 4) -> str:
@@ -90,24 +179,46 @@ class ChatContext(InteractionContext):
         # Get fresh params each time
         params = self.session.get_params()
         context_sent = params.get('context_sent', 'all')
-        if context_sent == 'none' or context_sent == 'last_1':
-            return self.conversation[-1:] if self.conversation else []
-        elif context_sent == 'all':
-            return self.conversation
-        else:
-            parts = context_sent.split('_')
-            if len(parts) == 2 and parts[1].isdigit():
-                n = int(parts[1])
-                if parts[0] == 'first':
-                    return self.conversation[:n]
-                elif parts[0] == 'last':
-                    return self.conversation[-n:]
-
-        # Default to returning all if the option is not recognized
-        return self.conversation
+        ledger = None
+        if parse_budget(context_sent) is not None:
+            try:
+                ledger = self.token_ledger()
+            except Exception:
+                ledger = None
+        return select_window(self.conversation, context_sent, ledger)
+
+    def token_ledger(self) -> list:
+        """Tokens per turn (see `turn_tokens`), aligned with the conversation.
+
+        Each turn is counted once; entries follow adds and removals, and a
+        turn is recounted only if its message object was replaced or the
+        conversation list was swapped out (e.g. a session restore).
+        """
+        ledger = self._ledger
+        if len(ledger) != len(self.conversation) or any(
+                e[0] is not t for e, t in zip(ledger, self.conversation)):
+            known = {id(e[0]): e for e in ledger}
+            ledger = []
+            for turn in self.conversation:
+                entry = known.get(id(turn))
+                ledger.append(entry if entry is not None and entry[0] is turn else [turn, turn.get('message'), None])
+            self._ledger = ledger
+        out = []
+        for entry in ledger:
+            turn = entry[0]
+            if entry[2] is None or entry[1] is not turn.get('message'):
+                entry[1] = turn.get('message')
+                entry[2] = turn_tokens(turn)
+            out.append(entry[2])
+        return out
+
+    def token_total(self) -> int:
+        """Tokens of the whole conversation (all turns, regardless of context_sent)."""
+        return sum(self.token_ledger())
 
     def clear(self):
         self.conversation = []
+        self._ledger = []
 
     def remove_last_message(self):
         """
@@ -116,6 +227,8 @@ class ChatContext(InteractionContext):
         """
         if self.conversation:
             self.conversation.pop()
+            if self._ledger:
+                self._ledger.pop()
             return True
         return False
 
@@ -128,6 +241,7 @@ class ChatContext(InteractionContext):
         if n > 0:
             removed = min(n, len(self.conversation))
             self.conversation = self.conversation[:-removed]
+            self._ledger = self._ledger[:-removed]
             return removed
         return 0
 
@@ -138,6 +252,8 @@ class ChatContext(InteractionContext):
         """
         if self.conversation:
             self.conversation.pop(0)
+            if self._ledger:
+                self._ledger.pop(0)
             return True
         return False
 
@@ -150,5 +266,6 @@ class ChatContext(InteractionContext):
         if n > 0:
             removed = min(n, len(self.conversation))
             self.conversation = self.conversation[removed:]
+            self._ledger = self._ledger[removed:]
             return removed
         return 0
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from typing import Any, Dict, List, Optional
 
+from core.token_counter import context_token_counts
+
 
 def _get_token_counter(session):
     try:
@@ -25,25 +27,14 @@ def compute_context_tokens(session, contexts: Optional[List[Dict[str, Any]]]) ->
     """Compute total tokens across provided contexts (excluding images)."""
     if not contexts:
         return 0
-    total = 0
     counter = _get_token_counter(session)
-    for c in contexts:
-        try:
-            if not isinstance(c, dict):
-                continue
-            if c.get('type') == 'image':
-                continue
-            meta = c.get('context').get() if c.get('context') else None
-            if isinstance(meta, dict):
-                content = meta.get('content', '')
-                if content:
-                    try:
-                        total += int(counter.count_tiktoken(content)) if counter else 0
-                    except Exception:
-                        continue
-        except Exception:
-            continue
-    return total
+    objs = [c.get('context') for c in contexts if isinstance(c, dict) and c.get('type') != 'image' and c.get('context')]
+    if not objs or not counter:
+        return 0
+    try:
+        return sum(context_token_counts(counter, objs))
+    except Exception:
+        return 0
 
 
 def get_interactive_limit(session) -> Optional[int]:
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# Session user_data key holding the per-session cache
+RENDER_CACHE_KEY = '__render_cache__'
+# Safety cap; entries for turns that left the request are dropped on finish()
+DEFAULT_MAX_ENTRIES = 4096
+
+
+def _refs(turn: Dict[str, Any], contexts: Sequence[Dict[str, Any]]) -> Tuple[Any, ...]:
+    """Objects a rendering depends on, compared by identity.
+
+    Context objects hand out the same dict from get() and content strings
+    are immutable, so an unchanged turn yields the same objects; reloading a
+    file or replacing a message swaps one of them and forces a re-render.
+    """
+    out: List[Any] = [turn.get('message')]
+    for ctx in contexts:
+        obj = ctx.get('context')
+        try:
+            data = obj.get() if obj is not None else None
+        except Exception:
+            data = None
+        if isinstance(data, dict):
+            out.extend((ctx.get('type'), obj, data, data.get('content'), data.get('name')))
+        else:
+            out.extend((ctx.get('type'), obj, data, None, None))
+    return tuple(out)
+
+
+class TurnRenderCache:
+    """Memoized per-turn rendering of chat contexts for provider requests.
+
+    Providers render each turn's contexts (file contents, tool results,
+    project notes) into text on every request. This cache keys the rendered
+    text by the turn's stable `meta.id`, the identities of its contexts and a
+    provider-chosen `kind` (the renderer and any options that shape its
+    output), so only new or changed turns are rendered again.
+
+    Usage per request: `begin()`, one `render()` per turn (or context),
+    then `finish(component)`, which logs how much text was rebuilt versus
+    reused and forgets entries of the same kinds that the request no longer
+    needed (turns that were removed or fell out of the `context_sent` window).
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = int(max_entries)
+        self._entries: 'OrderedDict[Tuple[Any, ...], Tuple[str, Tuple[Any, ...], str]]' = OrderedDict()
+        self._touched: set = set()
+        self._kinds: set = set()
+        self.last: Dict[str, Any] = {}
+        self.totals: Dict[str, int] = {'requests': 0, 'rebuilt': 0, 'reused': 0, 'chars_rebuilt': 0, 'chars_reused': 0}
+        self._reset_request()
+
+    def _reset_request(self) -> None:
+        self._touched = set()
+        self._kinds = set()
+        self._request = {'rebuilt': 0, 'reused': 0, 'chars_rebuilt': 0, 'chars_reused': 0}
+
+    def begin(self) -> None:
+        """Start accounting for one request assembly."""
+        self._reset_request()
+
+    def render(
+        self,
+        turn: Dict[str, Any],
+        contexts: Sequence[Dict[str, Any]],
+        render_fn: Callable[[List[Dict[str, Any]]], str],
+        *,
+        kind: str,
+    ) -> str:
+        """Return render_fn(contexts) for this turn, reusing an earlier result
+        when neither the turn's message nor any of its contexts changed."""
+        contexts = list(contexts or [])
+        meta = turn.get('meta') if isinstance(turn, dict) else None
+        turn_id = meta.get('id') if isinstance(meta, dict) else None
+        refs = _refs(turn, contexts)
+        if turn_id is None:
+            # No stable id: key by the turn object itself (held in refs)
+            turn_id = ('@', id(turn))
+            refs = refs + (turn,)
+        key = (kind, turn_id, tuple(id(ctx.get('context')) for ctx in contexts))
+        self._touched.add(key)
+        self._kinds.add(kind)
+        entry = self._entries.get(key)
+        if entry is not None and len(entry[1]) == len(refs) and all(a is b for a, b in zip(entry[1], refs)):
+            self._entries.move_to_end(key)
+            self._request['reused'] += 1
+            self._request['chars_reused'] += len(entry[0])
+            return entry[0]
+        text = render_fn(contexts)
+        self._entries[key] = (text, refs, kind)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._request['rebuilt'] += 1
+        self._request['chars_rebuilt'] += len(text or '')
+        return text
+
+    def finish(self, component: str, session: Any = None) -> Dict[str, Any]:
+        """Close the request: drop stale entries, update totals and log a
+        `render_cache` messages event. Returns this request's counters."""
+        for key in [k for k, e in self._entries.items() if e[2] in self._kinds and k not in self._touched]:
+            del self._entries[key]
+        stats = dict(self._request, entries=len(self._entries))
+        self.totals['requests'] += 1
+        for name in ('rebuilt', 'reused', 'chars_rebuilt', 'chars_reused'):
+            self.totals[name] += stats[name]
+        self.last = stats
+        if session is not None and (stats['rebuilt'] or stats['reused']):
+            try:
+                session.utils.logger.messages_event('render_cache', stats, component=component)
+            except Exception:
+                pass
+        self._reset_request()
+        return stats
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._reset_request()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def get_render_cache(session: Any) -> TurnRenderCache:
+    """The session's render cache (created on first use)."""
+    cache: Optional[TurnRenderCache] = None
+    try:
+        cache = session.get_user_data(RENDER_CACHE_KEY)
+    except Exception:
+        cache = None
+    if not isinstance(cache, TurnRenderCache):
+        cache = TurnRenderCache()
+        try:
+            session.set_user_data(RENDER_CACHE_KEY, cache)
+        except Exception:
+            pass
+    return cache
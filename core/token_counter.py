@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import tiktoken
+
+
+DEFAULT_MODEL = 'gpt-4'
+FALLBACK_ENCODING = 'cl100k_base'
+DEFAULT_MAX_ENTRIES = 16384
+# Attribute set on context objects: (content, encoding name, token count)
+CONTEXT_ATTR = '_token_count'
+
+
+@functools.lru_cache(maxsize=32)
+def get_encoding(model: str = DEFAULT_MODEL):
+    """tiktoken encoding for `model` (cl100k_base for unknown models), resolved once."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding(FALLBACK_ENCODING)
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode('utf-8', errors='surrogatepass'), digest_size=16).digest()
+
+
+class TokenCounter:
+    """Token counts memoized by (encoding, content hash).
+
+    Hashing a text costs a small fraction of encoding it, so repeated counts
+    of the same context (summaries, input-size gates, tool events) encode it
+    once. Entries are a few dozen bytes each (no text is kept); the least
+    recently used are evicted beyond `max_entries`.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        encoding_fn: Callable[[str], Any] = get_encoding,
+    ) -> None:
+        self.max_entries = int(max_entries)
+        self.encoding_fn = encoding_fn
+        self._entries: 'OrderedDict[Tuple[str, bytes], int]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: Tuple[str, bytes]) -> Optional[int]:
+        with self._lock:
+            n = self._entries.get(key)
+            if n is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return n
+
+    def _store(self, key: Tuple[str, bytes], n: int) -> None:
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = n
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def count(self, text: Any, model: str = DEFAULT_MODEL) -> int:
+        """Tokens in `text` (non-strings are counted as str(text))."""
+        if text is None:
+            return 0
+        text = text if isinstance(text, str) else str(text)
+        if not text:
+            return 0
+        encoding = self.encoding_fn(model)
+        key = (encoding.name, _digest(text))
+        n = self._lookup(key)
+        if n is None:
+            n = len(encoding.encode(text, disallowed_special=()))
+            self._store(key, n)
+        return n
+
+    def count_many(self, texts: Sequence[Any], model: str = DEFAULT_MODEL) -> List[int]:
+        """Counts for many texts in one call; distinct misses are encoded as one batch."""
+        encoding = self.encoding_fn(model)
+        strs = ['' if t is None else (t if isinstance(t, str) else str(t)) for t in texts]
+        keys: List[Optional[Tuple[str, bytes]]] = [(encoding.name, _digest(s)) if s else None for s in strs]
+        out: List[int] = [0] * len(strs)
+        missing: Dict[Tuple[str, bytes], List[int]] = {}
+        for i, key in enumerate(keys):
+            if key is None:
+                continue
+            n = self._lookup(key)
+            if n is None:
+                missing.setdefault(key, []).append(i)
+            else:
+                out[i] = n
+        if missing:
+            batch = [strs[rows[0]] for rows in missing.values()]
+            encode_batch = getattr(encoding, 'encode_batch', None)
+            if callable(encode_batch):
+                encoded = encode_batch(batch, disallowed_special=())
+            else:
+                encoded = [encoding.encode(t, disallowed_special=()) for t in batch]
+            for (key, rows), tokens in zip(missing.items(), encoded):
+                self._store(key, len(tokens))
+                for i in rows:
+                    out[i] = len(tokens)
+        return out
+
+    def count_context(self, context: Any, model: str = DEFAULT_MODEL) -> int:
+        """Tokens in a context object's content, stored on the object.
+
+        The stored count is reused while the context still holds the same
+        content object; replacing the content (e.g. reloading a file)
+        counts it again.
+        """
+        return self.count_contexts([context], model)[0]
+
+    def count_contexts(self, contexts: Sequence[Any], model: str = DEFAULT_MODEL) -> List[int]:
+        """`count_context` for many context objects, counting misses in one batch."""
+        name = self.encoding_fn(model).name
+        out: List[int] = [0] * len(contexts)
+        pending: List[Tuple[int, Any, Any]] = []
+        for i, obj in enumerate(contexts):
+            try:
+                data = obj.get() if obj is not None else None
+            except Exception:
+                data = None
+            content = data.get('content') if isinstance(data, dict) else None
+            if not content:
+                continue
+            stored = getattr(obj, CONTEXT_ATTR, None)
+            if isinstance(stored, tuple) and len(stored) == 3 and stored[0] is content and stored[1] == name:
+                out[i] = stored[2]
+                continue
+            pending.append((i, obj, content))
+        if pending:
+            counts = self.count_many([content for _, _, content in pending], model)
+            for (i, obj, content), n in zip(pending, counts):
+                out[i] = n
+                try:
+                    setattr(obj, CONTEXT_ATTR, (content, name, n))
+                except Exception:
+                    pass
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / lookups) if lookups else 0.0,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_COUNTER: Optional[TokenCounter] = None
+_COUNTER_LOCK = threading.Lock()
+
+
+def get_token_counter() -> TokenCounter:
+    """Process-wide token counter shared by every session and action."""
+    global _COUNTER
+    with _COUNTER_LOCK:
+        if _COUNTER is None:
+            _COUNTER = TokenCounter()
+        return _COUNTER
+
+
+def context_token_counts(counter: Any, contexts: Sequence[Any]) -> List[int]:
+    """Token counts of context objects through a `count_tokens` action (or a
+    stand-in that only offers count_tiktoken); 0 where there is no content."""
+    batch = getattr(counter, 'count_contexts', None)
+    if callable(batch):
+        return [int(n) for n in batch(contexts)]
+    out: List[int] = []
+    for obj in contexts:
+        try:
+            data = obj.get() if obj is not None else None
+            content = data.get('content') if isinstance(data, dict) else None
+            out.append(int(counter.count_tiktoken(content)) if content and counter else 0)
+        except Exception:
+            out.append(0)
+    return out
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# Session user_data key holding the per-session cache
+TOOL_REGISTRY_KEY = '__tool_registry__'
+_PARTS = ('config', 'runtime_tools', 'agent_mode', 'dynamic_tools', 'user_actions')
+
+
+def _config_part(session: Any) -> Tuple[Any, ...]:
+    overrides = getattr(getattr(session, 'config', None), 'overrides', None) or {}
+    return tuple(sorted((str(k), repr(v)) for k, v in overrides.items()))
+
+
+def _runtime_tools_part(session: Any) -> Tuple[Any, ...]:
+    # [TOOLS] values set at runtime (`/set option-tools`, e.g. active_tools)
+    try:
+        runtime = session.get_user_data('tools') or {}
+    except Exception:
+        runtime = {}
+    if not isinstance(runtime, dict):
+        return ()
+    return tuple(sorted((str(k), repr(v)) for k, v in runtime.items()))
+
+
+def _agent_part(session: Any) -> Tuple[bool, bool]:
+    try:
+        agent = bool(session.in_agent_mode())
+    except Exception:
+        agent = False
+    try:
+        completion = bool(session.get_flag('completion_mode', False))
+    except Exception:
+        completion = False
+    return agent, completion
+
+
+def _dynamic_part(session: Any) -> Tuple[Any, ...]:
+    # MCP registration may update the same dict in place, so key by its entries
+    try:
+        dyn = session.get_user_data('__dynamic_tools__') or {}
+    except Exception:
+        dyn = {}
+    if not isinstance(dyn, dict) or not dyn:
+        return ()
+    return (id(dyn),) + tuple((k, id(v)) for k, v in dyn.items())
+
+
+def _user_actions_part(session: Any) -> Tuple[Any, ...]:
+    registry = getattr(session, '_registry', None)
+    fn = getattr(registry, 'user_actions_signature', None)
+    try:
+        return tuple(fn()) if callable(fn) else ()
+    except Exception:
+        return ()
+
+
+def registry_key(session: Any) -> Tuple[Tuple[Any, ...], ...]:
+    """Everything the resolved tool registry depends on, cheap to compute:
+    config overrides, runtime [TOOLS] values, agent/completion mode,
+    MCP-registered dynamic tools and the user actions directory listing
+    (names, mtimes, sizes)."""
+    return (
+        _config_part(session), _runtime_tools_part(session), _agent_part(session),
+        _dynamic_part(session), _user_actions_part(session),
+    )
+
+
+class ToolRegistryCache:
+    """Resolved assistant tool registry and canonical tool specs for a session.
+
+    Building the registry lists the actions directory, loads each `*_tool`
+    class and evaluates `can_run`/`tool_spec`; it is needed several times per
+    turn (tool execution, every provider request, tool-mode checks). The
+    result is kept until `registry_key` changes. Rebuilds are counted per
+    turn (a turn is one `__turn_cancel__` token) and logged as an actions
+    `tool_registry` event with the reason.
+    """
+
+    def __init__(self) -> None:
+        self._key: Optional[Tuple[Tuple[Any, ...], ...]] = None
+        self._commands: Optional[Dict[str, Any]] = None
+        self._specs: Optional[Tuple[List[Dict[str, Any]], Dict[str, str]]] = None
+        self._turn: Any = None
+        self.stats: Dict[str, int] = {'builds': 0, 'hits': 0, 'spec_builds': 0, 'turn_rebuilds': 0}
+
+    def _check(self, session: Any) -> Optional[str]:
+        """Drop stale results; return why (None while still valid)."""
+        key = registry_key(session)
+        if self._key == key and self._commands is not None:
+            return None
+        if self._key is None:
+            reason = 'initial'
+        else:
+            reason = ','.join(n for n, a, b in zip(_PARTS, self._key, key) if a != b) or 'invalidated'
+            if self._key[-1] != key[-1]:
+                self._forget_user_actions(session, self._key[-1], key[-1])
+        self._key = key
+        self._commands = None
+        self._specs = None
+        return reason
+
+    @staticmethod
+    def _forget_user_actions(session: Any, old: Tuple[Any, ...], new: Tuple[Any, ...]) -> None:
+        # Edited/added/removed user action files must be loaded again, not just relisted
+        registry = getattr(session, '_registry', None)
+        forget = getattr(registry, 'forget_actions', None)
+        if not callable(forget):
+            return
+        old_files = set(old[1]) if len(old) > 1 else set()
+        new_files = set(new[1]) if len(new) > 1 else set()
+        try:
+            forget({entry[0] for entry in old_files ^ new_files})
+        except Exception:
+            pass
+
+    def commands(self, session: Any, build_fn: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """The tool registry (a copy; entries are shared), built with
+        `build_fn` only when missing or stale."""
+        reason = self._check(session)
+        if self._commands is None:
+            self._commands = dict(build_fn() or {})
+            self._record_build(session, reason or 'invalidated')
+        else:
+            self.stats['hits'] += 1
+        return dict(self._commands)
+
+    def specs(
+        self,
+        session: Any,
+        build_fn: Callable[[], Tuple[List[Dict[str, Any]], Dict[str, str]]],
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        """Canonical tool specs and their API name → command map, built
+        with `build_fn` once per registry build."""
+        self._check(session)
+        if self._specs is None:
+            specs, name_map = build_fn()
+            self._specs = (list(specs), dict(name_map))
+            self.stats['spec_builds'] += 1
+        specs, name_map = self._specs
+        return [dict(s) for s in specs], dict(name_map)
+
+    def invalidate(self) -> None:
+        self._key = None
+        self._commands = None
+        self._specs = None
+
+    def _record_build(self, session: Any, reason: str) -> None:
+        self.stats['builds'] += 1
+        try:
+            turn = session.get_user_data('__turn_cancel__')
+        except Exception:
+            turn = None
+        if turn is not self._turn:
+            self._turn = turn
+            self.stats['turn_rebuilds'] = 0
+        self.stats['turn_rebuilds'] += 1
+        try:
+            session.utils.logger.action_event('tool_registry', {
+                'reason': reason,
+                'tools': len(self._commands or {}),
+                'builds': self.stats['builds'],
+                'turn_rebuilds': self.stats['turn_rebuilds'],
+            }, component='actions.assistant_commands')
+        except Exception:
+            pass
+
+
+def get_tool_registry(session: Any) -> ToolRegistryCache:
+    """The session's tool registry cache (created on first use)."""
+    cache: Optional[ToolRegistryCache] = None
+    try:
+        cache = session.get_user_data(TOOL_REGISTRY_KEY)
+    except Exception:
+        cache = None
+    if not isinstance(cache, ToolRegistryCache):
+        cache = ToolRegistryCache()
+        try:
+            session.set_user_data(TOOL_REGISTRY_KEY, cache)
+        except Exception:
+            pass
+    return cache
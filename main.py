@@ -525,6 +525,33 @@ def list_sessions(ctx):
         raise click.ClickException(f"Failed to list sessions: {err}")
 
 
+@cli.group()
+@click.pass_context
+def rag(ctx):
+    """RAG index maintenance."""
+    return
+
+
+@rag.command("watch")
+@click.pass_context
+@click.argument("name", required=False)
+@click.option("--poll", is_flag=True, default=False, help="Use the polling watcher instead of inotify.")
+def rag_watch(ctx, name, poll):
+    """Keep RAG indexes updated as their files change (Ctrl-C to stop)."""
+    builder = ctx.obj['BUILDER']
+    options = ctx.obj.get('OPTIONS', {})
+    try:
+        session = builder.build(mode='completion', **options)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    action = session.get_action('rag_watch')
+    if action is None or not action.can_run(session):
+        raise click.ClickException("RAG is not active. Set [RAG].active = true and configure indexes.")
+    args = ([name] if name else []) + (['poll'] if poll else [])
+    if action.run(args) is False:
+        raise click.ClickException("rag watch could not start (see messages above).")
+
+
 @cli.group()
 @click.pass_context
 def logs(ctx):
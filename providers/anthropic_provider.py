@@ -4,6 +4,7 @@ from dataclasses import dataclass
 from typing import List, Dict, Any, Generator
 from anthropic import Anthropic
 from base_classes import APIProvider
+from core.render_cache import get_render_cache
 
 
 @dataclass
@@ -92,6 +93,8 @@ class AnthropicProvider(APIProvider):
         if not chat:
             return messages
 
+        render_cache = get_render_cache(self.session)
+        render_cache.begin()
         chat_turns = chat.get()
         for i, turn in enumerate(chat_turns):
             role = turn.get('role')
@@ -104,7 +107,7 @@ class AnthropicProvider(APIProvider):
                 try:
                     # Include any processed context first (as text)
                     if context:
-                        processed_context = self._process_context(context)
+                        processed_context = self._render_context(render_cache, turn, context)
                         if processed_context:
                             content_blocks.append({'type': 'text', 'text': processed_context})
                 except Exception:
@@ -155,7 +158,7 @@ class AnthropicProvider(APIProvider):
                         })
                     else:
                         # Accumulate non-image contexts for text processing
-                        processed_context = self._process_context([ctx])
+                        processed_context = self._render_context(render_cache, turn, [ctx])
                         if processed_context:
                             content_blocks.append({
                                 'type': 'text',
@@ -185,8 +188,15 @@ class AnthropicProvider(APIProvider):
                     'content': content_blocks
                 })
 
+        render_cache.finish('providers.anthropic', self.session)
         return messages
 
+    def _render_context(self, render_cache, turn: Dict[str, Any], context: Any) -> str:
+        """`_process_context` through the per-turn render cache (lists only)."""
+        if not isinstance(context, list):
+            return self._process_context(context)
+        return render_cache.render(turn, context, self._process_context, kind='anthropic')
+
     @staticmethod
     def _process_context(context: Any) -> str:
         try:
@@ -4,6 +4,7 @@ from google import genai
 from google.genai import types as gx_types
 from base_classes import APIProvider
 from actions.process_contexts_action import ProcessContextsAction
+from core.render_cache import get_render_cache
 
 
 class GoogleProvider(APIProvider):
@@ -413,6 +414,8 @@ class GoogleProvider(APIProvider):
     def assemble_message(self) -> list:
         """Assemble the message from context"""
         message = []
+        render_cache = get_render_cache(self.session)
+        render_cache.begin()
         if self.session.get_context('prompt'):
             message.append({
                 'role': 'model',
@@ -443,7 +446,8 @@ class GoogleProvider(APIProvider):
 
                     # Add text contexts
                     if turn_contexts:
-                        text_context = ProcessContextsAction.process_contexts_for_assistant(turn_contexts)
+                        text_context = render_cache.render(
+                            turn, turn_contexts, ProcessContextsAction.process_contexts_for_assistant, kind='results')
                         if text_context:
                             parts.insert(0, {'text': text_context})
 
@@ -461,6 +465,7 @@ class GoogleProvider(APIProvider):
                     if 'tool_calls' in turn:
                         entry['tool_calls'] = turn.get('tool_calls')
                     message.append(entry)
+        render_cache.finish('providers.google', self.session)
         return message
 
     def get_full_response(self):
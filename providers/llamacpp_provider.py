@@ -1,6 +1,8 @@
 import traceback
 from time import time
 from base_classes import APIProvider
+from actions.process_contexts_action import ProcessContextsAction
+from core.render_cache import get_render_cache
 from llama_cpp import Llama
 from llama_cpp.llama_speculative import LlamaPromptLookupDecoding
 import io
@@ -10,6 +12,8 @@ from providers.llamacpp_draft_model import LlamaSmallModelDraftWithMetrics
 import os
 from typing import List, Optional
 
+import numpy as np
+
 
 class LlamaCppProvider(APIProvider):
     """
@@ -43,6 +47,8 @@ class LlamaCppProvider(APIProvider):
         # Embedding instance cache (separate from chat llm when needed)
         self._embed_llm = None
         self._embed_model_path = None
+        # Embedding model paths whose batch decode failed (per-item from then on)
+        self._embed_batch_failed = set()
 
         # Defer chat model initialization until first chat() call
         self.llm = None
@@ -378,12 +384,18 @@ class LlamaCppProvider(APIProvider):
     def embed(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
         """Create embeddings using llama.cpp locally.
 
-        Robust to models that only expose token-level embeddings by pooling.
-        Processes inputs one-by-one to avoid batch decode edge cases.
+        Inputs are packed several sequences per decode (up to the context's
+        n_batch / n_ctx, see `_embed_batched`). Models that fail batch decode
+        fall back to one input at a time for the rest of the session (also
+        forced with the `embed_batch = false` param). Token-level outputs are
+        mean-pooled.
         """
         # Coerce single string inputs defensively
         if isinstance(texts, str):
             texts = [texts]
+        texts = list(texts)
+        if not texts:
+            return []
 
         # Decide model path
         model_path: Optional[str] = None
@@ -395,62 +407,109 @@ class LlamaCppProvider(APIProvider):
 
         llm = self._get_embed_llm(model_path)
 
-        def _pool(vec_or_token_vecs):
-            # If already a single vector [dim], return as floats
-            if isinstance(vec_or_token_vecs, list) and vec_or_token_vecs and isinstance(vec_or_token_vecs[0], (int, float)):
-                return [float(x) for x in vec_or_token_vecs]
-            # If token-level [[dim], ...], mean-pool
-            if isinstance(vec_or_token_vecs, list) and vec_or_token_vecs and isinstance(vec_or_token_vecs[0], list):
-                # mean over tokens
-                token_vecs = vec_or_token_vecs
-                if not token_vecs:
-                    return []
-                dim = len(token_vecs[0])
-                agg = [0.0] * dim
-                n = 0
-                for tv in token_vecs:
-                    # guard ragged output
-                    if len(tv) != dim:
-                        dim = min(dim, len(tv))
-                        tv = tv[:dim]
-                        agg = agg[:dim]
-                    for i, val in enumerate(tv):
-                        agg[i] += float(val)
-                    n += 1
-                if n == 0:
-                    return []
-                return [v / n for v in agg]
-            return []
-
-        out: List[List[float]] = []
-        for t in texts:
-            vec = None
-            # Prefer llama.cpp embed() per-item
+        vecs = None
+        if self._embed_batch_enabled(model_path):
             try:
-                if hasattr(llm, 'embed'):
-                    buf = io.StringIO()
-                    with redirect_stderr(buf):
-                        res = llm.embed(t, truncate=True)
-                    vec = _pool(res)
+                vecs = self._embed_batched(llm, texts)
             except Exception:
+                # Remember: later calls go straight to the per-item path
+                self._embed_batch_failed.add(model_path)
+                vecs = None
+        if vecs is None:
+            vecs = self._embed_per_item(llm, texts)
+        return [v.tolist() for v in vecs]
+
+    def _embed_batch_enabled(self, model_path: Optional[str]) -> bool:
+        try:
+            flag = self.session.get_params().get('embed_batch', True)
+        except Exception:
+            flag = True
+        if isinstance(flag, str):
+            flag = flag.strip().lower() not in ('0', 'false', 'no', 'off')
+        return bool(flag) and model_path not in self._embed_batch_failed
+
+    @staticmethod
+    def _pool(res) -> Optional[np.ndarray]:
+        """One float32 vector from a pooled [dim] or token-level [[dim], ...] output."""
+        if isinstance(res, dict) and 'data' in res:
+            data = res.get('data') or []
+            res = (data[0].get('embedding') or []) if data else []
+        if res is None or len(res) == 0:
+            return None
+        try:
+            arr = np.asarray(res, dtype=np.float32)
+        except ValueError:
+            # Ragged token vectors: keep the common prefix of dims
+            dim = min(len(tv) for tv in res)
+            arr = np.asarray([tv[:dim] for tv in res], dtype=np.float32)
+        if arr.ndim == 2:
+            arr = arr.mean(axis=0) if arr.shape[0] else None
+        if arr is None or arr.ndim != 1 or not arr.size:
+            return None
+        return arr
+
+    @staticmethod
+    def _embed_limits(llm) -> tuple:
+        """(tokens per decode, sequences per decode) for the embedding context."""
+        n_ctx = int(llm.n_ctx()) if callable(getattr(llm, 'n_ctx', None)) else 0
+        n_batch = int(getattr(llm, 'n_batch', 0) or 0) or n_ctx or 512
+        n_tokens = min(n_batch, n_ctx) if n_ctx else n_batch
+        n_seq = int(getattr(getattr(llm, 'context_params', None), 'n_seq_max', 0) or 0)
+        return max(1, n_tokens), (n_seq if n_seq > 0 else None)
+
+    def _embed_batched(self, llm, texts: List[str]) -> List[np.ndarray]:
+        """Embed texts in groups that fit one decode each.
+
+        Texts are tokenized once to size the groups: a group holds as many
+        consecutive inputs as fit in n_batch tokens (and the context's
+        sequence limit), and llama.cpp decodes each group in a single batch.
+        """
+        n_tokens, n_seq = self._embed_limits(llm)
+        counts = [min(len(llm.tokenize(t.encode('utf-8'), add_bos=True)), n_tokens) for t in texts]
+        groups: List[List[int]] = []
+        used = 0
+        for i, c in enumerate(counts):
+            if groups and used + c <= n_tokens and (n_seq is None or len(groups[-1]) < n_seq):
+                groups[-1].append(i)
+                used += c
+            else:
+                groups.append([i])
+                used = c
+
+        out: List[np.ndarray] = []
+        buf = io.StringIO()
+        with redirect_stderr(buf):
+            for group in groups:
+                res = llm.embed([texts[i] for i in group], truncate=True)
+                if len(res) != len(group):
+                    raise RuntimeError('llama.cpp returned a partial embedding batch')
+                for r in res:
+                    vec = self._pool(r)
+                    if vec is None:
+                        raise RuntimeError('llama.cpp returned an empty embedding')
+                    out.append(vec)
+        return out
+
+    def _embed_per_item(self, llm, texts: List[str]) -> List[np.ndarray]:
+        """One decode per input: embed(), then create_embedding() as fallback."""
+        out: List[np.ndarray] = []
+        buf = io.StringIO()
+        with redirect_stderr(buf):
+            for t in texts:
                 vec = None
-            # Fallback to create_embedding per-item
-            if not vec:
                 try:
-                    buf = io.StringIO()
-                    with redirect_stderr(buf):
-                        resp = llm.create_embedding(t)
-                    if isinstance(resp, dict) and 'data' in resp:
-                        data = resp.get('data') or []
-                        if data:
-                            vec = [float(x) for x in (data[0].get('embedding') or [])]
-                    else:
-                        vec = _pool(resp)
+                    if hasattr(llm, 'embed'):
+                        vec = self._pool(llm.embed(t, truncate=True))
                 except Exception:
                     vec = None
-            if not vec:
-                raise RuntimeError('Failed to compute embedding with llama.cpp')
-            out.append(vec)
+                if vec is None:
+                    try:
+                        vec = self._pool(llm.create_embedding(t))
+                    except Exception:
+                        vec = None
+                if vec is None:
+                    raise RuntimeError('Failed to compute embedding with llama.cpp')
+                out.append(vec)
         return out
 
     def assemble_message(self) -> list:
@@ -458,6 +517,8 @@ class LlamaCppProvider(APIProvider):
         Assemble messages for llama-cpp API from the session context
         """
         message = []
+        render_cache = get_render_cache(self.session)
+        render_cache.begin()
         if self.session.get_context('prompt'):
             params = self.session.get_params()
 
@@ -476,14 +537,21 @@ class LlamaCppProvider(APIProvider):
         chat = self.session.get_context('chat')
         if chat is not None:
             for turn in chat.get():
-                turn_context = ''
-                if 'context' in turn and turn['context']:
-                    turn_context = self.session.get_action('process_contexts').process_contexts_for_assistant(
-                        turn['context'])
-                message.append({'role': turn['role'], 'content': turn_context + "\n" + turn['message']})
+                content = render_cache.render(
+                    turn, turn.get('context') or [], lambda ctxs, turn=turn: self._turn_content(ctxs, turn['message']),
+                    kind='llamacpp')
+                message.append({'role': turn['role'], 'content': content})
 
+        render_cache.finish('providers.llamacpp', self.session)
         return message
 
+    @staticmethod
+    def _turn_content(turn_contexts: list, turn_message: str) -> str:
+        turn_context = ''
+        if turn_contexts:
+            turn_context = ProcessContextsAction.process_contexts_for_assistant(turn_contexts)
+        return turn_context + "\n" + turn_message
+
     def get_messages(self):
         return self.assemble_message()
 
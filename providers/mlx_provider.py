@@ -3,6 +3,7 @@ import os
 import traceback
 from base_classes import APIProvider
 from actions.process_contexts_action import ProcessContextsAction
+from core.render_cache import get_render_cache
 
 try:
     # Suppress Hugging Face tokenizers fork warning by explicitly setting parallelism behavior
@@ -241,6 +242,8 @@ class MlxProvider(APIProvider):
         Assemble messages from session context
         """
         messages = []
+        render_cache = get_render_cache(self.session)
+        render_cache.begin()
 
         # Add system/developer prompt
         if self.session.get_context('prompt'):
@@ -256,21 +259,26 @@ class MlxProvider(APIProvider):
         chat = self.session.get_context('chat')
         if chat is not None:
             for turn in chat.get():
-                turn_context = ''
-                if 'context' in turn and turn['context']:
-                    # Process contexts (text only - MLX doesn't handle images directly)
-                    text_contexts = [ctx for ctx in turn['context'] if ctx['type'] != 'image']
-                    if text_contexts:
-                        turn_context = ProcessContextsAction.process_contexts_for_assistant(text_contexts)
-                        turn_context += "\n\n" if turn_context else ""
-
-                content = turn_context + turn['message']
-                if content.strip() == '':
-                    content = ' '
+                # Process contexts (text only - MLX doesn't handle images directly)
+                text_contexts = [ctx for ctx in (turn.get('context') or []) if ctx['type'] != 'image']
+                content = render_cache.render(
+                    turn, text_contexts, lambda ctxs, turn=turn: self._turn_content(ctxs, turn['message']), kind='mlx')
                 messages.append({'role': turn['role'], 'content': content})
 
+        render_cache.finish('providers.mlx', self.session)
         return messages
 
+    @staticmethod
+    def _turn_content(text_contexts: list, turn_message: str) -> str:
+        turn_context = ''
+        if text_contexts:
+            turn_context = ProcessContextsAction.process_contexts_for_assistant(text_contexts)
+            turn_context += "\n\n" if turn_context else ""
+        content = turn_context + turn_message
+        if content.strip() == '':
+            content = ' '
+        return content
+
     def _messages_to_prompt(self, messages):
         """
         Convert messages to a prompt string using MLX-LM's chat template support
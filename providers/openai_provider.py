@@ -4,6 +4,7 @@ import openai
 from openai import OpenAI
 from base_classes import APIProvider
 from actions.process_contexts_action import ProcessContextsAction
+from core.render_cache import get_render_cache
 from typing import List, Optional
 
 
@@ -407,6 +408,8 @@ class OpenAIProvider(APIProvider):
         :return: message (list)
         """
         message = []
+        render_cache = get_render_cache(self.session)
+        render_cache.begin()
         if self.session.get_context('prompt'):
             # Use 'system' or 'developer' based on provider configuration
             role = 'system' if self.session.get_params().get('use_old_system_role', False) else 'developer'
@@ -455,26 +458,11 @@ class OpenAIProvider(APIProvider):
                     continue
                 # For simple format, we'll use a single string for content
                 if use_simple_format:
-                    turn_content = ""
-
-                    # Process contexts if any exist
-                    if 'context' in turn and turn['context']:
-                        turn_contexts = []
-                        for ctx in turn['context']:
-                            # Image context is not supported in simple format
-                            if ctx['type'] != 'image':
-                                turn_contexts.append(ctx)
-
-                        # Add text contexts
-                        if turn_contexts:
-                            text_context = ProcessContextsAction.process_contexts_for_assistant(turn_contexts)
-                            if text_context:
-                                turn_content += text_context + "\n\n"
-
-                    # Add the message text
-                    turn_content += turn['message']
-                    if turn_content.strip() == '':
-                        turn_content = ' '  # Replace empty content with a space
+                    # Image context is not supported in simple format
+                    turn_contexts = [ctx for ctx in (turn.get('context') or []) if ctx['type'] != 'image']
+                    turn_content = render_cache.render(
+                        turn, turn_contexts, lambda ctxs, turn=turn: self._simple_turn_content(ctxs, turn['message']),
+                        kind='openai.simple')
                     message.append({'role': turn['role'], 'content': turn_content})
                 else:
                     # Modern format with content array
@@ -511,14 +499,30 @@ class OpenAIProvider(APIProvider):
 
                         # Add text contexts if any exist
                         if turn_contexts:
-                            text_context = ProcessContextsAction.process_contexts_for_assistant(turn_contexts)
+                            text_context = render_cache.render(
+                                turn, turn_contexts, ProcessContextsAction.process_contexts_for_assistant,
+                                kind='results')
                             if text_context:
                                 content.insert(0, {'type': 'text', 'text': text_context})
 
                     message.append({'role': turn['role'], 'content': content})
 
+        render_cache.finish('providers.openai', self.session)
         return message
 
+    @staticmethod
+    def _simple_turn_content(turn_contexts: list, turn_message: str) -> str:
+        """Single-string turn content: rendered contexts, then the message."""
+        turn_content = ""
+        if turn_contexts:
+            text_context = ProcessContextsAction.process_contexts_for_assistant(turn_contexts)
+            if text_context:
+                turn_content += text_context + "\n\n"
+        turn_content += turn_message
+        if turn_content.strip() == '':
+            turn_content = ' '  # Replace empty content with a space
+        return turn_content
+
     def get_messages(self):
         return self.assemble_message()
 
@@ -6,6 +6,7 @@ from openai import OpenAI
 
 from base_classes import APIProvider
 from actions.process_contexts_action import ProcessContextsAction
+from core.render_cache import get_render_cache
 
 
 class OpenAIResponsesProvider(APIProvider):
@@ -199,6 +200,8 @@ class OpenAIResponsesProvider(APIProvider):
 
         turns = chat.get()
         import json
+        render_cache = get_render_cache(self.session)
+        render_cache.begin()
 
         # When chaining with previous_response_id and minimization is enabled,
         # include only the turns that occurred after the last assistant reply
@@ -286,7 +289,8 @@ class OpenAIResponsesProvider(APIProvider):
                         continue
                     other_contexts.append(ctx)
                 if other_contexts:
-                    summarized = ProcessContextsAction.process_contexts_for_assistant(other_contexts)
+                    summarized = render_cache.render(
+                        turn, other_contexts, ProcessContextsAction.process_contexts_for_assistant, kind='results')
                     if summarized:
                         text_parts.append(str(summarized))
 
@@ -298,6 +302,7 @@ class OpenAIResponsesProvider(APIProvider):
                 if role in ('user', 'assistant'):
                     input_items.append({'role': role, 'content': merged})
 
+        render_cache.finish('providers.openairesponses', self.session)
         return input_items
 
     # --- API calls ------------------------------------------------------
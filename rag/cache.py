@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .vector_store import GENERATION_FILE, read_generation
+
+
+DEFAULT_CACHE_MB = 512
+# Waiting for a writer to finish swapping an index's artifacts (see NaiveStore.publishing)
+_PUBLISH_RETRIES = 50
+_PUBLISH_WAIT_S = 0.02
+# Budget charge per memory-mapped array: its pages are file-backed and
+# reclaimable by the OS, so only the mapping itself counts against cache_mb
+_MAPPED_NOMINAL_BYTES = 64 * 1024
+
+_ARTIFACTS = (
+    'manifest.json', 'chunks.npz', 'chunks.jsonl', 'files.jsonl', 'embeddings.npy', 'embeddings.json',
+    'ivf_centroids.npy', 'ivf_lists.npy', 'ivf_offsets.npy',
+    'lex_terms.json', 'lex_postings.npy', 'lex_offsets.npy',
+    'codes_int8.npy', 'codes_binary.npy', GENERATION_FILE,
+)
+
+
+def _stamp(index_dir: str) -> Tuple[Tuple[str, int, int], ...]:
+    """Cheap change detector for an index: (name, mtime_ns, size) per artifact.
+
+    The manifest is rewritten with a fresh `updated` on every `rag update`, so
+    its mtime alone already invalidates; the other files guard manual edits.
+    """
+    out: List[Tuple[str, int, int]] = []
+    for name in _ARTIFACTS:
+        try:
+            st = os.stat(os.path.join(index_dir, name))
+        except OSError:
+            continue
+        out.append((name, st.st_mtime_ns, st.st_size))
+    return tuple(out)
+
+
+def _is_mapped(arr: np.ndarray) -> bool:
+    """True when the array's memory is a file mapping (np.load mmap_mode, views of it)."""
+    obj: Any = arr
+    while obj is not None:
+        if isinstance(obj, (np.memmap, mmap.mmap)):
+            return True
+        obj = getattr(obj, 'base', None)
+    return False
+
+
+def _estimate_bytes(index_dir: str, value: Any, kind: str) -> Tuple[int, int]:
+    """(budget bytes, mapped bytes) of a loaded index.
+
+    Heap array payloads (including arrays held as attributes) and objects
+    that report their own `nbytes` (the columnar chunk table) count in full.
+    Memory-mapped arrays (e.g. `embeddings.npy`) are file-backed pages the OS
+    can drop, so they add only `_MAPPED_NOMINAL_BYTES` to the budget and
+    their size is reported separately.
+    """
+    total = 0
+    mapped = 0
+    if isinstance(value, tuple):
+        items = list(value)
+    elif hasattr(value, '__dict__'):
+        items = list(vars(value).values())
+    else:
+        items = [value]
+    for it in items:
+        if isinstance(it, np.ndarray):
+            if _is_mapped(it):
+                mapped += int(it.nbytes)
+                total += _MAPPED_NOMINAL_BYTES
+            else:
+                total += int(it.nbytes)
+        elif isinstance(getattr(it, 'nbytes', None), int):
+            total += it.nbytes
+    return total, mapped
+
+
+def _load_published(path: str, loader: Callable[[str], Any]) -> Tuple[Any, Tuple[Tuple[str, int, int], ...], int]:
+    """(value, stamp, generation) from a load that no writer overlapped.
+
+    Retries while the index is mid-publish; after `_PUBLISH_RETRIES` (e.g. a
+    writer that died mid-swap) the last load is returned as is.
+    """
+    for _ in range(_PUBLISH_RETRIES):
+        gen = read_generation(path)
+        if gen % 2 == 0:
+            stamp = _stamp(path)
+            value = loader(path)
+            if read_generation(path) == gen:
+                return value, stamp, gen
+        time.sleep(_PUBLISH_WAIT_S)
+    stamp = _stamp(path)
+    return loader(path), stamp, read_generation(path)
+
+
+class IndexCache:
+    """Process-wide LRU cache of loaded RAG indexes.
+
+    Entries are keyed by absolute index dir (plus a `kind`, e.g. 'index' for
+    chunks/vectors or 'ivf' for ANN lists) and validated against the
+    artifact stamp on every lookup, so a rebuilt index is reloaded without
+    explicit coordination. `max_bytes <= 0` disables caching.
+
+    `max_bytes` budgets heap memory: loaded chunk tables, IVF lists and
+    in-memory arrays. Memory-mapped artifacts cost a nominal amount each
+    (their pages are file-backed), and their total size is reported as
+    `mapped_bytes` in `stats()`.
+
+    Loads never overlap a writer's `NaiveStore.publishing()` block. Passing
+    the `generation` of an already loaded artifact (e.g. the manifest's)
+    returns None instead of a value from a different generation, so one
+    search never combines artifacts from two updates.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_MB * 1024 * 1024) -> None:
+        self.max_bytes = int(max_bytes)
+        self._entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._bytes = 0
+        self._mapped = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def set_max_bytes(self, max_bytes: int) -> None:
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            self._evict_locked()
+
+    def get(
+        self,
+        index_dir: str,
+        loader: Callable[[str], Any],
+        kind: str = 'index',
+        generation: Optional[int] = None,
+    ) -> Any:
+        path = os.path.abspath(os.path.expanduser(index_dir))
+        key = f"{path}#{kind}"
+        stamp = _stamp(path)
+        with self._lock:
+            ent = self._entries.get(key)
+            if ent is not None and ent['stamp'] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return ent['value'] if generation in (None, ent['gen']) else None
+            if ent is not None:
+                self._drop_locked(key)
+                self.invalidations += 1
+            self.misses += 1
+        value, stamp, gen = _load_published(path, loader)
+        if self.max_bytes > 0 and stamp:
+            size, mapped = _estimate_bytes(path, value, kind)
+            if size <= self.max_bytes:
+                with self._lock:
+                    if key in self._entries:
+                        self._drop_locked(key)
+                    self._entries[key] = {'stamp': stamp, 'value': value, 'bytes': size, 'mapped': mapped, 'gen': gen}
+                    self._bytes += size
+                    self._mapped += mapped
+                    self._evict_locked()
+        return value if generation in (None, gen) else None
+
+    def invalidate(self, index_dir: Optional[str] = None) -> None:
+        """Drop one index (or all when index_dir is None)."""
+        with self._lock:
+            if index_dir is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._bytes = 0
+                self._mapped = 0
+                return
+            path = os.path.abspath(os.path.expanduser(index_dir))
+            for key in [k for k in self._entries if k.rsplit('#', 1)[0] == path]:
+                self._drop_locked(key)
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'mapped_bytes': self._mapped,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+    def _drop_locked(self, key: str) -> None:
+        ent = self._entries.pop(key, None)
+        if ent is not None:
+            self._bytes -= int(ent.get('bytes') or 0)
+            self._mapped -= int(ent.get('mapped') or 0)
+
+    def _evict_locked(self) -> None:
+        while self._entries and self._bytes > max(0, self.max_bytes):
+            key = next(iter(self._entries))
+            self._drop_locked(key)
+            self.evictions += 1
+
+
+_INDEX_CACHE = IndexCache()
+
+
+def get_index_cache() -> IndexCache:
+    return _INDEX_CACHE
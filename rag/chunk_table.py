@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+CHUNK_TABLE_FILE = 'chunks.npz'
+# Buffered new records per builder part (bounds Python dicts held during an update)
+_FLUSH_ROWS = 65536
+_SHA1_BYTES = 20
+
+
+def _pack_strings(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """UTF-8 blob plus (n + 1) offsets for a list of strings."""
+    encoded = [v.encode('utf-8') for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    blob = np.frombuffer(b''.join(encoded), dtype=np.uint8) if encoded else np.zeros(0, dtype=np.uint8)
+    return blob, offsets
+
+
+def _unpack_string(blob: np.ndarray, offsets: np.ndarray, i: int) -> str:
+    return blob[int(offsets[i]):int(offsets[i + 1])].tobytes().decode('utf-8')
+
+
+def _sha1_bytes(hashes: Sequence[str]) -> Optional[np.ndarray]:
+    """(n x 20) digests when every hash is a 40-char hex SHA-1, else None."""
+    out = np.zeros((len(hashes), _SHA1_BYTES), dtype=np.uint8)
+    for i, h in enumerate(hashes):
+        if not isinstance(h, str) or len(h) != 2 * _SHA1_BYTES:
+            return None
+        try:
+            out[i] = np.frombuffer(bytes.fromhex(h), dtype=np.uint8)
+        except ValueError:
+            return None
+        if out[i].tobytes().hex() != h:
+            return None  # upper-case hex would not round-trip
+    return out
+
+
+class ChunkTable:
+    """Columnar chunk metadata, row-aligned with embeddings.npy.
+
+    Paths are interned once in a string table; per-chunk fields are NumPy
+    columns (path/source ids, char offsets, line and byte positions) and chunk
+    hashes are raw 20-byte SHA-1 digests. Indexing returns the same record
+    dicts that chunks.jsonl held ({path, start, end, hash, lines?, bytes?,
+    source_path?}), built on access, so a loaded index costs tens of bytes per
+    chunk instead of a Python dict each.
+
+    Hashes that are not hex SHA-1 digests (hand-written fixtures) are kept as
+    a packed string column instead.
+
+    `dup_of` (optional, set by deduplicating updates) holds each row's
+    canonical duplicate row, -1 for canonical rows; `dup_shared` marks the
+    duplicates whose vector is the canonical row's vector. Row ids are
+    absolute, so `rows()` and `concat()` drop both.
+    """
+
+    def __init__(
+        self,
+        paths: List[str],
+        path_id: np.ndarray,
+        source_id: np.ndarray,
+        start: np.ndarray,
+        end: np.ndarray,
+        lines: np.ndarray,
+        byte_pos: np.ndarray,
+        hash_bin: Optional[np.ndarray] = None,
+        hash_blob: Optional[np.ndarray] = None,
+        hash_offsets: Optional[np.ndarray] = None,
+        dup_of: Optional[np.ndarray] = None,
+        dup_shared: Optional[np.ndarray] = None,
+    ) -> None:
+        self.paths = paths
+        self.path_id = path_id
+        self.source_id = source_id
+        self.start = start
+        self.end = end
+        self.lines = lines
+        self.byte_pos = byte_pos
+        self.hash_bin = hash_bin
+        self.hash_blob = hash_blob
+        self.hash_offsets = hash_offsets
+        self.dup_of = dup_of
+        self.dup_shared = dup_shared
+        self._dup_groups: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    # --- Construction ---
+    @classmethod
+    def from_records(cls, records: Sequence[Dict[str, Any]]) -> 'ChunkTable':
+        n = len(records)
+        intern: Dict[str, int] = {}
+        paths: List[str] = []
+
+        def _id(p: Any) -> int:
+            p = str(p)
+            pid = intern.get(p)
+            if pid is None:
+                pid = intern[p] = len(paths)
+                paths.append(p)
+            return pid
+
+        path_id = np.empty(n, dtype=np.int32)
+        source_id = np.full(n, -1, dtype=np.int32)
+        start = np.empty(n, dtype=np.int64)
+        end = np.empty(n, dtype=np.int64)
+        lines = np.zeros((n, 2), dtype=np.int32)
+        byte_pos = np.full((n, 2), -1, dtype=np.int64)
+        hashes: List[str] = []
+        for i, rec in enumerate(records):
+            path_id[i] = _id(rec.get('path', ''))
+            if rec.get('source_path') is not None:
+                source_id[i] = _id(rec['source_path'])
+            start[i] = int(rec.get('start', 0))
+            end[i] = int(rec.get('end', 0))
+            if rec.get('lines'):
+                lines[i] = rec['lines'][:2]
+            if rec.get('bytes'):
+                byte_pos[i] = rec['bytes'][:2]
+            hashes.append(str(rec.get('hash') or ''))
+        hash_bin = _sha1_bytes(hashes)
+        hash_blob = hash_offsets = None
+        if hash_bin is None:
+            hash_blob, hash_offsets = _pack_strings(hashes)
+        return cls(paths, path_id, source_id, start, end, lines, byte_pos, hash_bin, hash_blob, hash_offsets)
+
+    @classmethod
+    def empty(cls) -> 'ChunkTable':
+        return cls.from_records([])
+
+    @classmethod
+    def concat(cls, parts: Sequence['ChunkTable']) -> 'ChunkTable':
+        """Join tables row-wise, re-interning the paths they still reference."""
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return cls.empty()
+        intern: Dict[str, int] = {}
+        paths: List[str] = []
+        path_ids: List[np.ndarray] = []
+        source_ids: List[np.ndarray] = []
+        for part in parts:
+            remap = np.full(len(part.paths) + 1, -1, dtype=np.int32)  # slot -1: no source path
+            used = np.unique(np.concatenate([part.path_id, part.source_id[part.source_id >= 0]]))
+            for j in used.tolist():
+                p = part.paths[j]
+                pid = intern.get(p)
+                if pid is None:
+                    pid = intern[p] = len(paths)
+                    paths.append(p)
+                remap[j] = pid
+            path_ids.append(remap[part.path_id])
+            source_ids.append(remap[part.source_id])
+        hash_bin = hash_blob = hash_offsets = None
+        if all(p.hash_bin is not None for p in parts):
+            hash_bin = np.concatenate([p.hash_bin for p in parts])
+        else:
+            hash_blob, hash_offsets = _pack_strings([h for p in parts for h in p.hashes()])
+        return cls(
+            paths,
+            np.concatenate(path_ids),
+            np.concatenate(source_ids),
+            np.concatenate([p.start for p in parts]),
+            np.concatenate([p.end for p in parts]),
+            np.concatenate([p.lines for p in parts]),
+            np.concatenate([p.byte_pos for p in parts]),
+            hash_bin, hash_blob, hash_offsets,
+        )
+
+    def rows(self, a: int, b: int) -> 'ChunkTable':
+        """Rows [a, b) as a table sharing this one's paths and column buffers."""
+        return ChunkTable(
+            self.paths, self.path_id[a:b], self.source_id[a:b], self.start[a:b], self.end[a:b],
+            self.lines[a:b], self.byte_pos[a:b],
+            self.hash_bin[a:b] if self.hash_bin is not None else None,
+            self.hash_blob, self.hash_offsets[a:b + 1] if self.hash_offsets is not None else None,
+        )
+
+    # --- Row access ---
+    def __len__(self) -> int:
+        return int(self.path_id.shape[0])
+
+    def hash(self, i: int) -> str:
+        if self.hash_bin is not None:
+            return self.hash_bin[i].tobytes().hex()
+        return _unpack_string(self.hash_blob, self.hash_offsets, i)
+
+    def hashes(self) -> List[str]:
+        return [self.hash(i) for i in range(len(self))]
+
+    def path(self, i: int) -> str:
+        return self.paths[int(self.path_id[i])]
+
+    def record(self, i: int) -> Dict[str, Any]:
+        rec: Dict[str, Any] = {
+            'path': self.paths[int(self.path_id[i])],
+            'start': int(self.start[i]),
+            'end': int(self.end[i]),
+            'hash': self.hash(i),
+        }
+        if self.lines[i, 0] > 0:
+            rec['lines'] = [int(self.lines[i, 0]), int(self.lines[i, 1])]
+        if self.byte_pos[i, 0] >= 0:
+            rec['bytes'] = [int(self.byte_pos[i, 0]), int(self.byte_pos[i, 1])]
+        if self.source_id[i] >= 0:
+            rec['source_path'] = self.paths[int(self.source_id[i])]
+        if self.dup_of is not None and self.dup_of[i] >= 0:
+            rec['dup_of'] = int(self.dup_of[i])
+        return rec
+
+    def duplicates(self, i: int) -> List[int]:
+        """Rows recorded as duplicates of canonical row `i`."""
+        if self.dup_of is None:
+            return []
+        if self._dup_groups is None:
+            rows = np.flatnonzero(self.dup_of >= 0)
+            order = np.argsort(self.dup_of[rows], kind='stable')
+            self._dup_groups = (self.dup_of[rows][order], rows[order])
+        keys, rows = self._dup_groups
+        lo, hi = np.searchsorted(keys, i, side='left'), np.searchsorted(keys, i, side='right')
+        return rows[lo:hi].tolist()
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.record(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.record(i)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self.record(i)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.path_id, self.source_id, self.start, self.end, self.lines, self.byte_pos,
+                  self.hash_bin, self.hash_blob, self.hash_offsets, self.dup_of, self.dup_shared)
+        return sum(int(a.nbytes) for a in arrays if a is not None) + sum(len(p) + 49 for p in self.paths)
+
+    # --- Persistence ---
+    def save(self, path: str) -> None:
+        blob, offsets = _pack_strings(self.paths)
+        arrays = {
+            'paths_blob': blob, 'paths_offsets': offsets,
+            'path_id': self.path_id, 'source_id': self.source_id,
+            'start': self.start, 'end': self.end, 'lines': self.lines, 'bytes': self.byte_pos,
+        }
+        if self.hash_bin is not None:
+            arrays['hash_bin'] = self.hash_bin
+        else:
+            base = int(self.hash_offsets[0])
+            arrays['hash_blob'] = self.hash_blob[base:int(self.hash_offsets[-1])]
+            arrays['hash_offsets'] = self.hash_offsets - base
+        if self.dup_of is not None:
+            arrays['dup_of'] = self.dup_of
+            if self.dup_shared is not None:
+                arrays['dup_shared'] = self.dup_shared
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'ChunkTable':
+        with np.load(path, allow_pickle=False) as z:
+            cols = {name: z[name] for name in z.files}
+        blob, offsets = cols['paths_blob'], cols['paths_offsets']
+        paths = [_unpack_string(blob, offsets, i) for i in range(offsets.shape[0] - 1)]
+        return cls(
+            paths, cols['path_id'], cols['source_id'], cols['start'], cols['end'], cols['lines'], cols['bytes'],
+            cols.get('hash_bin'), cols.get('hash_blob'), cols.get('hash_offsets'), cols.get('dup_of'),
+            cols.get('dup_shared'),
+        )
+
+
+class ChunkTableBuilder:
+    """Accumulates an index's chunk rows during an update.
+
+    Rows carried over from the previous table are sliced column-wise (adjacent
+    ranges share one slice); new records are buffered as dicts and packed
+    every `_FLUSH_ROWS` rows.
+    """
+
+    def __init__(self) -> None:
+        self._parts: List[ChunkTable] = []
+        self._pending: List[Dict[str, Any]] = []
+        self._count = 0
+        # (source table, start, end) of the last part when it is a carried slice
+        self._carried: Optional[Tuple[ChunkTable, int, int]] = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _flush(self) -> None:
+        if self._pending:
+            self._parts.append(ChunkTable.from_records(self._pending))
+            self._pending = []
+            self._carried = None
+
+    def append(self, record: Dict[str, Any]) -> None:
+        self._pending.append(record)
+        self._count += 1
+        if len(self._pending) >= _FLUSH_ROWS:
+            self._flush()
+
+    def extend_rows(self, table: ChunkTable, a: int, b: int) -> None:
+        if b <= a:
+            return
+        self._flush()
+        self._count += b - a
+        last = self._carried
+        if last is not None and last[0] is table and last[2] == a:
+            # Unchanged files are mostly consecutive rows: grow the previous slice
+            a = last[1]
+            self._parts[-1] = table.rows(a, b)
+        else:
+            self._parts.append(table.rows(a, b))
+        self._carried = (table, a, b)
+
+    def build(self) -> ChunkTable:
+        self._flush()
+        return ChunkTable.concat(self._parts)
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import os
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+DEDUP_FILE = 'dedup.npz'
+DEDUP_MODES = ('exact', 'near')
+DEFAULT_THRESHOLD = 0.85
+NUM_PERM = 64
+# 16 bands x 4 rows: pairs at Jaccard 0.85 share a band >99.9% of the time;
+# bucket-mates are candidates only and are checked against the threshold
+BANDS = 16
+SHINGLE = 3  # words
+# Recorded in the manifest: near-mode signatures of another scheme are rebuilt, not compared
+SIGNATURE = f'minhash{NUM_PERM}-words{SHINGLE}'
+
+_WS_RE = re.compile(r'\s+')
+_WORD_RE = re.compile(r'\w+')
+_PRIME = np.uint64(4294967291)  # largest prime below 2**32: a * x + b stays below 2**64
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+_rng = np.random.default_rng(0x5EED)
+_PERM_A = _rng.integers(1, int(_PRIME), size=(NUM_PERM, 1), dtype=np.uint64)
+_PERM_B = _rng.integers(0, int(_PRIME), size=(NUM_PERM, 1), dtype=np.uint64)
+_BAND_W = np.uint64(_rng.integers(1, 2 ** 63, dtype=np.uint64) | 1)
+del _rng
+
+
+def parse_mode(value: Any) -> Optional[str]:
+    mode = str(value or '').strip().lower()
+    return mode if mode in DEDUP_MODES else None
+
+
+def normalize_text(text: str) -> str:
+    """Dedup form of a chunk: NFC, case-folded, whitespace collapsed."""
+    return _WS_RE.sub(' ', unicodedata.normalize('NFC', text).casefold()).strip()
+
+
+def text_key(norm: str) -> int:
+    """64-bit key of normalized text (exact duplicates share it)."""
+    return int.from_bytes(hashlib.blake2b(norm.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _word_key(word: str) -> int:
+    return text_key(word)
+
+
+def minhash(norm: str) -> np.ndarray:
+    """MinHash signature (NUM_PERM uint32) over `SHINGLE`-word shingles of normalized text."""
+    words = np.array([_word_key(w) for w in (_WORD_RE.findall(norm) or [norm])], dtype=np.uint64)
+    span = min(SHINGLE, words.shape[0])
+    grams = words[:words.shape[0] - span + 1].copy()
+    for i in range(1, span):
+        grams = grams * _MIX + words[i:words.shape[0] - span + 1 + i]
+    # Mix the 64-bit shingles down to 32 bits, then apply the universal hash family
+    x = np.unique((grams * _MIX) >> np.uint64(32))
+    return ((_PERM_A * x[None, :] + _PERM_B) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def band_keys(sigs: np.ndarray) -> np.ndarray:
+    """(n x BANDS) uint64 bucket keys: rows that share a key are LSH candidates."""
+    # Each band is 4 uint32 values = 2 uint64 words; mix them into one key
+    words = np.ascontiguousarray(sigs, dtype=np.uint32).view(np.uint64).reshape(-1, BANDS, 2)
+    return words[:, :, 0] * _BAND_W + words[:, :, 1]
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Estimated Jaccard similarity of MinHash signatures (row-wise for 2-D input)."""
+    return np.mean(np.asarray(a) == np.asarray(b), axis=-1)
+
+
+class DedupTable:
+    """Per-row dedup keys, row-aligned with embeddings.npy (`dedup.npz`).
+
+    `keys` are normalized-text keys; `sigs` are MinHash signatures (n x 0 in
+    'exact' mode). Only updates read it: search uses the `dup_of` column of
+    the chunk table.
+    """
+
+    def __init__(self, mode: str, keys: np.ndarray, sigs: np.ndarray) -> None:
+        self.mode = mode
+        self.keys = keys
+        self.sigs = sigs
+
+    def __len__(self) -> int:
+        return int(self.keys.shape[0])
+
+    def save(self, index_dir: str) -> None:
+        path = os.path.join(index_dir, DEDUP_FILE)
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, mode=np.array(self.mode), keys=self.keys, sigs=self.sigs)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, index_dir: str) -> Optional['DedupTable']:
+        try:
+            with np.load(os.path.join(index_dir, DEDUP_FILE), allow_pickle=False) as z:
+                table = cls(str(z['mode']), z['keys'], z['sigs'])
+        except Exception:
+            return None
+        if table.sigs.shape[0] != len(table) or (table.mode == 'near' and table.sigs.shape[1:] != (NUM_PERM,)):
+            return None
+        return table
+
+    @staticmethod
+    def remove(index_dir: str) -> None:
+        try:
+            os.remove(os.path.join(index_dir, DEDUP_FILE))
+        except Exception:
+            pass
+
+
+class DedupTableBuilder:
+    """Accumulates the next `DedupTable` during an update, in row order (adjacent carried ranges share one slice)."""
+
+    def __init__(self, mode: str) -> None:
+        self.mode = mode
+        self._width = NUM_PERM if mode == 'near' else 0
+        self._parts: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._keys: List[int] = []
+        self._sigs: List[np.ndarray] = []
+        # (source table, start, end) of the last part when it is a carried slice
+        self._carried: Optional[Tuple[DedupTable, int, int]] = None
+
+    def _flush(self) -> None:
+        if self._keys:
+            sigs = np.stack(self._sigs) if self._width else np.zeros((len(self._keys), 0), dtype=np.uint32)
+            self._parts.append((np.array(self._keys, dtype=np.uint64), sigs))
+            self._keys, self._sigs = [], []
+            self._carried = None
+
+    def append(self, key: int, sig: Optional[np.ndarray]) -> None:
+        self._keys.append(key)
+        if self._width:
+            self._sigs.append(sig)
+
+    def extend_rows(self, table: DedupTable, a: int, b: int) -> None:
+        if b <= a:
+            return
+        self._flush()
+        last = self._carried
+        if last is not None and last[0] is table and last[2] == a:
+            a = last[1]
+            self._parts.pop()
+        self._parts.append((table.keys[a:b], table.sigs[a:b, :self._width]))
+        self._carried = (table, a, b)
+
+    def build(self) -> DedupTable:
+        self._flush()
+        if not self._parts:
+            return DedupTable(self.mode, np.zeros(0, dtype=np.uint64), np.zeros((0, self._width), dtype=np.uint32))
+        return DedupTable(self.mode, np.concatenate([k for k, _ in self._parts]),
+                          np.concatenate([s for _, s in self._parts]).astype(np.uint32, copy=False))
+
+
+def dedup_row(text: str, mode: str) -> Tuple[int, Optional[np.ndarray]]:
+    """(normalized-text key, MinHash signature or None) for one chunk."""
+    norm = normalize_text(text)
+    return text_key(norm), (minhash(norm) if mode == 'near' else None)
+
+
+class DuplicateFinder:
+    """Online lookup of exact and near duplicates for chunks being indexed.
+
+    Seeded with the previous index's rows (kept as sorted arrays, searched
+    with `searchsorted`) and extended with this run's rows (dicts). `find`
+    returns (row, previous?) for the first registered row whose normalized
+    text matches, or whose estimated Jaccard similarity reaches `threshold`.
+    """
+
+    def __init__(self, mode: str, threshold: float = DEFAULT_THRESHOLD, known: Optional[DedupTable] = None) -> None:
+        self.mode = mode
+        self.threshold = float(threshold)
+        self._keys: Dict[int, int] = {}
+        self._buckets: List[Dict[int, int]] = [{} for _ in range(BANDS)]
+        self._sigs: Dict[int, np.ndarray] = {}
+        self._known = known if known is not None and len(known) else None
+        self._known_bands: List[Tuple[np.ndarray, np.ndarray]] = []
+        if self._known is not None:
+            self._known_rows = np.argsort(known.keys, kind='stable')
+            self._known_keys = known.keys[self._known_rows]
+            if mode == 'near' and known.mode == 'near':
+                bands = band_keys(known.sigs)
+                for j in range(BANDS):
+                    o = np.argsort(bands[:, j], kind='stable')
+                    self._known_bands.append((bands[o, j], o))
+
+    def find(self, key: int, sig: Optional[np.ndarray]) -> Optional[Tuple[int, bool]]:
+        row = self._keys.get(key)
+        if row is not None:
+            return row, False
+        if self._known is not None:
+            pos = int(np.searchsorted(self._known_keys, np.uint64(key)))
+            if pos < len(self._known_keys) and int(self._known_keys[pos]) == key:
+                return int(self._known_rows[pos]), True
+        if self.mode != 'near' or sig is None:
+            return None
+        bands = band_keys(sig[None, :])[0]
+        for j, b in enumerate(bands.tolist()):
+            cand = self._buckets[j].get(b)
+            if cand is not None and similarity(sig, self._sigs[cand]) >= self.threshold:
+                return cand, False
+        for j, (sorted_keys, rows) in enumerate(self._known_bands):
+            lo = int(np.searchsorted(sorted_keys, bands[j], side='left'))
+            hi = int(np.searchsorted(sorted_keys, bands[j], side='right'))
+            if hi > lo:
+                cands = rows[lo:hi]
+                ok = np.flatnonzero(similarity(self._known.sigs[cands], sig[None, :]) >= self.threshold)
+                if len(ok):
+                    return int(cands[ok[0]]), True
+        return None
+
+    def add(self, row: int, key: int, sig: Optional[np.ndarray]) -> None:
+        self._keys.setdefault(key, row)
+        if self.mode == 'near' and sig is not None:
+            self._sigs[row] = sig
+            for j, b in enumerate(band_keys(sig[None, :])[0].tolist()):
+                self._buckets[j].setdefault(b, row)
+
+
+def assign_duplicates(table: DedupTable, threshold: float = DEFAULT_THRESHOLD) -> np.ndarray:
+    """`dup_of` column: the canonical (first) row of each row's duplicate group, -1 for canonical rows.
+
+    Exact groups share a normalized-text key. In 'near' mode, canonical rows
+    that share an LSH bucket with an earlier canonical row are folded into it
+    when their estimated similarity reaches `threshold`; a row never points
+    at another duplicate.
+    """
+    n = len(table)
+    dup_of = np.full(n, -1, dtype=np.int32)
+    if not n:
+        return dup_of
+    _, first, inverse = np.unique(table.keys, return_index=True, return_inverse=True)
+    leader = first[inverse.reshape(-1)]
+    exact = leader != np.arange(n)
+    dup_of[exact] = leader[exact]
+    if table.mode != 'near' or table.sigs.shape[1:] != (NUM_PERM,):
+        return dup_of
+
+    canon = np.flatnonzero(~exact)
+    bands = band_keys(table.sigs[canon])
+    best = np.full(n, n, dtype=np.int64)
+    for j in range(BANDS):
+        order = np.argsort(bands[:, j])
+        keys = bands[order, j]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        rows = canon[order]
+        # Earliest row of each bucket (buckets are rarely larger than one row)
+        group_first = np.repeat(np.minimum.reduceat(rows, starts), np.diff(np.r_[starts, len(keys)]))
+        pair = group_first < rows
+        a, b = rows[pair], group_first[pair]
+        ok = similarity(table.sigs[a], table.sigs[b]) >= threshold
+        np.minimum.at(best, a[ok], b[ok])
+    for row in np.flatnonzero(best < n).tolist():
+        target = int(best[row])
+        root = int(dup_of[target])
+        if root < 0:
+            dup_of[row] = target
+        elif similarity(table.sigs[row], table.sigs[root]) >= threshold:
+            dup_of[row] = root
+    # Exact copies follow their leader into its near-duplicate group
+    moved = exact & (dup_of[leader] >= 0)
+    dup_of[moved] = dup_of[leader[moved]]
+    return dup_of
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+
+# HTTP statuses worth retrying: throttling and transient server errors
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+# Exception class names (SDK-agnostic) that indicate a transient failure
+_RETRY_NAMES = ('RateLimit', 'Timeout', 'APIConnection', 'ConnectionError', 'ServiceUnavailable', 'InternalServerError')
+
+
+def estimate_tokens(texts: List[str]) -> int:
+    """Rough token count for rate limiting (~4 chars per token)."""
+    return sum(len(t) for t in texts) // 4 + len(texts)
+
+
+def _status_of(exc: BaseException) -> Optional[int]:
+    for obj in (exc, getattr(exc, 'response', None)):
+        code = getattr(obj, 'status_code', None) or getattr(obj, 'status', None)
+        try:
+            if code is not None:
+                return int(code)
+        except Exception:
+            continue
+    return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    status = _status_of(exc)
+    if status is not None:
+        return status in RETRY_STATUSES
+    name = type(exc).__name__
+    return any(part in name for part in _RETRY_NAMES)
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds from a `Retry-After` response header, when the error carries one."""
+    headers = getattr(getattr(exc, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    try:
+        value = headers.get('retry-after') or headers.get('Retry-After')
+        return max(0.0, float(value)) if value is not None else None
+    except Exception:
+        return None
+
+
+class RateLimiter:
+    """Token buckets for requests/minute and tokens/minute (either may be None).
+
+    Buckets start full, so a burst up to the per-minute budget goes out at
+    once; afterwards `acquire` blocks until enough budget has refilled. A
+    request larger than the token budget is clamped to it so it can proceed.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rpm = float(requests_per_minute) if requests_per_minute else None
+        self.tpm = float(tokens_per_minute) if tokens_per_minute else None
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._requests = self.rpm or 0.0
+        self._tokens = self.tpm or 0.0
+        self._last = clock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._last)
+        self._last = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60.0)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60.0)
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until one request of `tokens` fits; returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(self._clock())
+                need_t = min(float(tokens), self.tpm) if self.tpm else 0.0
+                wait = 0.0
+                if self.rpm and self._requests < 1.0:
+                    wait = max(wait, (1.0 - self._requests) * 60.0 / self.rpm)
+                if self.tpm and self._tokens < need_t:
+                    wait = max(wait, (need_t - self._tokens) * 60.0 / self.tpm)
+                if wait <= 0.0:
+                    if self.rpm:
+                        self._requests -= 1.0
+                    if self.tpm:
+                        self._tokens -= need_t
+                    return waited
+            self._sleep(wait)
+            waited += wait
+
+
+class EmbedScheduler:
+    """Runs embedding batches concurrently with rate limiting and retries.
+
+    `submit(texts)` returns a Future resolving to the batch's vectors; up to
+    `concurrency` calls to `embed_fn` run at once on a thread pool. Each call
+    first takes budget from the `RateLimiter`, and failures that look
+    transient (a `RETRY_STATUSES` status, timeouts, connection errors) are
+    retried with exponential backoff and jitter, honouring `Retry-After` when
+    present.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], Any],
+        *,
+        concurrency: int = 1,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.embed_fn = embed_fn
+        self.concurrency = max(1, int(concurrency or 1))
+        self.max_retries = max(0, int(max_retries))
+        self.backoff = max(0.0, float(backoff))
+        self.max_backoff = max(0.0, float(max_backoff))
+        self._sleep = sleep
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute, clock=clock, sleep=sleep)
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='rag-embed')
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0.0
+
+    def _call(self, texts: List[str]) -> Any:
+        tokens = estimate_tokens(texts)
+        attempt = 0
+        while True:
+            waited = self.limiter.acquire(tokens)
+            with self._lock:
+                self.requests += 1
+                self.throttled += waited
+            try:
+                return self.embed_fn(texts)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = retry_after(e)
+                if delay is None:
+                    delay = min(self.max_backoff, self.backoff * (2 ** attempt)) * (0.5 + random.random() / 2)
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                if delay > 0:
+                    self._sleep(delay)
+
+    def submit(self, texts: List[str]) -> 'Future[Any]':
+        return self._pool.submit(self._call, list(texts))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'concurrency': self.concurrency,
+                'requests': self.requests,
+                'retries': self.retries,
+                'throttled_s': round(self.throttled, 3),
+            }
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> 'EmbedScheduler':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+DEFAULT_EMBEDDING_CACHE_MB = 1024
+CACHE_FILE = 'embedding_cache.sqlite'
+# Keys per SELECT (stays under SQLite's bound-parameter limit)
+_LOOKUP_CHUNK = 500
+# Evicting past the cap leaves headroom, so updates at the cap rarely evict again
+_LOW_WATER = 0.9
+
+
+def signature_key(signature: Dict[str, Any]) -> str:
+    """Stable short key for an embedding signature (provider/model/dim info)."""
+    blob = json.dumps(signature or {}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(blob.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """Content-addressed embedding store shared by all indexes under `vector_db`.
+
+    Vectors are keyed by (embedding signature, chunk hash) and stored as
+    L2-normalized float32 blobs in `<vector_db>/embedding_cache.sqlite`, so
+    identical chunks in different indexes (or a renamed index) are embedded
+    once. `last_used` is refreshed on every hit; `prune()` evicts least
+    recently used rows once the vector payload exceeds `max_bytes`, down to
+    90% of it.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_EMBEDDING_CACHE_MB * 1024 * 1024) -> None:
+        self.path = os.path.expanduser(path)
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def for_vector_db(cls, vector_db: str, max_bytes: int = DEFAULT_EMBEDDING_CACHE_MB * 1024 * 1024) -> 'EmbeddingCache':
+        return cls(os.path.join(os.path.expanduser(vector_db), CACHE_FILE), max_bytes)
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS embeddings ('
+                ' sig TEXT NOT NULL, hash TEXT NOT NULL, dim INTEGER NOT NULL,'
+                ' vec BLOB NOT NULL, last_used INTEGER NOT NULL,'
+                ' PRIMARY KEY (sig, hash)) WITHOUT ROWID'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)')
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, sig: str, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Return hash -> vector for the hashes present under signature key `sig`."""
+        out: Dict[str, np.ndarray] = {}
+        keys = list(dict.fromkeys(hashes))
+        if not keys:
+            return out
+        now = int(time.time())
+        with self._lock:
+            db = self._db()
+            for i in range(0, len(keys), _LOOKUP_CHUNK):
+                part = keys[i:i + _LOOKUP_CHUNK]
+                marks = ','.join('?' * len(part))
+                rows = db.execute(
+                    f'SELECT hash, dim, vec FROM embeddings WHERE sig = ? AND hash IN ({marks})', [sig, *part]
+                ).fetchall()
+                for h, dim, vec in rows:
+                    arr = np.frombuffer(vec, dtype=np.float32)
+                    if arr.shape[0] == dim:
+                        out[h] = arr
+                if rows:
+                    db.executemany(
+                        'UPDATE embeddings SET last_used = ? WHERE sig = ? AND hash = ?',
+                        [(now, sig, h) for h, _, _ in rows],
+                    )
+            db.commit()
+            self.hits += len(out)
+            self.misses += len(keys) - len(out)
+        return out
+
+    def put_many(self, sig: str, hashes: Sequence[str], vecs: np.ndarray) -> None:
+        matrix = np.ascontiguousarray(vecs, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] != len(hashes):
+            return
+        now = int(time.time())
+        dim = int(matrix.shape[1])
+        with self._lock:
+            db = self._db()
+            db.executemany(
+                'INSERT OR REPLACE INTO embeddings (sig, hash, dim, vec, last_used) VALUES (?, ?, ?, ?, ?)',
+                [(sig, h, dim, matrix[i].tobytes(), now) for i, h in enumerate(hashes)],
+            )
+            db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            db = self._db()
+            entries, payload = db.execute('SELECT COUNT(*), COALESCE(SUM(LENGTH(vec)), 0) FROM embeddings').fetchone()
+            sigs = db.execute('SELECT COUNT(DISTINCT sig) FROM embeddings').fetchone()[0]
+        try:
+            file_bytes = os.path.getsize(self.path)
+        except OSError:
+            file_bytes = 0
+        return {
+            'path': self.path,
+            'entries': int(entries),
+            'signatures': int(sigs),
+            'bytes': int(payload),
+            'file_bytes': int(file_bytes),
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def prune(self, max_bytes: Optional[int] = None, *, vacuum: bool = False) -> int:
+        """Evict least recently used vectors once the payload exceeds the cap; returns rows removed.
+
+        Without `max_bytes` the configured cap applies and eviction goes down
+        to 90% of it; an explicit `max_bytes` is evicted to exactly. `vacuum`
+        also shrinks the file, which rewrites all of it.
+        """
+        cap = max(0, self.max_bytes if max_bytes is None else int(max_bytes))
+        target = int(cap * _LOW_WATER) if max_bytes is None else cap
+        removed = 0
+        with self._lock:
+            db = self._db()
+            total = db.execute('SELECT COALESCE(SUM(LENGTH(vec)), 0) FROM embeddings').fetchone()[0]
+            if total <= cap:
+                return 0
+            victims: List[tuple[str, str]] = []
+            for sig, h, size in db.execute('SELECT sig, hash, LENGTH(vec) FROM embeddings ORDER BY last_used').fetchall():
+                if total <= target:
+                    break
+                victims.append((sig, h))
+                total -= size
+            db.executemany('DELETE FROM embeddings WHERE sig = ? AND hash = ?', victims)
+            db.commit()
+            removed = len(victims)
+        if removed and vacuum:
+            with self._lock:
+                self._db().execute('VACUUM')
+        return removed
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
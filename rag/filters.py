@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import os
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .chunk_table import ChunkTable
+from .fs_utils import _matches_any
+
+
+_DURATION_RE = re.compile(r'^(\d+(?:\.\d+)?)\s*([smhdw])$')
+_DURATION_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}
+
+
+def _as_list(value: Any) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return [str(v).strip() for v in value if str(v).strip()]
+
+
+def parse_modified_after(value: Any, *, now: Optional[float] = None) -> Optional[float]:
+    """Epoch seconds from a cutoff: epoch number, ISO date/datetime, or an
+    age such as '36h', '7d', '2w' (relative to now). Raises ValueError."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().lower()
+    m = _DURATION_RE.match(text)
+    if m:
+        base = time.time() if now is None else now
+        return base - float(m.group(1)) * _DURATION_SECONDS[m.group(2)]
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(str(value).strip()).timestamp()
+    except ValueError:
+        raise ValueError(f"invalid modified_after '{value}' (use YYYY-MM-DD, an ISO datetime, or an age like 7d)")
+
+
+def build_filters(
+    *,
+    include: Any = None,
+    exclude: Any = None,
+    exts: Any = None,
+    modified_after: Any = None,
+) -> Optional[Dict[str, Any]]:
+    """Normalized query-time filters, or None when nothing is restricted.
+
+    - include / exclude: globs (comma-separated or list) matched against the
+      path relative to the index root, or the absolute path
+    - exts: file extensions ('md', '.py')
+    - modified_after: see `parse_modified_after`
+    """
+    filters: Dict[str, Any] = {}
+    if _as_list(include):
+        filters['include'] = _as_list(include)
+    if _as_list(exclude):
+        filters['exclude'] = _as_list(exclude)
+    if _as_list(exts):
+        filters['exts'] = sorted({('.' + e.lstrip('.')).lower() for e in _as_list(exts)})
+    after = parse_modified_after(modified_after)
+    if after is not None:
+        filters['modified_after'] = after
+    return filters or None
+
+
+def path_matches(
+    path: str,
+    filters: Dict[str, Any],
+    *,
+    root: Optional[str] = None,
+    mtimes: Optional[Dict[str, int]] = None,
+) -> bool:
+    """Whether one source file passes `filters` (see `build_filters`)."""
+    exts = filters.get('exts')
+    if exts and os.path.splitext(path)[1].lower() not in exts:
+        return False
+    candidates = [path.replace(os.sep, '/')]
+    prefix = os.path.join(root, '') if root else ''
+    if prefix and path.startswith(prefix):
+        candidates.insert(0, path[len(prefix):].replace(os.sep, '/'))
+    include = filters.get('include')
+    if include and not any(_matches_any(c, include) for c in candidates):
+        return False
+    exclude = filters.get('exclude')
+    if exclude and any(_matches_any(c, exclude) for c in candidates):
+        return False
+    after = filters.get('modified_after')
+    if after is not None:
+        mtime_ns = (mtimes or {}).get(path)
+        if mtime_ns is None:
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                return False
+        if int(mtime_ns) / 1e9 < after:
+            return False
+    return True
+
+
+def filter_rows(
+    chunks: ChunkTable,
+    filters: Optional[Dict[str, Any]],
+    *,
+    root: Optional[str] = None,
+    mtimes: Optional[Dict[str, int]] = None,
+) -> Optional[np.ndarray]:
+    """Ascending row ids whose source file passes `filters` (None: no filters).
+
+    Filters are evaluated once per interned path, then broadcast to rows
+    through the path-id column, so the cost scales with files, not chunks.
+    """
+    if not filters:
+        return None
+    display = np.where(chunks.source_id >= 0, chunks.source_id, chunks.path_id)
+    ok = np.zeros(len(chunks.paths), dtype=bool)
+    root = os.path.realpath(root) if root else None  # indexed paths are resolved
+    for pid in np.flatnonzero(np.bincount(display, minlength=len(chunks.paths))).tolist():
+        ok[pid] = path_matches(chunks.paths[pid], filters, root=root, mtimes=mtimes)
+    return np.flatnonzero(ok[display])
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import bisect
 import os
 from pathlib import Path
 from typing import Dict, Iterable, Iterator, Tuple, List, Optional, Set
@@ -191,37 +192,80 @@ def iter_index_files(
         if pruned:
             dirnames[:] = [d for d in dirnames if d not in pruned]
         for name in filenames:
-            p = Path(dirpath) / name
-            try:
-                rp = p.resolve()
-                # Ensure within base
-                if os.name == 'nt':
-                    if not str(rp).lower().startswith(str(base).lower()):
-                        continue
-                else:
-                    if not str(rp).startswith(str(base)):
-                        continue
-                # Filter by extension
-                if rp.suffix.lower() not in exts:
-                    continue
-                # Glob includes (relative to root)
-                rel = _rel_posix(base, rp)
-                if rel is None:
-                    continue
-                if include_globs and not _matches_any(rel, include_globs):
-                    continue
-                # Glob excludes
-                if _matches_any(rel, exclude_globs):
-                    continue
-                # Size cap
-                try:
-                    if rp.stat().st_size > max_bytes:
-                        continue
-                except OSError:
-                    continue
-                yield str(rp)
-            except Exception:
-                continue
+            rp = _index_path(base, Path(dirpath) / name, exts, include_globs, exclude_globs, max_bytes)
+            if rp is not None:
+                yield rp
+
+
+def _index_path(
+    base: Path,
+    p: Path,
+    exts: set[str],
+    include_globs: Optional[List[str]],
+    exclude_globs: Optional[List[str]],
+    max_bytes: int,
+) -> Optional[str]:
+    """Resolved path of `p` if it passes the file-level filters, else None."""
+    try:
+        rp = p.resolve()
+        # Ensure within base
+        if os.name == 'nt':
+            if not str(rp).lower().startswith(str(base).lower()):
+                return None
+        else:
+            if not str(rp).startswith(str(base)):
+                return None
+        # Filter by extension
+        if rp.suffix.lower() not in exts:
+            return None
+        # Glob includes (relative to root)
+        rel = _rel_posix(base, rp)
+        if rel is None:
+            return None
+        if include_globs and not _matches_any(rel, include_globs):
+            return None
+        # Glob excludes
+        if _matches_any(rel, exclude_globs):
+            return None
+        # Size cap
+        try:
+            if rp.stat().st_size > max_bytes:
+                return None
+        except OSError:
+            return None
+        return str(rp)
+    except Exception:
+        return None
+
+
+def index_file_path(
+    root: str,
+    path: str,
+    *,
+    exts: set[str] | None = None,
+    excludes: set[str] | None = None,
+    include_globs: Optional[List[str]] = None,
+    exclude_globs: Optional[List[str]] = None,
+    max_bytes: int = 10 * 1024 * 1024,
+) -> Optional[str]:
+    """The path `iter_index_files(root, ...)` would yield for one file, or None.
+
+    Applies the same directory pruning (by name and glob) to the file's
+    parents, so single changed files can be checked without walking the tree.
+    """
+    base = Path(root).resolve()
+    p = Path(path)
+    parent_rel = _rel_posix(base, p.parent)
+    if parent_rel is None:
+        return None
+    if parent_rel:
+        parts = parent_rel.split('/')
+        excludes = excludes or DEFAULT_EXCLUDES
+        for i, d in enumerate(parts):
+            child_rel = '/'.join(parts[:i + 1])
+            if d in excludes or _matches_any(child_rel, exclude_globs) or _matches_any(child_rel + "/", exclude_globs):
+                return None
+    return _index_path(base, p, exts or DEFAULT_EXTS, include_globs, exclude_globs, max_bytes)
 
 
 def read_text(path: str, encoding: str = 'utf-8') -> str | None:
@@ -232,6 +276,22 @@ def read_text(path: str, encoding: str = 'utf-8') -> str | None:
         return None
 
 
+def line_starts(text: str) -> List[int]:
+    """Char offsets where each line begins, plus len(text) as a sentinel."""
+    starts = [0]
+    pos = text.find('\n')
+    while pos != -1:
+        starts.append(pos + 1)
+        pos = text.find('\n', pos + 1)
+    starts.append(len(text))
+    return starts
+
+
+def line_of(starts: List[int], pos: int) -> int:
+    """1-based line containing char offset `pos` (clamped to the last line)."""
+    return max(1, min(len(starts) - 1, bisect.bisect_right(starts, pos)))
+
+
 def chunk_text(text: str, *, size: int = 3000, overlap: int = 300) -> Iterable[tuple[int, int, str]]:
     """Yield (start, end, chunk_text) in character offsets with overlap."""
     if not text:
@@ -328,3 +388,155 @@ def load_rag_max_bytes(session) -> int:
     if not isinstance(mb, int) or mb <= 0:
         return 10 * 1024 * 1024
     return mb * 1024 * 1024
+
+
+def load_rag_cache_bytes(session) -> int:
+    """Return the memory cap in bytes for the process-wide index cache.
+
+    Reads `[RAG].cache_mb`; defaults to 512 MB when unset/invalid. Zero
+    disables caching (every search reloads from disk).
+    """
+    cfg = getattr(getattr(session, 'config', None), 'base_config', None) or configparser.ConfigParser()
+    top = getattr(cfg, '_sections', {}).get('RAG', {}) or {}
+    mb = get_int(top, 'cache_mb')  # type: ignore[arg-type]
+    if not isinstance(mb, int) or mb < 0:
+        return 512 * 1024 * 1024
+    return mb * 1024 * 1024
+
+
+def load_rag_backends(session) -> Dict[str, Dict[str, object]]:
+    """Load per-index search backend settings.
+
+    Returns mapping: { index: { 'backend': 'naive'|'ivf', 'nlist': int|None,
+                                'nprobe': int|None, 'min_chunks': int|None,
+                                'quantization': str|None, 'rescore': int|None,
+                                'dedup': 'exact'|'near'|None, 'dedup_threshold': float|None } }
+    - Per-index keys read from [RAG.<index>]: backend, nlist, nprobe, ann_min_chunks,
+      quantization ('int8', 'binary', 'int8,binary' or 'none'), rescore,
+      dedup ('exact', 'near' or 'none'), dedup_threshold (0-1)
+    - Defaults from [RAG]: backend, nprobe, ann_min_chunks, quantization, rescore, dedup, dedup_threshold
+    """
+    cfg = getattr(getattr(session, 'config', None), 'base_config', None) or configparser.ConfigParser()
+    top = getattr(cfg, '_sections', {}).get('RAG', {}) or {}
+    default_backend = str(top.get('backend') or 'naive').strip().lower() or 'naive'
+    default_nprobe = get_int(top, 'nprobe')  # type: ignore[arg-type]
+    default_min = get_int(top, 'ann_min_chunks')  # type: ignore[arg-type]
+    default_quant = top.get('quantization')
+    default_rescore = get_int(top, 'rescore')  # type: ignore[arg-type]
+    default_dedup = top.get('dedup')
+    default_dedup_t = top.get('dedup_threshold')
+
+    raw_names = (top.get('indexes') if isinstance(top, dict) else None) or ''
+    names = [x.strip() for x in str(raw_names).split(',') if str(x).strip()]
+
+    out: Dict[str, Dict[str, object]] = {}
+    for name in names:
+        sec: Dict[str, str] = {}
+        try:
+            sec = cfg._sections.get(f'RAG.{name}', {}) or {}  # type: ignore[attr-defined]
+        except Exception:
+            sec = {}
+        backend = str(sec.get('backend') or default_backend).strip().lower() or 'naive'
+        nlist = get_int(sec, 'nlist')  # type: ignore[arg-type]
+        nprobe = get_int(sec, 'nprobe', default_nprobe)  # type: ignore[arg-type]
+        min_chunks = get_int(sec, 'ann_min_chunks', default_min)  # type: ignore[arg-type]
+        quant = str(sec.get('quantization', default_quant) or '').strip().lower()
+        rescore = get_int(sec, 'rescore', default_rescore)  # type: ignore[arg-type]
+        dedup = str(sec.get('dedup', default_dedup) or '').strip().lower()
+        try:
+            dedup_t = float(sec.get('dedup_threshold', default_dedup_t))
+        except (TypeError, ValueError):
+            dedup_t = None
+        out[name] = {
+            'backend': backend if backend in ('naive', 'ivf') else 'naive',
+            'nlist': nlist if isinstance(nlist, int) and nlist > 0 else None,
+            'nprobe': nprobe if isinstance(nprobe, int) and nprobe > 0 else None,
+            'min_chunks': min_chunks if isinstance(min_chunks, int) and min_chunks > 0 else None,
+            'quantization': quant if quant and quant != 'none' else None,
+            'rescore': rescore if isinstance(rescore, int) and rescore > 0 else None,
+            'dedup': dedup if dedup in ('exact', 'near') else None,
+            'dedup_threshold': dedup_t if dedup_t is not None and 0.0 < dedup_t <= 1.0 else None,
+        }
+    return out
+
+
+def load_rag_extract_settings(session) -> Dict[str, object]:
+    """Return document extraction settings for indexing.
+
+    - `[RAG].extract_workers`: process count for PDF/DOCX/XLSX extraction
+      (default 1; `auto` = CPU count)
+    - `[RAG].extract_timeout`: per-file limit in seconds (default 120; 0 = none);
+      a timeout runs extraction in a worker process even with one worker or file
+    """
+    cfg = getattr(getattr(session, 'config', None), 'base_config', None) or configparser.ConfigParser()
+    top = getattr(cfg, '_sections', {}).get('RAG', {}) or {}
+    raw_workers = str(top.get('extract_workers') or '').strip().lower()
+    if raw_workers == 'auto':
+        workers = os.cpu_count() or 1
+    else:
+        workers = get_int(top, 'extract_workers', 1)  # type: ignore[arg-type]
+        if not isinstance(workers, int) or workers < 1:
+            workers = 1
+    try:
+        timeout = float(top.get('extract_timeout')) if top.get('extract_timeout') not in (None, '') else 120.0
+    except Exception:
+        timeout = 120.0
+    return {'workers': workers, 'timeout': (timeout if timeout > 0 else None)}
+
+
+def load_rag_embed_settings(session, provider: Optional[str] = None) -> Dict[str, object]:
+    """Return embedding scheduler settings for indexing.
+
+    Keys (read from [RAG], overridden by the same keys in the embedding
+    provider's own section, e.g. [OpenAI]):
+    - `embed_concurrency`: batches in flight at once (default 1)
+    - `embed_rpm` / `embed_tpm`: requests / tokens per minute (default unlimited)
+    - `embed_max_retries`: retries on throttling or transient server errors (default 5)
+    """
+    cfg = getattr(getattr(session, 'config', None), 'base_config', None) or configparser.ConfigParser()
+    sections = getattr(cfg, '_sections', {}) or {}
+    merged: Dict[str, object] = dict(sections.get('RAG', {}) or {})
+    if provider:
+        for key, val in (sections.get(provider, {}) or {}).items():
+            if key.startswith('embed_') and str(val).strip() != '':
+                merged[key] = val
+    concurrency = get_int(merged, 'embed_concurrency', 1)  # type: ignore[arg-type]
+    rpm = get_int(merged, 'embed_rpm')  # type: ignore[arg-type]
+    tpm = get_int(merged, 'embed_tpm')  # type: ignore[arg-type]
+    retries = get_int(merged, 'embed_max_retries', 5)  # type: ignore[arg-type]
+    return {
+        'concurrency': concurrency if isinstance(concurrency, int) and concurrency > 0 else 1,
+        'rpm': rpm if isinstance(rpm, int) and rpm > 0 else None,
+        'tpm': tpm if isinstance(tpm, int) and tpm > 0 else None,
+        'max_retries': retries if isinstance(retries, int) and retries >= 0 else 5,
+    }
+
+
+def load_rag_embedding_cache_bytes(session) -> int:
+    """Return the size cap in bytes for the shared embedding cache.
+
+    Reads `[RAG].embedding_cache_mb`; defaults to 1024 MB when unset/invalid.
+    Zero disables the cache (indexes only reuse their own previous vectors).
+    """
+    cfg = getattr(getattr(session, 'config', None), 'base_config', None) or configparser.ConfigParser()
+    top = getattr(cfg, '_sections', {}).get('RAG', {}) or {}
+    mb = get_int(top, 'embedding_cache_mb')  # type: ignore[arg-type]
+    if not isinstance(mb, int) or mb < 0:
+        return 1024 * 1024 * 1024
+    return mb * 1024 * 1024
+
+
+def load_rag_query_cache_settings(session) -> Dict[str, float]:
+    """Return settings for the persistent query embedding cache.
+
+    Reads `[RAG].query_cache_entries` (default 2048; 0 disables) and
+    `[RAG].query_cache_ttl` (seconds, default 7 days).
+    """
+    cfg = getattr(getattr(session, 'config', None), 'base_config', None) or configparser.ConfigParser()
+    top = getattr(cfg, '_sections', {}).get('RAG', {}) or {}
+    entries = get_int(top, 'query_cache_entries')  # type: ignore[arg-type]
+    ttl = get_int(top, 'query_cache_ttl')  # type: ignore[arg-type]
+    return {
+        'entries': entries if isinstance(entries, int) and entries >= 0 else 2048,
+        'ttl': ttl if isinstance(ttl, int) and ttl > 0 else 7 * 86400,
+    }
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import math
+import os
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .scoring import normalize_rows
+
+
+# Below this many chunks an index is searched exactly even if configured for IVF
+DEFAULT_MIN_CHUNKS = 10000
+# Rows per block when assigning vectors to centroids (bounds temporary memory)
+_ASSIGN_BLOCK = 65536
+
+CENTROIDS_FILE = 'ivf_centroids.npy'
+LISTS_FILE = 'ivf_lists.npy'
+OFFSETS_FILE = 'ivf_offsets.npy'
+
+
+def default_nlist(n: int) -> int:
+    return max(1, min(n, int(4 * math.sqrt(max(1, n)))))
+
+
+def default_nprobe(nlist: int) -> int:
+    return max(1, min(nlist, max(8, nlist // 20)))
+
+
+def _assign(matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    out = np.empty(matrix.shape[0], dtype=np.int32)
+    for i in range(0, matrix.shape[0], _ASSIGN_BLOCK):
+        block = np.asarray(matrix[i:i + _ASSIGN_BLOCK], dtype=np.float32)
+        out[i:i + block.shape[0]] = np.argmax(block @ centroids.T, axis=1)
+    return out
+
+
+def train_centroids(
+    matrix: np.ndarray,
+    nlist: int,
+    *,
+    iters: int = 10,
+    sample: Optional[int] = None,
+    seed: int = 0,
+) -> np.ndarray:
+    """Spherical k-means over (a sample of) row-normalized vectors."""
+    n = int(matrix.shape[0])
+    nlist = max(1, min(int(nlist), n))
+    rng = np.random.default_rng(seed)
+    sample_n = min(n, int(sample) if sample else max(nlist * 64, 4096))
+    rows = np.sort(rng.choice(n, size=sample_n, replace=False)) if sample_n < n else np.arange(n)
+    x = np.asarray(matrix[rows], dtype=np.float32)
+    centroids = x[rng.choice(x.shape[0], size=nlist, replace=False)].copy()
+    for _ in range(max(1, int(iters))):
+        labels = _assign(x, centroids)
+        counts = np.bincount(labels, minlength=nlist)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        nonempty = counts > 0
+        sums = np.zeros_like(centroids)
+        sums[nonempty] = np.add.reduceat(x[np.argsort(labels, kind='stable')], starts[nonempty], axis=0)
+        empty = np.flatnonzero(~nonempty)
+        if empty.size:
+            # Re-seed empty lists from random sample points
+            sums[empty] = x[rng.choice(x.shape[0], size=empty.size, replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class IVFIndex:
+    """IVF-Flat: vectors bucketed by nearest centroid, full vectors kept in place.
+
+    Artifacts (next to embeddings.npy):
+      - ivf_centroids.npy: (nlist x dim) float32, unit-length
+      - ivf_lists.npy:     row ids grouped by list, ascending within each list
+      - ivf_offsets.npy:   (nlist + 1) boundaries into ivf_lists
+    """
+
+    def __init__(self, centroids: np.ndarray, lists: np.ndarray, offsets: np.ndarray) -> None:
+        self.centroids = centroids
+        self.lists = lists
+        self.offsets = offsets
+
+    @property
+    def nlist(self) -> int:
+        return int(self.centroids.shape[0])
+
+    @classmethod
+    def build(
+        cls,
+        matrix: np.ndarray,
+        *,
+        nlist: Optional[int] = None,
+        centroids: Optional[np.ndarray] = None,
+        iters: int = 10,
+        seed: int = 0,
+    ) -> 'IVFIndex':
+        """Build from row-normalized vectors; reuse `centroids` when given."""
+        n = int(matrix.shape[0])
+        if centroids is None:
+            centroids = train_centroids(matrix, nlist or default_nlist(n), iters=iters, seed=seed)
+        labels = _assign(matrix, centroids)
+        lists = np.argsort(labels, kind='stable').astype(np.int64)
+        counts = np.bincount(labels, minlength=centroids.shape[0])
+        offsets = np.zeros(centroids.shape[0] + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(np.ascontiguousarray(centroids, dtype=np.float32), lists, offsets)
+
+    def candidates(self, query: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """Sorted row ids from the `nprobe` lists closest to the query."""
+        nprobe = max(1, min(self.nlist, int(nprobe or default_nprobe(self.nlist))))
+        cscores = self.centroids @ query
+        if nprobe < self.nlist:
+            probes = np.argpartition(-cscores, nprobe - 1)[:nprobe]
+        else:
+            probes = np.arange(self.nlist)
+        parts = [self.lists[self.offsets[p]:self.offsets[p + 1]] for p in probes]
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(np.concatenate(parts))
+
+    def meta(self, trained_on: int) -> Dict[str, Any]:
+        return {
+            'type': 'ivf',
+            'nlist': self.nlist,
+            'trained_on': int(trained_on),
+            'files': [CENTROIDS_FILE, LISTS_FILE, OFFSETS_FILE],
+        }
+
+    def save(self, index_dir: str) -> None:
+        for name, arr in ((CENTROIDS_FILE, self.centroids), (LISTS_FILE, self.lists), (OFFSETS_FILE, self.offsets)):
+            path = os.path.join(index_dir, name)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.save(f, arr, allow_pickle=False)
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, index_dir: str) -> Optional['IVFIndex']:
+        try:
+            centroids = np.load(os.path.join(index_dir, CENTROIDS_FILE), allow_pickle=False)
+            lists = np.load(os.path.join(index_dir, LISTS_FILE), mmap_mode='r', allow_pickle=False)
+            offsets = np.load(os.path.join(index_dir, OFFSETS_FILE), allow_pickle=False)
+        except Exception:
+            return None
+        if centroids.ndim != 2 or offsets.shape[0] != centroids.shape[0] + 1:
+            return None
+        return cls(centroids, lists, offsets)
+
+    @staticmethod
+    def remove(index_dir: str) -> None:
+        for name in (CENTROIDS_FILE, LISTS_FILE, OFFSETS_FILE):
+            try:
+                os.remove(os.path.join(index_dir, name))
+            except Exception:
+                pass
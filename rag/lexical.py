@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Word tokens (letters, digits, underscore), lowercased; identifiers like foo_bar stay whole
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MAX_TERM_LEN = 64
+DEFAULT_K1 = 1.2
+DEFAULT_B = 0.75
+
+TERMS_FILE = 'lex_terms.json'
+POSTINGS_FILE = 'lex_postings.npy'
+TF_FILE = 'lex_tf.npy'
+OFFSETS_FILE = 'lex_offsets.npy'
+DOCLEN_FILE = 'lex_doclen.npy'
+_FILES = (TERMS_FILE, POSTINGS_FILE, TF_FILE, OFFSETS_FILE, DOCLEN_FILE)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if len(t) <= MAX_TERM_LEN]
+
+
+def term_counts(text: str, vocab: Dict[str, int], terms: List[str]) -> Tuple[np.ndarray, np.ndarray, int]:
+    """(term ids, term frequencies, token count) for one chunk.
+
+    Terms not yet in `vocab` are appended to `terms` and assigned the next id.
+    """
+    tokens = tokenize(text)
+    counts = Counter(tokens)
+    ids = np.empty(len(counts), dtype=np.int64)
+    tfs = np.empty(len(counts), dtype=np.int64)
+    for i, (term, tf) in enumerate(counts.items()):
+        tid = vocab.get(term)
+        if tid is None:
+            tid = vocab[term] = len(terms)
+            terms.append(term)
+        ids[i] = tid
+        tfs[i] = tf
+    return ids, tfs, len(tokens)
+
+
+class BM25Index:
+    """Inverted index over chunk text with Okapi BM25 scoring.
+
+    Artifacts (next to chunks.npz, rows aligned with it):
+      - lex_terms.json:   vocabulary; term id = position
+      - lex_postings.npy: chunk rows grouped by term, ascending within each term
+      - lex_tf.npy:       term frequency per posting (uint16, saturated)
+      - lex_offsets.npy:  (terms + 1) boundaries into the postings
+      - lex_doclen.npy:   token count per chunk
+    """
+
+    def __init__(
+        self,
+        terms: List[str],
+        postings: np.ndarray,
+        tfs: np.ndarray,
+        offsets: np.ndarray,
+        doclen: np.ndarray,
+        *,
+        k1: float = DEFAULT_K1,
+        b: float = DEFAULT_B,
+    ) -> None:
+        self.terms = terms
+        self.vocab = {t: i for i, t in enumerate(terms)}
+        self.postings = postings
+        self.tfs = tfs
+        self.offsets = offsets
+        self.doclen = doclen
+        self.k1 = float(k1)
+        self.b = float(b)
+        n = int(doclen.shape[0])
+        self.avgdl = float(doclen.mean()) if n else 0.0
+
+    @property
+    def n_docs(self) -> int:
+        return int(self.doclen.shape[0])
+
+    @classmethod
+    def build(
+        cls,
+        terms: List[str],
+        rows: np.ndarray,
+        term_ids: np.ndarray,
+        tfs: np.ndarray,
+        doclen: np.ndarray,
+    ) -> 'BM25Index':
+        """Build from (row, term id, tf) triplets; terms without postings are dropped."""
+        rows = np.asarray(rows, dtype=np.int64)
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        counts = np.bincount(term_ids, minlength=len(terms)) if len(terms) else np.zeros(0, dtype=np.int64)
+        keep = counts > 0
+        remap = np.cumsum(keep) - 1
+        order = np.lexsort((rows, term_ids))
+        new_ids = remap[term_ids[order]] if order.size else np.zeros(0, dtype=np.int64)
+        kept_terms = [t for t, k in zip(terms, keep.tolist()) if k]
+        offsets = np.zeros(len(kept_terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(new_ids, minlength=len(kept_terms)), out=offsets[1:])
+        return cls(
+            kept_terms,
+            rows[order].astype(np.int32),
+            np.minimum(np.asarray(tfs)[order], np.iinfo(np.uint16).max).astype(np.uint16),
+            offsets,
+            np.asarray(doclen, dtype=np.int32),
+        )
+
+    def triplets(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """All postings as (rows, term ids, tfs); used to carry postings across updates."""
+        ids = np.repeat(np.arange(len(self.terms), dtype=np.int64), np.diff(self.offsets))
+        return np.asarray(self.postings, dtype=np.int64), ids, np.asarray(self.tfs, dtype=np.int64)
+
+    def scores(self, query: str) -> np.ndarray:
+        """Dense BM25 scores (float32, one per chunk); zero where no query term occurs."""
+        n = self.n_docs
+        out = np.zeros(n, dtype=np.float32)
+        ids = sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab})
+        if not ids or n == 0:
+            return out
+        rows_parts: List[np.ndarray] = []
+        contrib_parts: List[np.ndarray] = []
+        norm = self.k1 * (1.0 - self.b + self.b * self.doclen / (self.avgdl or 1.0))
+        for tid in ids:
+            a, b = int(self.offsets[tid]), int(self.offsets[tid + 1])
+            rows = np.asarray(self.postings[a:b], dtype=np.int64)
+            tf = np.asarray(self.tfs[a:b], dtype=np.float32)
+            df = b - a
+            idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            rows_parts.append(rows)
+            contrib_parts.append(idf * tf * (self.k1 + 1.0) / (tf + norm[rows]))
+        out[:] = np.bincount(np.concatenate(rows_parts), weights=np.concatenate(contrib_parts), minlength=n)
+        return out
+
+    def meta(self) -> Dict[str, Any]:
+        return {
+            'type': 'bm25',
+            'terms': len(self.terms),
+            'postings': int(self.postings.shape[0]),
+            'avgdl': round(self.avgdl, 3),
+            'k1': self.k1,
+            'b': self.b,
+            'files': list(_FILES),
+        }
+
+    def save(self, index_dir: str) -> None:
+        path = os.path.join(index_dir, TERMS_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.terms, f, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+        for name, arr in ((POSTINGS_FILE, self.postings), (TF_FILE, self.tfs),
+                          (OFFSETS_FILE, self.offsets), (DOCLEN_FILE, self.doclen)):
+            path = os.path.join(index_dir, name)
+            with open(path + '.tmp', 'wb') as f:
+                np.save(f, arr, allow_pickle=False)
+            os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, index_dir: str, meta: Optional[Dict[str, Any]] = None) -> Optional['BM25Index']:
+        try:
+            with open(os.path.join(index_dir, TERMS_FILE), 'r', encoding='utf-8') as f:
+                terms = json.load(f)
+            postings = np.load(os.path.join(index_dir, POSTINGS_FILE), mmap_mode='r', allow_pickle=False)
+            tfs = np.load(os.path.join(index_dir, TF_FILE), mmap_mode='r', allow_pickle=False)
+            offsets = np.load(os.path.join(index_dir, OFFSETS_FILE), allow_pickle=False)
+            doclen = np.load(os.path.join(index_dir, DOCLEN_FILE), allow_pickle=False)
+        except Exception:
+            return None
+        if offsets.shape[0] != len(terms) + 1 or postings.shape[0] != tfs.shape[0]:
+            return None
+        meta = meta or {}
+        return cls(terms, postings, tfs, offsets, doclen,
+                   k1=meta.get('k1', DEFAULT_K1), b=meta.get('b', DEFAULT_B))
+
+    @staticmethod
+    def remove(index_dir: str) -> None:
+        for name in _FILES:
+            try:
+                os.remove(os.path.join(index_dir, name))
+            except Exception:
+                pass
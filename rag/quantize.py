@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .vector_store import NaiveStore
+
+
+QUANT_KINDS = ('binary', 'int8')
+# Rows scored per block when scanning codes (keeps the float32 temporaries cache-sized)
+_SCAN_BLOCK = 4096
+# Shortlist grows by this factor at the binary stage when int8 codes follow
+_CASCADE_FACTOR = 4
+# Set bits per byte value, for Hamming distances on NumPy < 2.0 (no bitwise_count)
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+_HAS_BITWISE_COUNT = hasattr(np, 'bitwise_count')
+
+RECALL_K = 10
+RECALL_QUERIES = 20
+
+
+def parse_kinds(value: Any) -> Tuple[str, ...]:
+    """Normalize a quantization setting ('int8', 'binary', 'int8,binary', 'none')
+    to the known kinds in cascade order (coarsest first)."""
+    if not value:
+        return ()
+    if isinstance(value, str):
+        parts = value.replace('+', ',').split(',')
+    else:
+        parts = list(value)
+    want = {str(p).strip().lower() for p in parts}
+    return tuple(k for k in QUANT_KINDS if k in want)
+
+
+def default_rescore(k: int) -> int:
+    """Candidates re-scored exactly per index for a top-k query."""
+    return max(100, 10 * int(k))
+
+
+def fit_int8(matrix: np.ndarray) -> np.ndarray:
+    """Per-dimension (low, step) rows mapping [min, max] onto 256 levels."""
+    lo = np.full(matrix.shape[1], np.inf, dtype=np.float32)
+    hi = np.full(matrix.shape[1], -np.inf, dtype=np.float32)
+    for i in range(0, matrix.shape[0], _SCAN_BLOCK):
+        block = np.asarray(matrix[i:i + _SCAN_BLOCK], dtype=np.float32)
+        np.minimum(lo, block.min(axis=0), out=lo)
+        np.maximum(hi, block.max(axis=0), out=hi)
+    step = (hi - lo) / 255.0
+    step[step <= 0] = 1.0
+    return np.stack([lo, step]).astype(np.float32)
+
+
+def encode_int8(block: np.ndarray, params: np.ndarray) -> np.ndarray:
+    levels = np.rint((np.asarray(block, dtype=np.float32) - params[0]) / params[1])
+    return (np.clip(levels, 0, 255) - 128).astype(np.int8)
+
+
+def binary_width(dim: int) -> int:
+    """Bytes per packed sign-bit row, padded to whole 64-bit words."""
+    return 8 * ((int(dim) + 63) // 64)
+
+
+def encode_binary(block: np.ndarray) -> np.ndarray:
+    block = np.atleast_2d(np.asarray(block))
+    bits = np.packbits(block > 0, axis=1)
+    pad = binary_width(block.shape[1]) - bits.shape[1]
+    return np.pad(bits, ((0, 0), (0, pad))) if pad else bits
+
+
+def _hamming(codes: np.ndarray, qbits: np.ndarray) -> np.ndarray:
+    """(queries x rows) Hamming distances between packed sign-bit rows."""
+    if _HAS_BITWISE_COUNT:
+        x = np.ascontiguousarray(codes).view(np.uint64)[None, :, :] ^ qbits.view(np.uint64)[:, None, :]
+        return np.bitwise_count(x).sum(axis=2, dtype=np.int32)
+    return _POPCOUNT[codes[None, :, :] ^ qbits[:, None, :]].sum(axis=2, dtype=np.int32)
+
+
+class QuantizedCodes:
+    """Compressed copies of an index's vectors for a fast approximate pass.
+
+    - int8:   per-dimension scalar codes (1 byte/dim); scores are the dot
+              product against the dequantized rows, computed from the codes
+    - binary: sign bits (1 bit/dim); scores are negated Hamming distances
+
+    With both kinds the binary pass narrows to a wider shortlist that int8
+    then trims. Callers re-score the final shortlist exactly against the
+    float32 rows, so only those rows of `embeddings.npy` are ever touched.
+    """
+
+    def __init__(
+        self,
+        int8: Optional[np.ndarray] = None,
+        int8_params: Optional[np.ndarray] = None,
+        binary: Optional[np.ndarray] = None,
+    ) -> None:
+        self.int8 = int8
+        self.int8_params = int8_params
+        self.binary = binary
+
+    @property
+    def kinds(self) -> Tuple[str, ...]:
+        return tuple(k for k in QUANT_KINDS if getattr(self, k) is not None)
+
+    @property
+    def count(self) -> int:
+        codes = self.int8 if self.int8 is not None else self.binary
+        return int(codes.shape[0]) if codes is not None else 0
+
+    @classmethod
+    def build(
+        cls, store: NaiveStore, matrix: np.ndarray, kinds: Sequence[str], *, commit: bool = True,
+    ) -> 'QuantizedCodes':
+        """Encode row-normalized `matrix` block by block into on-disk codes.
+
+        With commit=False the codes stay staged (`.tmp` files) until the caller
+        runs `store.remove_codes()` and `store.commit_codes()`; the returned
+        arrays remain valid across that rename.
+        """
+        if commit:
+            store.remove_codes()
+        n, dim = int(matrix.shape[0]), int(matrix.shape[1])
+        params = fit_int8(matrix) if 'int8' in kinds else None
+        int8 = store.create_codes('int8', (n, dim), np.int8) if params is not None else None
+        binary = store.create_codes('binary', (n, binary_width(dim)), np.uint8) if 'binary' in kinds else None
+        for i in range(0, n, _SCAN_BLOCK):
+            block = np.asarray(matrix[i:i + _SCAN_BLOCK], dtype=np.float32)
+            if int8 is not None:
+                int8[i:i + block.shape[0]] = encode_int8(block, params)
+            if binary is not None:
+                binary[i:i + block.shape[0]] = encode_binary(block)
+        if params is not None:
+            store.write_codes('int8_params', params)
+        if not commit:
+            return cls(int8, params, binary)
+        store.commit_codes()
+        return cls.load(store.index_dir)
+
+    @classmethod
+    def load(cls, index_dir: str) -> Optional['QuantizedCodes']:
+        store = NaiveStore.from_index_dir(index_dir)
+        int8 = store.read_codes('int8')
+        params = store.read_codes('int8_params') if int8 is not None else None
+        binary = store.read_codes('binary')
+        if int8 is not None and (params is None or params.shape != (2, int8.shape[1])):
+            int8 = None
+        if int8 is None and binary is None:
+            return None
+        if int8 is not None and binary is not None and int8.shape[0] != binary.shape[0]:
+            return None
+        return cls(int8, np.asarray(params, dtype=np.float32) if int8 is not None else None, binary)
+
+    def _scorer(self, kind: str, queries: np.ndarray) -> Callable[[np.ndarray], np.ndarray]:
+        """Approximate (queries x rows) scores for a block of code rows."""
+        if kind == 'int8':
+            params = self.int8_params
+            qs = queries * params[1]
+            bias = queries @ params[0] + 128.0 * qs.sum(axis=1)
+            return lambda codes: (qs @ codes.astype(np.float32).T) + bias[:, None]
+        qbits = encode_binary(queries)
+        return lambda codes: -_hamming(codes, qbits).astype(np.float32)
+
+    def _scan(self, kind: str, queries: np.ndarray, n: int, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Best `n` rows per query by approximate score, as a (queries x n) array."""
+        codes = getattr(self, kind)
+        score = self._scorer(kind, queries)
+        total = self.count if rows is None else int(rows.shape[0])
+        best_s = np.zeros((queries.shape[0], 0), dtype=np.float32)
+        best_i = np.zeros((queries.shape[0], 0), dtype=np.int64)
+        for a in range(0, total, _SCAN_BLOCK):
+            b = min(total, a + _SCAN_BLOCK)
+            ids = np.arange(a, b, dtype=np.int64) if rows is None else rows[a:b]
+            block = codes[a:b] if rows is None else codes[ids]
+            cand_s = np.concatenate([best_s, score(np.asarray(block))], axis=1)
+            cand_i = np.concatenate([best_i, np.broadcast_to(ids, (queries.shape[0], ids.shape[0]))], axis=1)
+            if cand_s.shape[1] > n:
+                keep = np.argpartition(-cand_s, n - 1, axis=1)[:, :n]
+                cand_s = np.take_along_axis(cand_s, keep, axis=1)
+                cand_i = np.take_along_axis(cand_i, keep, axis=1)
+            best_s, best_i = cand_s, cand_i
+        return best_i
+
+    def shortlist_many(self, queries: np.ndarray, n: int, rows: Optional[np.ndarray] = None) -> List[np.ndarray]:
+        """Sorted candidate row ids (at most `n`) per unit-length query row.
+
+        `rows` restricts the scan to a subset (e.g. IVF candidates).
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        n = max(1, int(n))
+        kinds = self.kinds
+        if len(kinds) > 1:
+            wide = self._scan(kinds[0], queries, n * _CASCADE_FACTOR, rows)
+            out: List[np.ndarray] = []
+            for qi in range(queries.shape[0]):
+                cand = np.sort(wide[qi])
+                out.append(np.sort(self._scan(kinds[1], queries[qi:qi + 1], n, cand)[0]))
+            return out
+        return [np.sort(r) for r in self._scan(kinds[0], queries, n, rows)]
+
+    def shortlist(self, query: np.ndarray, n: int, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        return self.shortlist_many(query[None, :], n, rows)[0]
+
+
+def measure_recall(
+    matrix: np.ndarray,
+    codes: QuantizedCodes,
+    *,
+    rescore: int,
+    k: int = RECALL_K,
+    queries: int = RECALL_QUERIES,
+    seed: int = 0,
+) -> Optional[float]:
+    """Recall@k of shortlist + exact re-scoring against exact search.
+
+    Queries are normalized midpoints of random pairs of indexed vectors, so
+    they lie near the data without being copies of any row.
+    """
+    n = int(matrix.shape[0])
+    if n < 2 or k <= 0:
+        return None
+    k = min(k, n)
+    rng = np.random.default_rng(seed)
+    pairs = rng.integers(0, n, size=(max(1, int(queries)), 2))
+    qs = np.asarray(matrix[pairs[:, 0]], dtype=np.float32) + np.asarray(matrix[pairs[:, 1]], dtype=np.float32)
+    norms = np.linalg.norm(qs, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    qs = qs / norms
+    # Exact top-k for every query in one blocked pass
+    best_s = np.zeros((qs.shape[0], 0), dtype=np.float32)
+    best_i = np.zeros((qs.shape[0], 0), dtype=np.int64)
+    for a in range(0, n, _SCAN_BLOCK):
+        block = np.asarray(matrix[a:a + _SCAN_BLOCK], dtype=np.float32)
+        cand_s = np.concatenate([best_s, qs @ block.T], axis=1)
+        ids = np.arange(a, a + block.shape[0], dtype=np.int64)
+        cand_i = np.concatenate([best_i, np.broadcast_to(ids, (qs.shape[0], ids.shape[0]))], axis=1)
+        if cand_s.shape[1] > k:
+            keep = np.argpartition(-cand_s, k - 1, axis=1)[:, :k]
+            cand_s = np.take_along_axis(cand_s, keep, axis=1)
+            cand_i = np.take_along_axis(cand_i, keep, axis=1)
+        best_s, best_i = cand_s, cand_i
+    found = 0
+    for qi, cand in enumerate(codes.shortlist_many(qs, max(k, int(rescore)))):
+        exact = np.asarray(matrix[cand], dtype=np.float32) @ qs[qi]
+        top = cand[np.argsort(-exact, kind='stable')[:k]]
+        found += len(set(top.tolist()) & set(best_i[qi].tolist()))
+    return round(found / float(k * qs.shape[0]), 4)
+
+
+def quantization_meta(codes: QuantizedCodes, *, rescore: int, recall: Optional[float]) -> Dict[str, Any]:
+    return {
+        'kinds': list(codes.kinds),
+        'files': [NaiveStore.codes_file(k) for k in codes.kinds] + (
+            [NaiveStore.codes_file('int8_params')] if codes.int8 is not None else []
+        ),
+        'rescore': int(rescore),
+        'recall': recall,
+        'recall_k': RECALL_K,
+        'recall_queries': RECALL_QUERIES,
+    }
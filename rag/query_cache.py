@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+DEFAULT_QUERY_CACHE_ENTRIES = 2048
+DEFAULT_QUERY_CACHE_TTL_S = 7 * 86400
+QUERY_CACHE_FILE = 'query_cache.sqlite'
+
+_WS_RE = re.compile(r'\s+')
+
+
+def normalize_query(text: str) -> str:
+    """Cache form of a query: NFC, whitespace collapsed and trimmed.
+
+    Case is kept: embedding models distinguish 'Go' from 'go'.
+    """
+    return _WS_RE.sub(' ', unicodedata.normalize('NFC', str(text or ''))).strip()
+
+
+def query_key(provider: str, model: str, text: str) -> str:
+    blob = json.dumps([str(provider or ''), str(model or ''), normalize_query(text)], ensure_ascii=False)
+    return hashlib.sha1(blob.encode('utf-8')).hexdigest()
+
+
+class QueryEmbeddingCache:
+    """Persistent LRU + TTL cache of query embeddings under `vector_db`.
+
+    Vectors are keyed by (provider, model, normalized query text) and stored
+    as float32 blobs in `<vector_db>/query_cache.sqlite`. Entries older than
+    `ttl` seconds are treated as misses and dropped; once more than
+    `max_entries` are stored, the least recently used ones are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = DEFAULT_QUERY_CACHE_ENTRIES,
+        ttl: float = DEFAULT_QUERY_CACHE_TTL_S,
+    ) -> None:
+        self.path = os.path.expanduser(path)
+        self.max_entries = int(max_entries)
+        self.ttl = float(ttl)
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def for_vector_db(
+        cls,
+        vector_db: str,
+        max_entries: int = DEFAULT_QUERY_CACHE_ENTRIES,
+        ttl: float = DEFAULT_QUERY_CACHE_TTL_S,
+    ) -> 'QueryEmbeddingCache':
+        return cls(os.path.join(os.path.expanduser(vector_db), QUERY_CACHE_FILE), max_entries, ttl)
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS queries ('
+                ' key TEXT PRIMARY KEY, dim INTEGER NOT NULL, vec BLOB NOT NULL,'
+                ' created REAL NOT NULL, last_used REAL NOT NULL) WITHOUT ROWID'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_queries_last_used ON queries(last_used)')
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, provider: str, model: str, texts: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Return normalized text -> vector for the fresh entries among `texts`."""
+        keys = {query_key(provider, model, t): normalize_query(t) for t in texts}
+        out: Dict[str, np.ndarray] = {}
+        if not keys:
+            return out
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            marks = ','.join('?' * len(keys))
+            rows = db.execute(
+                f'SELECT key, dim, vec, created FROM queries WHERE key IN ({marks})', list(keys)
+            ).fetchall()
+            fresh: List[str] = []
+            stale: List[str] = []
+            for key, dim, vec, created in rows:
+                arr = np.frombuffer(vec, dtype=np.float32)
+                if now - float(created) > self.ttl or arr.shape[0] != dim:
+                    stale.append(key)
+                    continue
+                out[keys[key]] = arr
+                fresh.append(key)
+            if fresh:
+                db.executemany('UPDATE queries SET last_used = ? WHERE key = ?', [(now, k) for k in fresh])
+            if stale:
+                db.executemany('DELETE FROM queries WHERE key = ?', [(k,) for k in stale])
+            if fresh or stale:
+                db.commit()
+            self.hits += len(out)
+            self.misses += len(keys) - len(out)
+        return out
+
+    def put_many(self, provider: str, model: str, texts: Sequence[str], vecs: Any) -> None:
+        matrix = np.ascontiguousarray(vecs, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] != len(texts) or self.max_entries <= 0:
+            return
+        now = time.time()
+        dim = int(matrix.shape[1])
+        with self._lock:
+            db = self._db()
+            db.executemany(
+                'INSERT OR REPLACE INTO queries (key, dim, vec, created, last_used) VALUES (?, ?, ?, ?, ?)',
+                [(query_key(provider, model, t), dim, matrix[i].tobytes(), now, now) for i, t in enumerate(texts)],
+            )
+            self._evict_locked(db)
+            db.commit()
+
+    def _evict_locked(self, db: sqlite3.Connection) -> None:
+        count = db.execute('SELECT COUNT(*) FROM queries').fetchone()[0]
+        if count > self.max_entries:
+            db.execute(
+                'DELETE FROM queries WHERE key IN (SELECT key FROM queries ORDER BY last_used LIMIT ?)',
+                (count - self.max_entries,),
+            )
+
+    def wrap(self, embed_fn: Callable[[List[str]], Any], provider: str, model: str) -> 'CachedQueryEmbedder':
+        return CachedQueryEmbedder(self, embed_fn, provider, model)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._db().execute('SELECT COUNT(*) FROM queries').fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'path': self.path,
+            'entries': int(entries),
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / lookups) if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class CachedQueryEmbedder:
+    """`embed_query_fn` drop-in: serves cached queries and embeds only the
+    misses (in one call). `hits` / `misses` count this embedder's lookups."""
+
+    def __init__(self, cache: QueryEmbeddingCache, embed_fn: Callable[[List[str]], Any], provider: str, model: str) -> None:
+        self.cache = cache
+        self.embed_fn = embed_fn
+        self.provider = provider
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, batch: Sequence[str]) -> np.ndarray:
+        texts = [normalize_query(t) for t in batch]
+        try:
+            found = self.cache.get_many(self.provider, self.model, texts)
+        except sqlite3.Error:
+            found = {}
+        missing = list(dict.fromkeys(t for t in texts if t not in found))
+        self.hits += len(found)
+        self.misses += len(missing)
+        if missing:
+            vecs = np.asarray(self.embed_fn(missing), dtype=np.float32)
+            if vecs.ndim != 2 or vecs.shape[0] != len(missing):
+                raise ValueError('embedding provider returned an unexpected shape')
+            try:
+                self.cache.put_many(self.provider, self.model, missing, vecs)
+            except sqlite3.Error:
+                pass
+            found.update(zip(missing, vecs))
+        return np.stack([found[t] for t in texts]) if texts else np.zeros((0, 0), dtype=np.float32)
+
+    def event(self) -> Dict[str, Any]:
+        """Details for a `query_cache` log event: this embedder's hits/misses
+        plus the cache's hit rate since the process started."""
+        lookups = self.cache.hits + self.cache.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.cache.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_CACHES: Dict[str, QueryEmbeddingCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_query_cache(
+    vector_db: str,
+    max_entries: int = DEFAULT_QUERY_CACHE_ENTRIES,
+    ttl: float = DEFAULT_QUERY_CACHE_TTL_S,
+) -> Optional[QueryEmbeddingCache]:
+    """Process-wide cache for `vector_db` (None when disabled with max_entries=0)."""
+    if int(max_entries) <= 0:
+        return None
+    path = os.path.join(os.path.abspath(os.path.expanduser(vector_db)), QUERY_CACHE_FILE)
+    with _CACHES_LOCK:
+        cache = _CACHES.get(path)
+        if cache is None:
+            cache = _CACHES[path] = QueryEmbeddingCache(path, max_entries, ttl)
+        cache.max_entries = int(max_entries)
+        cache.ttl = float(ttl)
+        return cache
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Return a float32 copy of `matrix` with unit-length rows.
+
+    Zero rows are left as-is (norm treated as 1.0), matching the scalar path.
+    """
+    m = np.asarray(matrix, dtype=np.float32)
+    if m.size == 0:
+        return np.ascontiguousarray(m, dtype=np.float32)
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(m / norms, dtype=np.float32)
+
+
+def normalize_vector(vec: Sequence[float] | np.ndarray) -> np.ndarray:
+    v = np.asarray(vec, dtype=np.float32).reshape(-1)
+    n = float(np.linalg.norm(v)) or 1.0
+    return v / n
+
+
+def _top(scores: np.ndarray, candidates: Optional[np.ndarray], k: int) -> np.ndarray:
+    """Best `k` positions among candidates, ordered by score desc then position.
+
+    Uses argpartition to find the k-th score, then keeps every candidate tied
+    with it so the final ordering is identical to a stable full sort.
+    """
+    cand_scores = scores if candidates is None else scores[candidates]
+    m = int(cand_scores.shape[0])
+    if m == 0 or k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if m > k:
+        part = np.argpartition(-cand_scores, k - 1)[:k]
+        kth = cand_scores[part].min()
+        keep = np.flatnonzero(cand_scores >= kth)
+    else:
+        keep = np.arange(m)
+    idx = keep if candidates is None else candidates[keep]
+    order = np.lexsort((idx, -scores[idx]))
+    return idx[order][:k]
+
+
+def top_k_indices(
+    scores: np.ndarray,
+    k: int,
+    *,
+    threshold: Optional[float] = None,
+    offsets: Optional[List[int]] = None,
+    cap: Optional[int] = None,
+) -> np.ndarray:
+    """Select the top-k positions from a flat score array.
+
+    - threshold: drop scores below this value before selection
+    - offsets/cap: `offsets` are segment boundaries ([0, n1, n1+n2, ...]) for
+      the concatenated per-index scores; at most `cap` hits are kept per segment
+    """
+    n = int(scores.shape[0])
+    if n == 0 or k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    candidates: Optional[np.ndarray] = None
+    if threshold is not None and threshold > 0.0:
+        candidates = np.flatnonzero(scores >= threshold)
+    if cap and offsets and len(offsets) > 1:
+        pool = candidates if candidates is not None else np.arange(n)
+        per_seg: List[np.ndarray] = []
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            lo = np.searchsorted(pool, start, side='left')
+            hi = np.searchsorted(pool, end, side='left')
+            if hi > lo:
+                per_seg.append(_top(scores, pool[lo:hi], min(cap, k)))
+        if not per_seg:
+            return np.zeros(0, dtype=np.int64)
+        candidates = np.concatenate(per_seg)
+    return _top(scores, candidates, k)
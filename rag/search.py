@@ -1,41 +1,153 @@
 from __future__ import annotations
 
-import json
-import math
 import os
-from pathlib import Path
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Optional
 
+import numpy as np
 
-def _load_index(index_dir: str) -> Tuple[List[Dict[str, Any]], List[List[float]]]:
-    chunks_path = os.path.join(index_dir, 'chunks.jsonl')
-    emb_path = os.path.join(index_dir, 'embeddings.json')
-    chunks: List[Dict[str, Any]] = []
-    try:
-        with open(chunks_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                try:
-                    chunks.append(json.loads(line))
-                except Exception:
-                    continue
-    except FileNotFoundError:
-        return [], []
-    try:
-        with open(emb_path, 'r', encoding='utf-8') as f:
-            embeddings: List[List[float]] = json.load(f)
-    except FileNotFoundError:
-        return [], []
-    return chunks, embeddings
+from .cache import get_index_cache
+from .chunk_table import ChunkTable
+from .filters import filter_rows
+from .ivf import IVFIndex
+from .lexical import BM25Index
+from .quantize import QuantizedCodes, default_rescore
+from .scoring import normalize_rows, normalize_vector, top_k_indices
+from .vector_store import NaiveStore, empty_matrix, is_normalized
+
+
+SEARCH_MODES = ('vector', 'lexical', 'hybrid')
+# Reciprocal rank fusion constant (Cormack et al.)
+DEFAULT_RRF_K = 60
+# Read size when seeking for preview context
+_PREVIEW_BLOCK = 4096
+# BM25 hits must match at least one query term
+_MIN_LEXICAL_SCORE = float(np.finfo(np.float32).tiny)
+
+
+def _load_index(index_dir: str) -> Tuple[ChunkTable, np.ndarray]:
+    """Load chunk records and the (row-normalized) embeddings matrix."""
+    chunks, embs, _ = _load_index_entry(index_dir)
+    return chunks, embs
+
+
+def _load_index_entry(index_dir: str) -> Tuple[ChunkTable, np.ndarray, Dict[str, Any]]:
+    """(chunks, embeddings, manifest), served from the process-wide index cache
+    while the artifacts are unchanged."""
+    return get_index_cache().get(index_dir, _read_index)
+
+
+def _read_index(index_dir: str) -> Tuple[ChunkTable, np.ndarray, Dict[str, Any]]:
+    store = NaiveStore.from_index_dir(index_dir)
+    if not store.has_chunks():
+        return ChunkTable.empty(), empty_matrix(), {}
+    chunks = store.read_chunks()
+    if not len(chunks):
+        return chunks, empty_matrix(), {}
+    embs = store.read_embeddings()
+    manifest = store.read_manifest() or {}
+    if len(embs) and not is_normalized(manifest):
+        # Indexes written before rows were normalized at write time
+        embs = normalize_rows(embs)
+    return chunks, embs, manifest
 
 
-def _normalize(vec: List[float]) -> List[float]:
-    s = math.sqrt(sum(x*x for x in vec)) or 1.0
-    return [x / s for x in vec]
+def _load_lexical(index_dir: str, generation: Optional[int] = None) -> Optional[BM25Index]:
+    """Load the BM25 inverted index written by `update_index`."""
+    return get_index_cache().get(index_dir, BM25Index.load, kind='lex', generation=generation)
 
 
-def _cosine(a: List[float], b: List[float]) -> float:
-    # assumes both normalized
-    return sum(x*y for x, y in zip(a, b))
+def _load_quantized(index_dir: str, generation: Optional[int] = None) -> Optional[QuantizedCodes]:
+    """Load int8/binary codes (memory-mapped) for an index built with quantization."""
+    return get_index_cache().get(index_dir, QuantizedCodes.load, kind='quant', generation=generation)
+
+
+def _read_mtimes(index_dir: str) -> Dict[str, int]:
+    return {
+        str(row['path']): int(row['mtime_ns'])
+        for row in NaiveStore.from_index_dir(index_dir).read_files()
+        if row.get('path') and row.get('mtime_ns') is not None
+    }
+
+
+def _load_mtimes(index_dir: str, generation: Optional[int] = None) -> Optional[Dict[str, int]]:
+    """Source path -> mtime_ns from the index's per-file state (for recency filters)."""
+    return get_index_cache().get(index_dir, _read_mtimes, kind='files', generation=generation)
+
+
+def _load_ann(index_dir: str, generation: Optional[int] = None) -> Optional[IVFIndex]:
+    """Load approximate-search lists for an index built with the IVF backend."""
+    return get_index_cache().get(index_dir, IVFIndex.load, kind='ivf', generation=generation)
+
+
+def _seek_preview(path: str, lines: List[int], offsets: List[int], preview_lines: int) -> List[str]:
+    """Preview window read with seeks from a chunk's stored line/byte positions.
+
+    `lines` is the chunk's [line_start, line_end] and `offsets` the byte
+    offsets where those two lines begin. Only the chunk plus `preview_lines`
+    of context on either side is read, however large the file is.
+    """
+    ls, le = int(lines[0]), int(lines[1])
+    b0, b1 = int(offsets[0]), int(offsets[1])
+    before = min(preview_lines, ls - 1)
+    with open(path, 'rb') as f:
+        # Walk back from the chunk's first line to the start of the context window
+        start: Optional[int] = 0 if before == ls - 1 else None
+        pos = b0
+        tail = b''
+        while start is None and pos > 0:
+            step = min(_PREVIEW_BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            tail = f.read(step) + tail
+            idx = len(tail)
+            for _ in range(before + 1):
+                idx = tail.rfind(b'\n', 0, idx)
+                if idx < 0:
+                    break
+            else:
+                start = pos + idx + 1
+        if start is None:
+            start = 0
+        # Walk forward from the chunk's last line through the trailing context
+        f.seek(b1)
+        end = b1
+        remaining = preview_lines + 1
+        while remaining > 0:
+            blk = f.read(_PREVIEW_BLOCK)
+            if not blk:
+                break
+            i = -1
+            while remaining > 0:
+                i = blk.find(b'\n', i + 1)
+                if i < 0:
+                    break
+                remaining -= 1
+            end += (i + 1) if remaining == 0 else len(blk)
+        f.seek(start)
+        data = f.read(max(0, end - start))
+    window = data.decode('utf-8', errors='ignore').splitlines()
+    return window[:(le + preview_lines) - (ls - before) + 1]
+
+
+def _chunk_lines(ch: Dict[str, Any], preview_lines: int) -> Tuple[int, int, List[str]]:
+    """(line_start, line_end, preview) for a hit.
+
+    Uses positions stored by the indexer when present; chunks from older
+    indexes (or files whose bytes don't match the decoded text) fall back to
+    scanning the preview file.
+    """
+    preview_lines = int(preview_lines or 0)
+    path = ch.get('path')
+    lines = ch.get('lines')
+    offsets = ch.get('bytes')
+    if lines and (preview_lines <= 0 or offsets):
+        if preview_lines <= 0:
+            return int(lines[0]), int(lines[1]), []
+        try:
+            return int(lines[0]), int(lines[1]), _seek_preview(path, lines, offsets, preview_lines)
+        except Exception:
+            pass
+    return _char_to_line_range(path, int(ch.get('start', 0)), int(ch.get('end', 0)), preview_lines)
 
 
 def _char_to_line_range(path: str, start: int, end: int, preview_lines: int) -> Tuple[int, int, List[str]]:
@@ -81,6 +193,61 @@ def _char_to_line_range(path: str, start: int, end: int, preview_lines: int) ->
     return ls, le, snippet
 
 
+def _top_hits(
+    parts: List[np.ndarray],
+    seg_ids: List[int],
+    row_maps: List[Optional[np.ndarray]],
+    k: int,
+    *,
+    threshold: float | None,
+    cap: int | None,
+) -> List[Tuple[int, int, float]]:
+    """Rank flat per-index score arrays into (segment, chunk row, score) hits."""
+    if not parts:
+        return []
+    offsets = [0]
+    for part in parts:
+        offsets.append(offsets[-1] + int(part.shape[0]))
+    scores = np.concatenate(parts)
+    hits: List[Tuple[int, int, float]] = []
+    for gi in top_k_indices(scores, k, threshold=threshold, offsets=offsets, cap=cap).tolist():
+        if scores[gi] == -np.inf:
+            continue  # collapsed duplicate
+        pos = int(np.searchsorted(offsets, gi, side='right')) - 1
+        local = gi - offsets[pos]
+        rows = row_maps[pos]
+        hits.append((seg_ids[pos], int(rows[local]) if rows is not None else local, float(scores[gi])))
+    return hits
+
+
+def _fuse_rrf(
+    rankings: List[List[Tuple[int, int, float]]],
+    k: int,
+    *,
+    rrf_k: int = DEFAULT_RRF_K,
+    cap: int | None = None,
+) -> List[Tuple[int, int, float]]:
+    """Reciprocal rank fusion: score = sum(1 / (rrf_k + rank)) over the rankings.
+
+    Ties keep first-seen order (rankings are visited in the order given).
+    """
+    fused: Dict[Tuple[int, int], float] = {}
+    for hits in rankings:
+        for rank, (seg, row, _) in enumerate(hits, start=1):
+            fused[(seg, row)] = fused.get((seg, row), 0.0) + 1.0 / (rrf_k + rank)
+    order = sorted(fused.items(), key=lambda kv: -kv[1])  # stable: first-seen order on ties
+    out: List[Tuple[int, int, float]] = []
+    per_seg: Dict[int, int] = {}
+    for (seg, row), score in order:
+        if cap is not None and cap > 0 and per_seg.get(seg, 0) >= cap:
+            continue
+        per_seg[seg] = per_seg.get(seg, 0) + 1
+        out.append((seg, row, score))
+        if len(out) >= k:
+            break
+    return out
+
+
 def search(
     *,
     indexes: Dict[str, str],
@@ -91,70 +258,333 @@ def search(
     k: int = 8,
     preview_lines: int = 0,
     per_index_cap: int | None = None,
+    threshold: float | None = None,
+    ann_options: Optional[Dict[str, Dict[str, Any]]] = None,
+    mode: str = 'vector',
+    rrf_k: int = DEFAULT_RRF_K,
+    filters: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     """Search across provided index names; return ranked results with previews.
 
+    Scores are cosine similarities computed as one matrix-vector product per
+    index over row-normalized vectors; selection uses partial sorting.
+    Indexes built with the IVF backend only score rows from the `nprobe`
+    nearest lists. Indexes with quantized codes scan the codes first and
+    re-score only the best `rescore` rows against the float32 vectors.
+    ann_options maps index name -> {'nprobe': int, 'rescore': int, 'exact': bool};
+    'exact' bypasses both approximations.
+
+    mode:
+      - 'vector'  (default): embedding similarity only
+      - 'lexical': BM25 over the on-disk inverted index; embed_query_fn is not
+        called (it may be None) and `threshold` does not apply
+      - 'hybrid':  both rankings (deeper than k) merged by reciprocal rank
+        fusion with constant `rrf_k`; `threshold` filters the vector side
+
+    filters (from `rag.filters.build_filters`) restrict every index to the
+    rows whose source file matches, before any scoring: only those rows'
+    vectors, codes and postings are scored.
+
     Returns dict with 'query', 'results' list where each result has:
       { 'score': float, 'path': str, 'line_start': int, 'line_end': int, 'index': str, 'preview': [lines] }
     """
-    # Load all vectors
-    all_items: List[Tuple[str, Dict[str, Any], List[float]]] = []
+    res = search_many(
+        indexes=indexes, names=names, vector_db=vector_db, embed_query_fn=embed_query_fn, queries=[query],
+        k=k, preview_lines=preview_lines, per_index_cap=per_index_cap, threshold=threshold,
+        ann_options=ann_options, mode=mode, rrf_k=rrf_k, filters=filters,
+    )
+    return {"query": query, "results": res['results'][0], "stats": res['stats']}
+
+
+def _collapse_duplicates(
+    chunks: ChunkTable,
+    allowed: Optional[np.ndarray],
+) -> Tuple[Optional[np.ndarray], Optional[np.ndarray], Optional[Tuple[np.ndarray, np.ndarray]]]:
+    """Hide duplicate rows (see `ChunkTable.dup_of`) that share the vector of a searched canonical row.
+
+    Returns (allowed rows, hidden mask, groups): a row subset loses those
+    duplicates; without one, a boolean mask marks the rows to skip (None:
+    nothing to hide). Duplicates with a vector of their own are scored and
+    compete with their canonical row: `groups` holds those rows, sorted, and
+    the canonical row of each (see `_best_of_groups`).
+    """
+    dup = chunks.dup_of
+    if dup is None:
+        return allowed, None, None
+    shared = chunks.dup_shared if chunks.dup_shared is not None else np.zeros(len(chunks), dtype=bool)
+    searched = np.zeros(len(chunks), dtype=bool)
+    searched[np.arange(len(chunks)) if allowed is None else allowed] = True
+    hide = (dup >= 0) & shared & searched[np.maximum(dup, 0)]
+    own = np.flatnonzero((dup >= 0) & ~shared)
+    groups = None
+    if len(own):
+        members = np.union1d(own, dup[own])
+        groups = (members, np.where(dup[members] >= 0, dup[members], members))
+    if allowed is None:
+        return None, hide, groups
+    return allowed[~hide[allowed]], None, groups
+
+
+def _best_of_groups(
+    part: np.ndarray,
+    rows: Optional[np.ndarray],
+    groups: Optional[Tuple[np.ndarray, np.ndarray]],
+    floor: float,
+) -> None:
+    """Keep only the best-scoring row of each duplicate group in `part` (scores of `rows`, None: every row).
+
+    The others drop to `floor`; ties keep the earliest row, i.e. the canonical one.
+    """
+    if groups is None:
+        return
+    members, group = groups
+    if rows is None:
+        local, g = members, group
+    else:
+        pos = np.minimum(np.searchsorted(members, rows), len(members) - 1)
+        hit = members[pos] == rows
+        local, g = np.flatnonzero(hit), group[pos[hit]]
+        order = np.argsort(rows[local], kind='stable')
+        local, g = local[order], g[order]
+    if len(local) < 2:
+        return
+    order = np.lexsort((-part[local], g))
+    g = g[order]
+    first = np.r_[True, g[1:] != g[:-1]]
+    part[local[order[~first]]] = floor
+
+
+def _align_groups(
+    rankings: List[List[Tuple[int, int, float]]],
+    groups: Dict[int, Tuple[np.ndarray, np.ndarray]],
+) -> List[List[Tuple[int, int, float]]]:
+    """Report each duplicate group through one row across rankings (its first
+    ranked one), so fusion scores the group rather than splitting it."""
+    if not groups:
+        return rankings
+    rep: Dict[Tuple[int, int], int] = {}
+    out: List[List[Tuple[int, int, float]]] = []
+    for hits in rankings:
+        aligned = []
+        for seg, row, score in hits:
+            members, group = groups.get(seg, (None, None))
+            if members is not None:
+                pos = int(np.searchsorted(members, row))
+                if pos < len(members) and members[pos] == row:
+                    row = rep.setdefault((seg, int(group[pos])), row)
+            aligned.append((seg, row, score))
+        out.append(aligned)
+    return out
+
+
+def _vector_parts(
+    embs: np.ndarray,
+    qmat: np.ndarray,
+    rows_per_query: List[Optional[np.ndarray]],
+) -> List[np.ndarray]:
+    """Exact scores per query, over every row or over each query's candidate rows.
+
+    The index is read once for all queries: the whole matrix in one
+    matrix-matrix product, or the union of the candidate rows.
+    """
+    if rows_per_query[0] is None:
+        return list(np.ascontiguousarray((embs @ qmat.T).T))
+    if all(rows is rows_per_query[0] for rows in rows_per_query):
+        # One shared subset (metadata filters): gather it once
+        sub = np.asarray(embs[rows_per_query[0]], dtype=np.float32) @ qmat.T
+        return list(np.ascontiguousarray(sub.T))
+    union = np.unique(np.concatenate(rows_per_query))
+    if not len(union):
+        return [np.zeros(0, dtype=np.float32) for _ in rows_per_query]
+    sub = np.asarray(embs[union], dtype=np.float32) @ qmat.T
+    return [sub[np.searchsorted(union, rows), i] for i, rows in enumerate(rows_per_query)]
+
+
+def search_many(
+    *,
+    indexes: Dict[str, str],
+    names: List[str],
+    vector_db: str,
+    embed_query_fn,
+    queries: List[str],
+    k: int = 8,
+    preview_lines: int = 0,
+    per_index_cap: int | None = None,
+    threshold: float | None = None,
+    ann_options: Optional[Dict[str, Dict[str, Any]]] = None,
+    mode: str = 'vector',
+    rrf_k: int = DEFAULT_RRF_K,
+    filters: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Run several queries against the same indexes in one pass.
+
+    Indexes are loaded once, all queries are embedded with a single
+    `embed_query_fn(queries)` call, and each index is scored for every query
+    with one matrix-matrix product (IVF/quantized indexes: one product over
+    the union of the queries' candidate rows). Options and per-query
+    results match `search()`.
+
+    Returns dict with 'queries', 'results' (one result list per query, in
+    order) and 'stats'.
+    """
+    queries = [str(q) for q in (queries or [])]
+    mode = str(mode or 'vector').strip().lower()
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"unknown search mode '{mode}' (expected one of: {', '.join(SEARCH_MODES)})")
+    # Load all indexes (vectors are memory-mapped)
+    loaded: List[Tuple[str, str, ChunkTable, np.ndarray, str, bool, Optional[np.ndarray], Optional[np.ndarray],
+                       Optional[Tuple[np.ndarray, np.ndarray]], Optional[int]]] = []
     index_status: List[Dict[str, Any]] = []
     for name in names:
         index_dir = os.path.join(os.path.expanduser(vector_db), name)
-        chunks, embs = _load_index(index_dir)
-        if not chunks or not embs:
+        chunks, embs, manifest = _load_index_entry(index_dir)
+        # ANN lists, codes and postings must come from the same update as the vectors
+        gen = manifest.get('generation')
+        if not chunks or not len(embs):
             index_status.append({'index': name, 'dir': index_dir, 'loaded': 0, 'reason': 'missing'})
             continue
         if len(chunks) != len(embs):
             # Skip malformed index
             index_status.append({'index': name, 'dir': index_dir, 'loaded': 0, 'reason': 'mismatch'})
             continue
-        for ch, vec in zip(chunks, embs):
-            all_items.append((name, ch, vec))
-        index_status.append({'index': name, 'dir': index_dir, 'loaded': len(chunks), 'reason': None})
-
-    if not all_items:
-        return {"query": query, "results": [], "stats": {"total_items": 0, "indices": index_status, "vector_db": vector_db}}
-
-    # Normalize vectors
-    norm_items = [(name, ch, _normalize(vec)) for (name, ch, vec) in all_items]
-    # Embed query
-    q = embed_query_fn([query])[0]
-    qn = _normalize(q)
-
-    # Score
-    scored: List[Tuple[float, str, Dict[str, Any]]] = []
-    for name, ch, vec in norm_items:
-        s = _cosine(qn, vec)
-        scored.append((s, name, ch))
-
-    # Sort desc by score
-    scored.sort(key=lambda x: x[0], reverse=True)
-
-    # Optional per-index cap
-    if per_index_cap:
-        capped: List[Tuple[float, str, Dict[str, Any]]] = []
-        counts: Dict[str, int] = {}
-        for s, name, ch in scored:
-            if counts.get(name, 0) < per_index_cap:
-                capped.append((s, name, ch))
-                counts[name] = counts.get(name, 0) + 1
-        scored = capped
-
-    top = scored[:k]
-    out: List[Dict[str, Any]] = []
-    for s, name, ch in top:
-        preview_path = ch.get('path')
-        display_path = ch.get('source_path', preview_path)
-        ls, le, snippet = _char_to_line_range(preview_path, int(ch.get('start', 0)), int(ch.get('end', 0)), preview_lines)
-        out.append({
-            'score': round(float(s), 4),
-            'path': display_path,
-            'line_start': ls,
-            'line_end': le,
-            'index': name,
-            'preview': snippet,
-        })
-
-    return {"query": query, "results": out, "stats": {"total_items": len(all_items), "indices": index_status, "vector_db": vector_db}}
+        # Metadata filters become a row subset before anything is scored
+        allowed = filter_rows(
+            chunks, filters, root=manifest.get('root_path'),
+            mtimes=_load_mtimes(index_dir, gen) if (filters or {}).get('modified_after') is not None else None,
+        )
+        status = {'index': name, 'dir': index_dir, 'loaded': len(chunks), 'reason': None}
+        index_status.append(status)
+        if allowed is not None:
+            status['filtered'] = int(len(allowed))
+            if not len(allowed):
+                status['reason'] = 'filtered'
+                continue
+        # Duplicate chunks (deduplicated indexes) surface once, through their canonical row
+        searched = len(chunks) if allowed is None else len(allowed)
+        allowed, hidden, groups = _collapse_duplicates(chunks, allowed)
+        if hidden is not None:
+            status['collapsed'] = int(np.count_nonzero(hidden))
+        elif chunks.dup_of is not None:
+            status['collapsed'] = searched - int(len(allowed))
+        loaded.append((name, index_dir, chunks, embs, str(manifest.get('backend') or 'naive'),
+                       bool(manifest.get('quantization')), allowed, hidden, groups, gen))
+
+    total_items = sum(len(item[2]) for item in loaded)
+    stats = {"total_items": total_items, "indices": index_status, "vector_db": vector_db, "mode": mode,
+             "queries": len(queries)}
+    if not loaded or not queries:
+        return {"queries": queries, "results": [[] for _ in queries], "stats": stats}
+
+    nq = len(queries)
+    status_by_name = {st['index']: st for st in index_status}
+    # Fused modes rank deeper than k on each side so fusion has overlap to work with
+    depth = k if mode != 'hybrid' else max(k * 4, 50)
+    rankings: List[List[List[Tuple[int, int, float]]]] = [[] for _ in queries]
+
+    if mode != 'lexical':
+        # Embed all queries in one call
+        qvecs = np.asarray(embed_query_fn(list(queries)), dtype=np.float32)
+        if qvecs.ndim != 2 or qvecs.shape[0] != nq:
+            raise ValueError(f"embedding backend returned {len(qvecs)} vectors for {nq} queries")
+        qmat = normalize_rows(qvecs)
+        # Per query: flat score arrays per index, plus the scored row ids (None = every row, exact)
+        parts: List[List[np.ndarray]] = [[] for _ in queries]
+        seg_ids: List[int] = []
+        row_maps: List[List[Optional[np.ndarray]]] = [[] for _ in queries]
+        for seg, (name, index_dir, chunks, embs, backend, quantized, allowed, hidden, groups, gen) in enumerate(loaded):
+            st = status_by_name.get(name) or {}
+            if embs.shape[1] != qmat.shape[1]:
+                st['reason'] = 'dim_mismatch'
+                continue
+            opts = (ann_options or {}).get(name) or {}
+            ann = _load_ann(index_dir, gen) if (backend == 'ivf' and not opts.get('exact')) else None
+            rows_per_query: List[Optional[np.ndarray]] = [allowed] * nq
+            if ann is not None and ann.lists.shape[0] == len(embs) and ann.centroids.shape[1] == qmat.shape[1]:
+                rows_per_query = [ann.candidates(q, opts.get('nprobe')) for q in qmat]
+                if allowed is not None:
+                    rows_per_query = [np.intersect1d(r, allowed, assume_unique=True) for r in rows_per_query]
+                st['backend'] = 'ivf'
+                st['scanned'] = max(int(len(r)) for r in rows_per_query)
+            else:
+                st['backend'] = 'exact'
+                st['scanned'] = len(chunks) if allowed is None else int(len(allowed))
+            quant = _load_quantized(index_dir, gen) if (quantized and not opts.get('exact')) else None
+            if quant is not None and quant.count == len(embs):
+                # Approximate pass over the codes; only the shortlists read float32 rows
+                n = max(depth, int(opts.get('rescore') or default_rescore(depth)))
+                if st['scanned'] > n:
+                    if st['backend'] == 'exact':
+                        rows_per_query = list(quant.shortlist_many(qmat, n, allowed))
+                    else:
+                        rows_per_query = [quant.shortlist(q, n, r) for q, r in zip(qmat, rows_per_query)]
+                    st['quantized'] = '+'.join(quant.kinds)
+                    st['rescored'] = max(int(len(r)) for r in rows_per_query)
+            if hidden is not None:
+                rows_per_query = [r if r is None else r[~hidden[r]] for r in rows_per_query]
+            for qi, part in enumerate(_vector_parts(embs, qmat, rows_per_query)):
+                if hidden is not None and rows_per_query[qi] is None:
+                    part[hidden] = -np.inf
+                _best_of_groups(part, rows_per_query[qi], groups, -np.inf)
+                parts[qi].append(part)
+                row_maps[qi].append(rows_per_query[qi])
+            seg_ids.append(seg)
+        for qi in range(nq):
+            rankings[qi].append(_top_hits(parts[qi], seg_ids, row_maps[qi], depth,
+                                          threshold=threshold, cap=per_index_cap))
+
+    if mode != 'vector':
+        lex_parts: List[List[np.ndarray]] = [[] for _ in queries]
+        lex_segs: List[int] = []
+        lex_rows: List[Optional[np.ndarray]] = []
+        for seg, (name, index_dir, chunks, _, _, _, allowed, hidden, groups, gen) in enumerate(loaded):
+            st = status_by_name.get(name) or {}
+            lex = _load_lexical(index_dir, gen)
+            st['lexical'] = bool(lex is not None and lex.n_docs == len(chunks))
+            if not st['lexical']:
+                continue
+            for qi, q in enumerate(queries):
+                scores = lex.scores(q)
+                if hidden is not None:
+                    scores[hidden] = 0.0
+                scores = scores if allowed is None else scores[allowed]
+                _best_of_groups(scores, allowed, groups, 0.0)
+                lex_parts[qi].append(scores)
+            lex_segs.append(seg)
+            lex_rows.append(allowed)
+        for qi in range(nq):
+            rankings[qi].append(_top_hits(lex_parts[qi], lex_segs, lex_rows, depth,
+                                          threshold=_MIN_LEXICAL_SCORE, cap=per_index_cap))
+
+    group_map = {seg: item[8] for seg, item in enumerate(loaded) if item[8] is not None}
+    digits = 6 if mode == 'hybrid' else 4  # RRF scores are small; keep them distinguishable
+    results: List[List[Dict[str, Any]]] = []
+    for qi in range(nq):
+        if mode == 'hybrid':
+            hits = _fuse_rrf(_align_groups(rankings[qi], group_map), k, rrf_k=rrf_k, cap=per_index_cap)
+        else:
+            hits = rankings[qi][0][:k]
+        out: List[Dict[str, Any]] = []
+        for seg, row, score in hits:
+            name, _, chunks, _, _, _, _, _, _, _ = loaded[seg]
+            ch = chunks[row]
+            display_path = ch.get('source_path', ch.get('path'))
+            ls, le, snippet = _chunk_lines(ch, preview_lines)
+            hit = {
+                'score': round(score, digits),
+                'path': display_path,
+                'line_start': ls,
+                'line_end': le,
+                'index': name,
+                'preview': snippet,
+            }
+            canon = int(chunks.dup_of[row]) if chunks.dup_of is not None and chunks.dup_of[row] >= 0 else row
+            dups = [r for r in [canon] + chunks.duplicates(canon) if r != row]
+            if dups:
+                # Other files holding (nearly) the same chunk
+                paths = (chunks.paths[int(chunks.source_id[r] if chunks.source_id[r] >= 0 else chunks.path_id[r])]
+                         for r in dups)
+                hit['duplicates'] = [p for p in dict.fromkeys(paths) if p != display_path]
+            out.append(hit)
+        results.append(out)
+
+    return {"queries": queries, "results": results, "stats": stats}
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class SegmentLog:
+    """Append-only staging area for embeddings produced during an update.
+
+    Each embedded batch is flushed as a pair of files under
+    `<index_dir>/staging/`: `seg-NNNNNN.npy` (float32 rows, L2-normalized) and
+    `seg-NNNNNN.json` (the chunk hashes for those rows). The JSON file is
+    written last, so its presence marks a complete segment. After an
+    interrupted update the next run reloads the completed segments (when the
+    embedding signature matches) and skips re-embedding those chunks.
+    `clear()` removes the staging area once the index is committed.
+    """
+
+    def __init__(self, index_dir: str) -> None:
+        self.dir = os.path.join(index_dir, 'staging')
+        self.meta_path = os.path.join(self.dir, 'meta.json')
+        self._next = 1
+        self.dim: Optional[int] = None
+
+    def _paths(self, seg: int) -> Tuple[str, str]:
+        base = os.path.join(self.dir, f'seg-{seg:06d}')
+        return base + '.npy', base + '.json'
+
+    def open(self, signature: Dict[str, Any]) -> Dict[str, Tuple[int, int]]:
+        """Prepare for appends; return hash -> (segment, row) from a previous run.
+
+        Staged segments from a run with a different signature are discarded.
+        """
+        found: Dict[str, Tuple[int, int]] = {}
+        meta: Dict[str, Any] | None = None
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except Exception:
+            meta = None
+        if meta is None or meta.get('signature') != signature:
+            self.clear()
+            os.makedirs(self.dir, exist_ok=True)
+            with open(self.meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'signature': signature}, f)
+            return found
+        self.dim = meta.get('dim')
+        last = 0
+        for name in sorted(os.listdir(self.dir)):
+            if not (name.startswith('seg-') and name.endswith('.json')):
+                continue
+            try:
+                seg = int(name[4:-5])
+                with open(os.path.join(self.dir, name), 'r', encoding='utf-8') as f:
+                    hashes = json.load(f)
+            except Exception:
+                continue
+            if not os.path.exists(self._paths(seg)[0]):
+                continue
+            for row, h in enumerate(hashes):
+                found.setdefault(h, (seg, row))
+            last = max(last, seg)
+        self._next = last + 1
+        return found
+
+    def append(self, hashes: List[str], vecs: np.ndarray) -> int:
+        """Flush one batch; returns its segment number."""
+        seg = self._next
+        self._next += 1
+        npy_path, json_path = self._paths(seg)
+        with open(npy_path + '.tmp', 'wb') as f:
+            np.save(f, np.ascontiguousarray(vecs, dtype=np.float32), allow_pickle=False)
+        os.replace(npy_path + '.tmp', npy_path)
+        with open(json_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(list(hashes), f)
+        os.replace(json_path + '.tmp', json_path)
+        if self.dim is None and vecs.ndim == 2:
+            self.dim = int(vecs.shape[1])
+            try:
+                with open(self.meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                meta['dim'] = self.dim
+                with open(self.meta_path, 'w', encoding='utf-8') as f:
+                    json.dump(meta, f)
+            except Exception:
+                pass
+        return seg
+
+    def rows(self, seg: int) -> np.ndarray:
+        return np.load(self._paths(seg)[0], mmap_mode='r', allow_pickle=False)
+
+    def clear(self) -> None:
+        shutil.rmtree(self.dir, ignore_errors=True)
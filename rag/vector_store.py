@@ -2,15 +2,61 @@ from __future__ import annotations
 
 import json
 import os
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Sequence
+
+import numpy as np
+
+from .chunk_table import CHUNK_TABLE_FILE, ChunkTable
+from .scoring import normalize_rows
+
+
+VECTOR_FORMAT = 'npy'
+VECTOR_DTYPE = 'float32'
+GENERATION_FILE = 'generation'
+
+
+def read_generation(index_dir: str) -> int:
+    """Publish counter of an index (0 when never published; odd while swapping)."""
+    try:
+        with open(os.path.join(index_dir, GENERATION_FILE), 'r', encoding='utf-8') as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
 
 
 class NaiveStore:
-    """Minimal on-disk layout for per-index vectors.
+    """On-disk layout for per-index vectors and chunk metadata.
+
+    All artifacts are row-aligned: row i of `embeddings.npy`, of the chunk
+    table and of any quantized codes describe the same chunk, and
+    `files.jsonl` records each file's size, mtime, hash and [start, end)
+    row range. Updates are incremental: the indexer re-extracts and embeds
+    only new or changed files, carries unchanged rows over from the
+    previous artifacts and writes the new, row-aligned set.
+
+    Embeddings are stored as a contiguous float32 matrix in `embeddings.npy`
+    (shape: chunks x dim) so readers can memory-map them instead of parsing
+    text. Rows are L2-normalized at write time so search is a single dot
+    product. Indexes written before this format (`embeddings.json`) are
+    migrated in place the first time they are read.
+
+    Large updates can fill the matrix on disk instead of in memory: obtain a
+    writable memmap from `create_matrix()`, store normalized rows into it and
+    pass it back to `write()`, which then commits it with a rename.
+
+    Chunk metadata is a columnar `ChunkTable` in `chunks.npz` (interned
+    paths, integer offsets, binary hashes); `chunks.jsonl` from older indexes
+    is converted on first read like the embeddings.
 
-    MVP writes whole index artifacts on update (rebuild). Incremental
-    updates can be added later without changing the on-disk contract.
+    Optional quantized codes (`codes_<name>.npy`, see `rag.quantize`) are
+    staged the same way with `create_codes()`/`write_codes()` and renamed
+    into place by `commit_codes()`.
+
+    Writers that replace several artifacts wrap the swaps in `publishing()`,
+    a file-based seqlock: readers that see the generation change (or stay
+    odd) around a load retry it instead of mixing old and new files.
     """
 
     def __init__(self, base_dir: str, index_name: str) -> None:
@@ -18,32 +64,188 @@ class NaiveStore:
         self.index_name = index_name
         self.index_dir = os.path.join(self.base_dir, index_name)
         self.manifest_path = os.path.join(self.index_dir, 'manifest.json')
-        self.chunks_path = os.path.join(self.index_dir, 'chunks.jsonl')
-        self.embeddings_path = os.path.join(self.index_dir, 'embeddings.json')
+        self.chunks_path = os.path.join(self.index_dir, CHUNK_TABLE_FILE)
+        self.legacy_chunks_path = os.path.join(self.index_dir, 'chunks.jsonl')
+        self.embeddings_path = os.path.join(self.index_dir, 'embeddings.npy')
+        self.legacy_embeddings_path = os.path.join(self.index_dir, 'embeddings.json')
+        self.files_path = os.path.join(self.index_dir, 'files.jsonl')
+        self.generation_path = os.path.join(self.index_dir, GENERATION_FILE)
+        self._staged_matrix: np.memmap | None = None
+        self._staged_codes: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_index_dir(cls, index_dir: str) -> 'NaiveStore':
+        index_dir = os.path.normpath(os.path.expanduser(index_dir))
+        return cls(os.path.dirname(index_dir), os.path.basename(index_dir))
 
     def ensure_dirs(self) -> None:
         Path(self.index_dir).mkdir(parents=True, exist_ok=True)
 
-    def write(self, *, manifest: Dict[str, Any], chunks: List[Dict[str, Any]], embeddings: List[List[float]]) -> None:
+    def read_generation(self) -> int:
+        return read_generation(self.index_dir)
+
+    def _write_generation(self, gen: int) -> None:
+        tmp_path = self.generation_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(str(int(gen)))
+        os.replace(tmp_path, self.generation_path)
+
+    @contextmanager
+    def publishing(self) -> Iterator[int]:
+        """Mark the artifact swaps of one update; yields the generation being published.
+
+        The counter is odd inside the block and advances to the yielded (even)
+        value on exit. An odd value left by a crashed writer is reused.
+        """
+        self.ensure_dirs()
+        gen = self.read_generation()
+        start = gen + 1 if gen % 2 == 0 else gen
+        self._write_generation(start)
+        try:
+            yield start + 1
+        finally:
+            self._write_generation(start + 1)
+
+    def create_matrix(self, rows: int, dim: int) -> np.ndarray:
+        """Open a writable, disk-backed (rows x dim) float32 matrix for `write()`.
+
+        The caller must store L2-normalized rows. Empty shapes return a plain
+        in-memory array, which `write()` handles like any other input.
+        """
+        if rows <= 0 or dim <= 0:
+            return np.zeros((max(0, rows), max(0, dim)), dtype=np.float32)
+        self.ensure_dirs()
+        self._staged_matrix = np.lib.format.open_memmap(
+            self.embeddings_path + '.tmp', mode='w+', dtype=np.float32, shape=(int(rows), int(dim)),
+        )
+        return self._staged_matrix
+
+    def write(
+        self,
+        *,
+        manifest: Dict[str, Any],
+        chunks: ChunkTable | Sequence[Dict[str, Any]],
+        embeddings: Sequence[Sequence[float]] | np.ndarray,
+        files: List[Dict[str, Any]] | None = None,
+    ) -> None:
+        self.ensure_dirs()
+        staged = self._staged_matrix is not None and embeddings is self._staged_matrix
+        matrix = embeddings if staged else normalize_rows(as_matrix(embeddings))
+        manifest = dict(manifest)
+        manifest['vectors'] = self._vectors_meta(matrix)
+        # Embeddings first: the manifest is the last artifact to change
+        if staged:
+            self._commit_staged()
+        else:
+            self._write_matrix(matrix)
+        # Chunk table (columnar)
+        table = chunks if isinstance(chunks, ChunkTable) else ChunkTable.from_records(list(chunks))
+        table.save(self.chunks_path)
+        # Per-file state (path, size, mtime_ns, sha1, rows) for incremental updates
+        if files is not None:
+            self.write_files(files)
+        self._write_manifest(manifest)
+        # Drop any legacy text artifacts so readers never pick up stale data
+        for legacy in (self.legacy_embeddings_path, self.legacy_chunks_path):
+            try:
+                os.remove(legacy)
+            except FileNotFoundError:
+                pass
+            except Exception:
+                pass
+
+    def _vectors_meta(self, matrix: np.ndarray) -> Dict[str, Any]:
+        return {
+            'format': VECTOR_FORMAT,
+            'dtype': VECTOR_DTYPE,
+            'file': os.path.basename(self.embeddings_path),
+            'count': int(matrix.shape[0]),
+            'dim': int(matrix.shape[1]),
+            'normalized': True,
+        }
+
+    def _write_matrix(self, matrix: np.ndarray) -> None:
+        tmp_path = self.embeddings_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, matrix, allow_pickle=False)
+        os.replace(tmp_path, self.embeddings_path)
+
+    def _commit_staged(self) -> None:
+        staged, self._staged_matrix = self._staged_matrix, None
+        if staged is None:
+            return
+        staged.flush()
+        del staged
+        os.replace(self.embeddings_path + '.tmp', self.embeddings_path)
+
+    @staticmethod
+    def codes_file(name: str) -> str:
+        return f'codes_{name}.npy'
+
+    def codes_path(self, name: str) -> str:
+        return os.path.join(self.index_dir, self.codes_file(name))
+
+    def create_codes(self, name: str, shape: tuple[int, ...], dtype: Any) -> np.ndarray:
+        """Open a writable, disk-backed code array; committed by `commit_codes()`."""
+        self.ensure_dirs()
+        arr = np.lib.format.open_memmap(self.codes_path(name) + '.tmp', mode='w+', dtype=dtype, shape=shape)
+        self._staged_codes[name] = arr
+        return arr
+
+    def write_codes(self, name: str, arr: np.ndarray) -> None:
+        """Stage a small in-memory array (e.g. quantizer parameters) for `commit_codes()`."""
         self.ensure_dirs()
-        # Manifest
-        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+        with open(self.codes_path(name) + '.tmp', 'wb') as f:
+            np.save(f, arr, allow_pickle=False)
+        self._staged_codes[name] = arr
+
+    def commit_codes(self) -> None:
+        staged, self._staged_codes = self._staged_codes, {}
+        for name in list(staged):
+            arr = staged.pop(name)
+            if isinstance(arr, np.memmap):
+                arr.flush()
+            del arr
+            os.replace(self.codes_path(name) + '.tmp', self.codes_path(name))
+
+    def read_codes(self, name: str) -> np.ndarray | None:
+        try:
+            return np.load(self.codes_path(name), mmap_mode='r', allow_pickle=False)
+        except Exception:
+            return None
+
+    def remove_codes(self) -> None:
+        try:
+            names = os.listdir(self.index_dir)
+        except OSError:
+            return
+        for fname in names:
+            if fname.startswith('codes_') and fname.endswith('.npy'):
+                try:
+                    os.remove(os.path.join(self.index_dir, fname))
+                except Exception:
+                    pass
+
+    def write_files(self, files: List[Dict[str, Any]]) -> None:
+        tmp_path = self.files_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for ent in files:
+                f.write(json.dumps(ent, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.files_path)
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             json.dump(manifest, f, ensure_ascii=False, indent=2)
-        # Chunks JSONL
-        with open(self.chunks_path, 'w', encoding='utf-8') as f:
-            for ch in chunks:
-                f.write(json.dumps(ch, ensure_ascii=False) + "\n")
-        # Embeddings (JSON for MVP; consider .npy/memmap later)
-        with open(self.embeddings_path, 'w', encoding='utf-8') as f:
-            json.dump(embeddings, f)
+        os.replace(tmp_path, self.manifest_path)
 
     # --- Read helpers for incremental updates ---
     def exists(self) -> bool:
         return (
             os.path.exists(self.index_dir)
             and os.path.exists(self.manifest_path)
-            and os.path.exists(self.chunks_path)
-            and os.path.exists(self.embeddings_path)
+            and self.has_chunks()
+            and (os.path.exists(self.embeddings_path) or os.path.exists(self.legacy_embeddings_path))
         )
 
     def read_manifest(self) -> Dict[str, Any] | None:
@@ -53,10 +255,61 @@ class NaiveStore:
         except Exception:
             return None
 
-    def read_chunks(self) -> List[Dict[str, Any]]:
+    def has_chunks(self) -> bool:
+        return os.path.exists(self.chunks_path) or os.path.exists(self.legacy_chunks_path)
+
+    def read_chunks(self) -> ChunkTable:
+        """Chunk metadata as a `ChunkTable` (empty when missing or unreadable)."""
+        if not os.path.exists(self.chunks_path) and os.path.exists(self.legacy_chunks_path):
+            return self.migrate_legacy_chunks()
+        try:
+            return ChunkTable.load(self.chunks_path)
+        except Exception:
+            return ChunkTable.empty()
+
+    def _read_legacy_chunks(self) -> tuple[List[Dict[str, Any]], bool]:
+        """Records from `chunks.jsonl` and whether every line was read and parsed."""
+        out: List[Dict[str, Any]] = []
+        complete = True
+        try:
+            with open(self.legacy_chunks_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        out.append(json.loads(line))
+                    except Exception:
+                        complete = False
+        except Exception:
+            complete = False
+        return out, complete
+
+    def migrate_legacy_chunks(self) -> ChunkTable:
+        """One-shot conversion of `chunks.jsonl` to the columnar `chunks.npz`.
+
+        The JSONL file is removed once the table is written; on a read-only
+        index dir the converted table is served from memory. A JSONL file
+        that could not be fully read is left in place and not converted.
+        """
+        records, complete = self._read_legacy_chunks()
+        table = ChunkTable.from_records(records)
+        if not complete:
+            return table
+        try:
+            table.save(self.chunks_path)
+        except Exception:
+            return table
+        try:
+            os.remove(self.legacy_chunks_path)
+        except Exception:
+            pass
+        return table
+
+    def read_files(self) -> List[Dict[str, Any]]:
+        """Per-file state rows; `rows` is the [start, end) chunk range of the file."""
         out: List[Dict[str, Any]] = []
         try:
-            with open(self.chunks_path, 'r', encoding='utf-8') as f:
+            with open(self.files_path, 'r', encoding='utf-8') as f:
                 for line in f:
                     try:
                         out.append(json.loads(line))
@@ -66,12 +319,93 @@ class NaiveStore:
             pass
         return out
 
-    def read_embeddings(self) -> List[List[float]]:
+    def read_embeddings(self) -> np.ndarray:
+        """Return the embeddings matrix, memory-mapped read-only when possible.
+
+        Returns an empty (0, 0) float32 array when no vectors are stored.
+        """
+        if not os.path.exists(self.embeddings_path) and os.path.exists(self.legacy_embeddings_path):
+            if not self.migrate_legacy():
+                # Read-only or otherwise unwritable index dir: serve the legacy file in memory
+                return normalize_rows(self._read_legacy())
         try:
-            with open(self.embeddings_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            matrix = np.load(self.embeddings_path, mmap_mode='r', allow_pickle=False)
+        except Exception:
+            return empty_matrix()
+        if matrix.ndim != 2:
+            return empty_matrix()
+        return matrix
+
+    def _load_legacy(self) -> np.ndarray | None:
+        """Vectors from `embeddings.json`, or None when it cannot be read or parsed."""
+        try:
+            with open(self.legacy_embeddings_path, 'r', encoding='utf-8') as f:
+                return as_matrix(json.load(f))
+        except Exception:
+            return None
+
+    def _read_legacy(self) -> np.ndarray:
+        matrix = self._load_legacy()
+        return empty_matrix() if matrix is None else matrix
+
+    def migrate_legacy(self) -> bool:
+        """One-shot conversion of `embeddings.json` to `embeddings.npy`.
+
+        Records the vector format in the manifest and removes the JSON file.
+        Returns True when the binary file is in place afterwards. Nothing is
+        written or removed unless the JSON was read and holds vectors, so an
+        unreadable file is never replaced by an empty matrix.
+        """
+        if os.path.exists(self.embeddings_path):
+            return True
+        if not os.path.exists(self.legacy_embeddings_path):
+            return False
+        legacy = self._load_legacy()
+        if legacy is None or legacy.shape[0] == 0:
+            return False
+        matrix = normalize_rows(legacy)
+        try:
+            self._write_matrix(matrix)
+        except Exception:
+            return False
+        manifest = self.read_manifest()
+        if manifest is not None:
+            manifest['vectors'] = self._vectors_meta(matrix)
+            try:
+                self._write_manifest(manifest)
+            except Exception:
+                pass
+        try:
+            os.remove(self.legacy_embeddings_path)
         except Exception:
-            return []
+            pass
+        return True
 
-    def read_all(self) -> tuple[Dict[str, Any] | None, List[Dict[str, Any]], List[List[float]]]:
+    def read_all(self) -> tuple[Dict[str, Any] | None, ChunkTable, np.ndarray]:
         return self.read_manifest(), self.read_chunks(), self.read_embeddings()
+
+
+def empty_matrix() -> np.ndarray:
+    return np.zeros((0, 0), dtype=np.float32)
+
+
+def as_matrix(embeddings: Sequence[Sequence[float]] | np.ndarray) -> np.ndarray:
+    """Coerce embeddings to a C-contiguous 2-D float32 matrix."""
+    if isinstance(embeddings, np.ndarray):
+        matrix = embeddings
+    else:
+        if len(embeddings) == 0:
+            return empty_matrix()
+        matrix = np.asarray(embeddings, dtype=np.float32)
+    if matrix.size == 0:
+        return empty_matrix()
+    if matrix.ndim != 2:
+        raise ValueError(f"embeddings must be 2-D (chunks x dim), got shape {matrix.shape}")
+    return np.ascontiguousarray(matrix, dtype=np.float32)
+
+
+def is_normalized(manifest: Dict[str, Any] | None) -> bool:
+    try:
+        return bool(((manifest or {}).get('vectors') or {}).get('normalized'))
+    except Exception:
+        return False
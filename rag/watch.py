@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .fs_utils import DEFAULT_EXCLUDES
+
+
+DEFAULT_DEBOUNCE_S = 1.0
+# A steady stream of changes is still flushed at least this often
+DEFAULT_MAX_DELAY_S = 10.0
+DEFAULT_POLL_INTERVAL_S = 2.0
+
+# inotify(7) constants
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = (_IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE
+               | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF)
+_EVENT = struct.Struct('iIII')
+
+
+def _under(path: str, prefixes: Iterable[str]) -> bool:
+    return any(path == p or path.startswith(p + os.sep) for p in prefixes)
+
+
+def _walk_dirs(root: str, excludes: Set[str], ignore: List[str]) -> Iterable[str]:
+    for dirpath, dirnames, _ in os.walk(root):
+        dirnames[:] = [d for d in dirnames
+                       if d not in excludes and not _under(os.path.join(dirpath, d), ignore)]
+        yield dirpath
+
+
+class PollingWatcher:
+    """Portable fallback: re-stat the trees every `interval` seconds and
+    report files whose (mtime, size) changed, appeared or disappeared."""
+
+    def __init__(
+        self,
+        roots: Iterable[str],
+        *,
+        interval: float = DEFAULT_POLL_INTERVAL_S,
+        excludes: Optional[Set[str]] = None,
+        ignore: Iterable[str] = (),
+    ) -> None:
+        self.roots = [os.path.realpath(r) for r in roots]
+        self.interval = float(interval)
+        self.excludes = set(excludes or DEFAULT_EXCLUDES)
+        self.ignore = [os.path.realpath(p) for p in ignore]
+        self._state = self._scan()
+        self._next = time.monotonic() + self.interval
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        state: Dict[str, Tuple[int, int]] = {}
+        for root in self.roots:
+            for dirpath in _walk_dirs(root, self.excludes, self.ignore):
+                try:
+                    entries = list(os.scandir(dirpath))
+                except OSError:
+                    continue
+                for ent in entries:
+                    try:
+                        if ent.is_file():
+                            st = ent.stat()
+                            state[ent.path] = (st.st_mtime_ns, st.st_size)
+                    except OSError:
+                        continue
+        return state
+
+    def poll(self, timeout: float) -> Set[str]:
+        wait = min(max(0.0, timeout), max(0.0, self._next - time.monotonic()))
+        if wait:
+            time.sleep(wait)
+        if time.monotonic() < self._next:
+            return set()
+        self._next = time.monotonic() + self.interval
+        new = self._scan()
+        old, self._state = self._state, new
+        changed = {p for p, sig in new.items() if old.get(p) != sig}
+        changed.update(p for p in old if p not in new)
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Linux inotify via libc (no extra dependency); one watch per directory.
+
+    New directories are watched as they appear and reported whole, since
+    files may land in them before the watch is in place.
+    """
+
+    def __init__(
+        self,
+        roots: Iterable[str],
+        *,
+        excludes: Optional[Set[str]] = None,
+        ignore: Iterable[str] = (),
+    ) -> None:
+        self._libc = self._load_libc()
+        if self._libc is None:
+            raise OSError('inotify is not available')
+        self.excludes = set(excludes or DEFAULT_EXCLUDES)
+        self.ignore = [os.path.realpath(p) for p in ignore]
+        self.roots = [os.path.realpath(r) for r in roots]
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._dirs: Dict[int, str] = {}
+        for root in self.roots:
+            self._add_tree(root)
+
+    @staticmethod
+    def _load_libc() -> Optional[ctypes.CDLL]:
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            libc.inotify_init1.argtypes = [ctypes.c_int]
+            libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            return libc
+        except (OSError, AttributeError):
+            return None
+
+    @classmethod
+    def available(cls) -> bool:
+        return cls._load_libc() is not None
+
+    def _add_tree(self, root: str) -> Set[str]:
+        """Watch `root` and its subdirectories; returns the files found in them."""
+        found: Set[str] = set()
+        for dirpath in _walk_dirs(root, self.excludes, self.ignore):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dirpath), _WATCH_MASK)
+            if wd >= 0:
+                self._dirs[wd] = dirpath
+            try:
+                found.update(e.path for e in os.scandir(dirpath) if e.is_file())
+            except OSError:
+                continue
+        return found
+
+    def poll(self, timeout: float) -> Set[str]:
+        ready, _, _ = select.select([self._fd], [], [], max(0.0, timeout))
+        if not ready:
+            return set()
+        changed: Set[str] = set()
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not buf:
+                break
+            pos = 0
+            while pos + _EVENT.size <= len(buf):
+                wd, mask, _cookie, length = _EVENT.unpack_from(buf, pos)
+                raw = buf[pos + _EVENT.size:pos + _EVENT.size + length].split(b'\0', 1)[0]
+                pos += _EVENT.size + length
+                if mask & _IN_Q_OVERFLOW:
+                    # Events were dropped: report every root so it is rescanned
+                    changed.update(self.roots)
+                    continue
+                parent = self._dirs.get(wd)
+                if mask & _IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    continue
+                if parent is None or not raw:
+                    continue
+                path = os.path.join(parent, os.fsdecode(raw))
+                if _under(path, self.ignore):
+                    continue
+                if mask & _IN_ISDIR:
+                    if os.path.basename(path) in self.excludes:
+                        continue
+                    if mask & (_IN_CREATE | _IN_MOVED_TO):
+                        changed.update(self._add_tree(path))
+                    # Directory paths stand for everything indexed under them
+                    changed.add(path)
+                else:
+                    changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def open_watcher(
+    roots: Iterable[str],
+    *,
+    polling: bool = False,
+    interval: float = DEFAULT_POLL_INTERVAL_S,
+    excludes: Optional[Set[str]] = None,
+    ignore: Iterable[str] = (),
+):
+    """inotify where available, otherwise (or with polling=True) a polling watcher."""
+    roots = list(roots)
+    if not polling and InotifyWatcher.available():
+        try:
+            return InotifyWatcher(roots, excludes=excludes, ignore=ignore)
+        except OSError:
+            pass
+    return PollingWatcher(roots, interval=interval, excludes=excludes, ignore=ignore)
+
+
+def watch(
+    roots: Dict[str, str],
+    on_batch: Callable[[str, Set[str]], None],
+    *,
+    debounce: float = DEFAULT_DEBOUNCE_S,
+    max_delay: float = DEFAULT_MAX_DELAY_S,
+    polling: bool = False,
+    interval: float = DEFAULT_POLL_INTERVAL_S,
+    ignore: Iterable[str] = (),
+    stop: Optional[threading.Event] = None,
+    watcher=None,
+) -> None:
+    """Watch index roots (name -> root) and hand debounced change batches to
+    `on_batch(name, paths)` until `stop` is set.
+
+    A batch is flushed once no change arrived for `debounce` seconds, or
+    `max_delay` seconds after its first change. Paths are absolute and may
+    name files that no longer exist, or directories (created, moved or
+    removed as a whole).
+    """
+    stop = stop or threading.Event()
+    resolved = {name: os.path.realpath(os.path.expanduser(root)) for name, root in roots.items()}
+    own = watcher is None
+    watcher = watcher or open_watcher(set(resolved.values()), polling=polling, interval=interval, ignore=ignore)
+    pending: Dict[str, Set[str]] = {}
+    first = last = 0.0
+    try:
+        while not stop.is_set():
+            now = time.monotonic()
+            if pending:
+                timeout = max(0.0, min(last + debounce, first + max_delay) - now)
+            else:
+                timeout = max(0.05, min(interval, 0.5))
+            changed = watcher.poll(timeout)
+            now = time.monotonic()
+            for path in changed:
+                for name, root in resolved.items():
+                    if _under(path, [root]):
+                        if not pending:
+                            first = now
+                        pending.setdefault(name, set()).add(path)
+                        last = now
+            if pending and (now - last >= debounce or now - first >= max_delay):
+                batch, pending = pending, {}
+                for name, paths in batch.items():
+                    on_batch(name, paths)
+    finally:
+        if own:
+            watcher.close()
@@ -27,6 +27,8 @@ class Session:
         self.usage_stats = {}
         self.user_data = {}  # For arbitrary session data
         self._registry = registry
+        # Shared instances of actions that declare REUSABLE
+        self._action_instances: dict = {}
         self._exit_handled = False
         # Session-scoped identifier and cleanup hooks
         try:
@@ -46,11 +48,23 @@ class Session:
 
     # Convenience methods that delegate to registry
     def get_action(self, name: str):
-        """Return an action instance for the given name."""
+        """Return an action instance for the given name.
+
+        Actions declaring REUSABLE get one instance per session (replaced if
+        the registry reloads the class); all others are constructed per call.
+        """
         action_class = self._registry.get_action_class(name)
         if action_class:
+            reusable = bool(getattr(action_class, 'REUSABLE', False))
+            if reusable:
+                action = self._action_instances.get(name)
+                if action is not None and type(action) is action_class:
+                    return action
             try:
-                return action_class(self)
+                action = action_class(self)
+                if reusable:
+                    self._action_instances[name] = action
+                return action
             except Exception as e:
                 try:
                     self.utils.output.warning(f"Could not instantiate action '{name}': {e}")
@@ -137,3 +137,121 @@ def test_rag_tool_defaults_to_all_when_indexes_arg_empty(monkeypatch, tmp_path):
     assert set(captured.get('names') or []) == set(paths.keys())
     # And should have attached a rag context (even with no results it creates a header)
     assert any(k == 'rag' for k, _ in sess._contexts)
+
+
+def test_rag_tool_lexical_mode_needs_no_embedder(monkeypatch, tmp_path):
+    import actions.assistant_ragsearch_tool_action as rtool
+    idxdir = tmp_path / 'db'
+    monkeypatch.setattr(rtool, 'load_rag_config', lambda session: ({'notes': str(tmp_path)}, ['notes'], str(idxdir), 'M'))
+
+    import core.provider_factory as pf
+
+    def _no_provider(*a, **k):
+        raise AssertionError('lexical search must not build an embedding provider')
+
+    monkeypatch.setattr(pf.ProviderFactory, 'instantiate_by_name', _no_provider)
+    captured = {}
+
+    def fake_search(**kwargs):
+        captured.update(kwargs)
+        return {'results': [{'score': 7.5, 'path': str(tmp_path / 'a.md'), 'line_start': 1, 'line_end': 1,
+                             'index': 'notes', 'preview': []}], 'stats': {'total_items': 1}}
+
+    monkeypatch.setattr(rtool, 'search', lambda **kw: fake_search(**kw))
+
+    from actions.assistant_ragsearch_tool_action import AssistantRagsearchToolAction
+    sess = FakeSession({})
+    AssistantRagsearchToolAction(sess).run({'query': 'ERR_CONN_RESET', 'mode': 'lexical', 'threshold': 0.5}, '')
+
+    assert captured['mode'] == 'lexical' and captured['embed_query_fn'] is None
+    # BM25 scores are not cut by the cosine threshold
+    content = next(v for k, v in sess._contexts if k == 'rag')['content']
+    assert 'a.md' in content
+
+
+def test_rag_tool_batches_extra_queries(monkeypatch, tmp_path):
+    import actions.assistant_ragsearch_tool_action as rtool
+    idxdir = tmp_path / 'db'
+    monkeypatch.setattr(rtool, 'load_rag_config', lambda session: ({'notes': str(tmp_path)}, ['notes'], str(idxdir), 'M'))
+
+    class Prov:
+        def embed(self, texts, model=None):
+            return [[1, 0, 0] for _ in texts]
+
+    import core.provider_factory as pf
+    monkeypatch.setattr(pf.ProviderFactory, 'instantiate_by_name', lambda *a, **k: Prov())
+    captured = {}
+
+    def fake_search_many(**kwargs):
+        captured.update(kwargs)
+        return {'results': [[{'score': 0.9, 'path': str(tmp_path / f'{i}.md'), 'line_start': 1, 'line_end': 1,
+                              'index': 'notes', 'preview': []}] for i in range(len(kwargs['queries']))],
+                'stats': {'total_items': 1}}
+
+    monkeypatch.setattr(rtool, 'search_many', lambda **kw: fake_search_many(**kw))
+    monkeypatch.setattr(rtool, 'search', lambda **kw: pytest.fail('single-query path used'))
+
+    from actions.assistant_ragsearch_tool_action import AssistantRagsearchToolAction
+    sess = FakeSession({'embedding_provider': 'X', 'embedding_model': 'M'})
+    AssistantRagsearchToolAction(sess).run({'query': 'alpha', 'queries': 'beta\n\nalpha\ngamma'}, '')
+
+    assert captured['queries'] == ['alpha', 'beta', 'gamma']
+    content = next(v for k, v in sess._contexts if k == 'rag')['content']
+    for q in ('alpha', 'beta', 'gamma'):
+        assert f'RAG results (query: {q})' in content
+    assert '2.md' in content
+
+
+def test_rag_tool_passes_metadata_filters(monkeypatch, tmp_path):
+    import actions.assistant_ragsearch_tool_action as rtool
+    idxdir = tmp_path / 'db'
+    monkeypatch.setattr(rtool, 'load_rag_config', lambda session: ({'notes': str(tmp_path)}, ['notes'], str(idxdir), 'M'))
+    captured = {}
+
+    def fake_search(**kwargs):
+        captured.update(kwargs)
+        return {'results': [], 'stats': {'total_items': 1}}
+
+    monkeypatch.setattr(rtool, 'search', lambda **kw: fake_search(**kw))
+
+    from actions.assistant_ragsearch_tool_action import AssistantRagsearchToolAction
+    sess = FakeSession({})
+    AssistantRagsearchToolAction(sess).run({'query': 'q', 'mode': 'lexical', 'include': 'docs/api/**',
+                                            'exts': 'md, .PY'}, '')
+    assert captured['filters'] == {'include': ['docs/api/**'], 'exts': ['.md', '.py']}
+
+    sess = FakeSession({})
+    AssistantRagsearchToolAction(sess).run({'query': 'q', 'mode': 'lexical', 'modified_after': 'soon'}, '')
+    errors = [v['content'] for k, v in sess._contexts if k == 'assistant' and v.get('name') == 'rag_error']
+    assert errors and 'modified_after' in errors[0]
+
+
+def test_rag_tool_reuses_cached_query_embeddings(monkeypatch, tmp_path):
+    import actions.assistant_ragsearch_tool_action as rtool
+    idxdir = tmp_path / 'db'
+    monkeypatch.setattr(rtool, 'load_rag_config', lambda session: ({'notes': str(tmp_path)}, ['notes'], str(idxdir), 'M'))
+    calls = []
+
+    class Prov:
+        def embed(self, texts, model=None):
+            calls.append(list(texts))
+            return [[1, 0, 0] for _ in texts]
+
+    import core.provider_factory as pf
+    monkeypatch.setattr(pf.ProviderFactory, 'instantiate_by_name', lambda *a, **k: Prov())
+
+    def fake_search(**kwargs):
+        kwargs['embed_query_fn']([kwargs['query']])
+        return {'results': [], 'stats': {'total_items': 1}}
+
+    monkeypatch.setattr(rtool, 'search', lambda **kw: fake_search(**kw))
+    events = []
+    from actions.assistant_ragsearch_tool_action import AssistantRagsearchToolAction
+    for q in ('where is  the config', 'where is the config'):
+        sess = FakeSession({'embedding_provider': 'X', 'embedding_model': 'M'})
+        sess.utils.logger = types.SimpleNamespace(rag_event=lambda kind, data, component='': events.append((kind, data)))
+        AssistantRagsearchToolAction(sess).run({'query': q}, '')
+
+    assert calls == [['where is the config']]
+    cache_events = [d for k, d in events if k == 'query_cache']
+    assert [(d['hits'], d['misses']) for d in cache_events] == [(0, 1), (1, 0)]
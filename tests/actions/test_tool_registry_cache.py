@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from actions.assistant_commands_action import AssistantCommandsAction
+from component_registry import ComponentRegistry
+from config_manager import ConfigManager
+from core.tool_registry import get_tool_registry
+from session import Session
+
+
+def _make_session() -> Session:
+    sc = ConfigManager().create_session_config()
+    sess = Session(sc, ComponentRegistry(sc))
+    sc.set_option('active_tools', '')
+    sc.set_option('inactive_tools', '')
+    return sess
+
+
+def test_registry_and_specs_are_reused_until_inputs_change():
+    sess = _make_session()
+    cache = get_tool_registry(sess)
+    first = AssistantCommandsAction(sess)
+    specs = first.get_tool_specs()
+    second = AssistantCommandsAction(sess)
+    assert second.commands == first.commands and second.get_tool_specs() == specs
+    assert cache.stats['builds'] == 1 and cache.stats['spec_builds'] == 1
+    assert sess.get_user_data('__tool_api_to_cmd__')
+
+    sess.config.set_option('inactive_tools', 'math')
+    assert 'math' not in AssistantCommandsAction(sess).commands
+    sess.enter_agent_mode('deny')
+    AssistantCommandsAction(sess)
+    assert cache.stats['builds'] == 3
+
+    dyn = {'demo:echo': {'function': {'type': 'action', 'name': 'cmd_tool'}, 'args': ['text']}}
+    sess.set_user_data('__dynamic_tools__', dyn)
+    assert 'demo:echo' in AssistantCommandsAction(sess).commands
+    dyn['demo:other'] = {'function': {'type': 'action', 'name': 'math_tool'}}  # updated in place, as MCP registration does
+    act = AssistantCommandsAction(sess)
+    assert 'demo:other' in act.commands
+    assert 'demo:other' in {s['canonical_name'] for s in act.get_tool_specs()}
+    assert cache.stats['builds'] == 5 and cache.stats['turn_rebuilds'] == 5
+
+
+def test_user_action_files_invalidate(tmp_path):
+    sess = _make_session()
+    sess.config.set_option('user_actions', str(tmp_path))
+    cache = get_tool_registry(sess)
+    AssistantCommandsAction(sess)
+    (tmp_path / 'shout_tool_action.py').write_text(
+        'from base_classes import InteractionAction\n\n\n'
+        'class ShoutToolAction(InteractionAction):\n'
+        '    @classmethod\n'
+        '    def tool_name(cls):\n'
+        '        return "shout"\n\n'
+        '    @classmethod\n'
+        '    def tool_spec(cls, session):\n'
+        '        return {"args": ["text"], "description": "Shout"}\n'
+    )
+    assert 'shout' in AssistantCommandsAction(sess).commands
+    assert cache.stats['builds'] == 2
+
+    # Turns are counted by their cancellation token
+    sess.set_user_data('__turn_cancel__', object())
+    AssistantCommandsAction(sess)
+    assert cache.stats['turn_rebuilds'] == 2
+    sess.config.set_option('inactive_tools', 'shout')
+    assert 'shout' not in AssistantCommandsAction(sess).commands
+    assert cache.stats['turn_rebuilds'] == 1
+
+
+def test_runtime_tool_options_invalidate():
+    sess = _make_session()
+    cache = get_tool_registry(sess)
+    AssistantCommandsAction(sess)
+    # `/set option-tools inactive_tools math` mid-session
+    sess.set_option('inactive_tools', 'math', mode='tools')
+    AssistantCommandsAction(sess)
+    assert cache.stats['builds'] == 2
+    AssistantCommandsAction(sess)
+    assert cache.stats['builds'] == 2
+    sess.set_option('inactive_tools', '', mode='tools')
+    AssistantCommandsAction(sess)
+    assert cache.stats['builds'] == 3
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import pytest
+
+import core.token_counter as token_counter
+from contexts.chat_context import ChatContext, TURN_OVERHEAD_TOKENS, parse_budget, select_window
+from core.token_counter import TokenCounter
+
+
+class FakeEncoding:
+    """Whitespace 'tokenizer' recording every text it encodes."""
+
+    name = 'fake'
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, text, disallowed_special=()):
+        self.encoded.append(text)
+        return text.split()
+
+    def encode_batch(self, texts, disallowed_special=()):
+        self.encoded.extend(texts)
+        return [t.split() for t in texts]
+
+
+class DummySession:
+    def __init__(self, **params):
+        self.params = params
+
+    def get_params(self):
+        return self.params
+
+
+class Ctx:
+    def __init__(self, content):
+        self.data = {'name': 'f.txt', 'content': content}
+
+    def get(self):
+        return self.data
+
+
+@pytest.fixture
+def enc(monkeypatch):
+    enc = FakeEncoding()
+    monkeypatch.setattr(token_counter, '_COUNTER', TokenCounter(encoding_fn=lambda model: enc))
+    return enc
+
+
+def _chat(session, sizes):
+    chat = ChatContext(session)
+    for i, n in enumerate(sizes):
+        chat.add(' '.join([f'w{i}'] * n), role='user' if i % 2 == 0 else 'assistant')
+    return chat
+
+
+def test_parse_budget():
+    assert parse_budget('budget_8000') == (8000, 0)
+    assert parse_budget('budget_32k_pin2') == (32000, 2)
+    assert parse_budget('last_5') is None and parse_budget(None) is None
+
+
+def test_ledger_counts_each_turn_once_and_follows_edits(enc):
+    chat = _chat(DummySession(), [10, 20, 30])
+    assert enc.encoded == []  # adding turns does not tokenize
+    assert chat.token_ledger() == [n + TURN_OVERHEAD_TOKENS for n in (10, 20, 30)]
+    encoded = len(enc.encoded)
+
+    chat.add('a b c', context={'type': 'file', 'context': Ctx('x ' * 7)})
+    assert chat.token_ledger()[-1] == 3 + 7 + TURN_OVERHEAD_TOKENS
+    assert len(enc.encoded) == encoded + 2
+
+    chat.remove_first_message()
+    chat.remove_last_message()
+    assert chat.token_ledger() == [20 + TURN_OVERHEAD_TOKENS, 30 + TURN_OVERHEAD_TOKENS]
+    # Replacing a message or the whole list (session restore) recounts only what changed
+    chat.conversation[-1]['message'] = 'one two'
+    chat.conversation = [{'role': 'user', 'message': 'x y z'}] + chat.conversation
+    assert chat.token_ledger() == [3 + TURN_OVERHEAD_TOKENS, 20 + TURN_OVERHEAD_TOKENS, 2 + TURN_OVERHEAD_TOKENS]
+    assert chat.token_total() == 25 + 3 * TURN_OVERHEAD_TOKENS
+    assert len(enc.encoded) == encoded + 4
+
+
+def test_budget_window_takes_largest_fitting_suffix(enc):
+    session = DummySession()
+    chat = _chat(session, [96, 46, 46, 46, 46])  # 100, 50, 50, 50, 50 tokens
+    session.params['context_sent'] = 'budget_120'
+    assert chat.get() == chat.conversation[-2:]
+    session.params['context_sent'] = 'budget_1k'
+    assert chat.get() == chat.conversation
+    # The last turn is always sent, even over budget
+    session.params['context_sent'] = 'budget_10'
+    assert chat.get() == chat.conversation[-1:]
+    # Pinned first turns plus the suffix that fits in what is left
+    session.params['context_sent'] = 'budget_210_pin1'
+    assert chat.get() == [chat.conversation[0]] + chat.conversation[-2:]
+
+    encoded = len(enc.encoded)
+    session.params['context_sent'] = 'budget_160'
+    assert chat.get() == chat.conversation[-3:]
+    assert len(enc.encoded) == encoded  # windows reuse the ledger
+
+
+def test_budget_window_skips_orphan_tool_outputs(enc):
+    turns = [
+        {'role': 'user', 'message': 'q ' * 50},
+        {'role': 'assistant', 'message': 'call', 'tool_calls': [{'id': 'c1'}]},
+        {'role': 'tool', 'message': 'r ' * 10},
+        {'role': 'assistant', 'message': 'answer'},
+    ]
+    window = select_window(turns, 'budget_20', ledger=[54, 20, 14, 5])
+    assert window == turns[3:]
+    assert select_window(turns, 'last_2') == turns[-2:]
+    assert select_window(turns, 'first_1') == turns[:1]
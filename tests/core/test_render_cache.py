@@ -0,0 +1,146 @@
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from actions.process_contexts_action import ProcessContextsAction
+from core.render_cache import TurnRenderCache, get_render_cache
+from providers.anthropic_provider import AnthropicProvider
+from providers.openai_provider import OpenAIProvider
+
+
+class Ctx:
+    def __init__(self, data):
+        self.data = data
+
+    def get(self, *args, **kwargs):
+        return self.data
+
+
+class Logger:
+    def __init__(self):
+        self.events = []
+
+    def messages_event(self, kind, details, component='core.messages'):
+        self.events.append((kind, details, component))
+
+
+class Utils:
+    def __init__(self):
+        self.logger = Logger()
+
+
+class Session:
+    def __init__(self, turns, params=None):
+        self.turns = turns
+        self.params = params or {}
+        self.user_data = {}
+        self.utils = Utils()
+
+    def get_context(self, name):
+        return Ctx(self.turns) if name == 'chat' else None
+
+    def get_params(self):
+        return self.params
+
+    def get_user_data(self, key, default=None):
+        return self.user_data.get(key, default)
+
+    def set_user_data(self, key, value):
+        self.user_data[key] = value
+
+
+def _turn(i, message, *contexts):
+    turn = {'role': 'user' if i % 2 == 0 else 'assistant', 'message': message, 'meta': {'id': f't{i}'}}
+    if contexts:
+        turn['context'] = [{'type': 'file', 'context': c} for c in contexts]
+    return turn
+
+
+def _counting(calls):
+    def render(ctxs):
+        calls.append(len(ctxs))
+        return ProcessContextsAction.process_contexts_for_assistant(ctxs)
+    return render
+
+
+def test_render_reuses_unchanged_turns_and_rerenders_changed_ones():
+    cache = TurnRenderCache()
+    calls = []
+    a = Ctx({'name': 'a.txt', 'content': 'A' * 1000})
+    b = Ctx({'name': 'b.txt', 'content': 'B' * 10})
+    turns = [_turn(0, 'q1', a), _turn(1, 'r1'), _turn(2, 'q2', b)]
+
+    def request():
+        cache.begin()
+        out = [cache.render(t, t.get('context') or [], _counting(calls), kind='results') for t in turns]
+        return out, cache.finish('test')
+
+    first, stats = request()
+    assert '<|results:a.txt|>' in first[0] and stats['rebuilt'] == 3 and stats['reused'] == 0
+    second, stats = request()
+    assert second == first and len(calls) == 3
+    assert stats['rebuilt'] == 0 and stats['reused'] == 3 and stats['chars_reused'] == sum(map(len, first))
+
+    # Replacing a context's content (e.g. a reloaded file) re-renders only that turn
+    b.data['content'] = 'C' * 10
+    third, stats = request()
+    assert stats['rebuilt'] == 1 and 'CCCC' in third[2] and third[0] is first[0]
+
+    # Turns that leave the request are forgotten
+    del turns[0]
+    request()
+    assert len(cache) == 2
+    assert cache.totals['requests'] == 4
+
+
+def test_cache_keys_by_kind_and_falls_back_without_meta_id():
+    cache = TurnRenderCache()
+    turn = {'role': 'user', 'message': 'hi', 'context': [{'type': 'file', 'context': Ctx({'name': 'x', 'content': 'y'})}]}
+    cache.begin()
+    one = cache.render(turn, turn['context'], lambda c: 'one', kind='k1')
+    two = cache.render(turn, turn['context'], lambda c: 'two', kind='k2')
+    again = cache.render(turn, turn['context'], lambda c: 'changed', kind='k1')
+    assert (one, two, again) == ('one', 'two', 'one')
+    assert cache.finish('test') == {'rebuilt': 2, 'reused': 1, 'chars_rebuilt': 6, 'chars_reused': 3, 'entries': 2}
+
+
+def test_openai_assembly_reuses_rendered_history():
+    files = [Ctx({'name': f'f{i}.md', 'content': f'file {i} ' * 200}) for i in range(3)]
+    turns = [_turn(0, 'look', files[0]), _turn(1, 'ok'), _turn(2, 'and these', files[1], files[2])]
+    session = Session(turns, {'vision': False})
+    provider = OpenAIProvider.__new__(OpenAIProvider)
+    provider.session = session
+
+    first = provider.assemble_message()
+    assert first[0]['content'][0]['text'].startswith('<|results:f0.md|>')
+    turns.append(_turn(3, 'sure'))
+    turns.append(_turn(4, 'new file', Ctx({'name': 'g.md', 'content': 'g'})))
+    second = provider.assemble_message()
+    assert second[:3] == first
+    cache = get_render_cache(session)
+    assert cache.last['rebuilt'] == 1 and cache.last['reused'] == 2
+    kind, details, component = session.utils.logger.events[-1]
+    assert kind == 'render_cache' and component == 'providers.openai' and details['chars_reused'] > 0
+
+    # Simple format renders message + contexts as one string, cached separately
+    session.params['use_simple_message_format'] = True
+    simple = provider.assemble_message()
+    assert simple[0]['content'].startswith('<|results:f0.md|>') and simple[0]['content'].endswith('look')
+    assert provider.assemble_message() == simple and cache.last['rebuilt'] == 0
+
+
+def test_anthropic_build_messages_uses_cache():
+    f = Ctx({'name': 'notes.md', 'content': 'N' * 500})
+    turns = [_turn(0, 'read', f), _turn(1, 'done')]
+    session = Session(turns)
+    provider = AnthropicProvider.__new__(AnthropicProvider)
+    provider.session = session
+    first = provider._build_messages()
+    assert first[0]['content'][0]['text'].startswith('<|file:notes.md|>')
+    assert provider._build_messages() == first
+    assert get_render_cache(session).last == {
+        'rebuilt': 0, 'reused': 1, 'chars_rebuilt': 0, 'chars_reused': len(first[0]['content'][0]['text']), 'entries': 1,
+    }
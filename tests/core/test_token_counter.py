@@ -0,0 +1,113 @@
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import core.token_counter as token_counter
+from actions.count_tokens_action import CountTokensAction
+from core.token_counter import TokenCounter, context_token_counts
+
+
+class FakeEncoding:
+    """Whitespace 'tokenizer' recording what it was asked to encode."""
+
+    name = 'fake'
+
+    def __init__(self):
+        self.encoded = []
+        self.batches = []
+
+    def encode(self, text, disallowed_special=()):
+        self.encoded.append(text)
+        return text.split()
+
+    def encode_batch(self, texts, disallowed_special=()):
+        self.batches.append(list(texts))
+        return [t.split() for t in texts]
+
+
+class Ctx:
+    def __init__(self, data):
+        self.data = data
+
+    def get(self):
+        return self.data
+
+
+def _counter(enc, **kw):
+    return TokenCounter(encoding_fn=lambda model: enc, **kw)
+
+
+def test_count_encodes_each_content_once():
+    enc = FakeEncoding()
+    counter = _counter(enc)
+    text = 'one two three ' * 1000
+    assert counter.count(text) == 3000
+    assert counter.count(text) == 3000
+    assert counter.count(''.join(text)) == 3000  # equal content, different object
+    assert len(enc.encoded) == 1
+    assert counter.count(None) == 0 and counter.count('') == 0
+    assert counter.stats()['hits'] == 2 and counter.stats()['misses'] == 1
+
+
+def test_count_many_batches_distinct_misses():
+    enc = FakeEncoding()
+    counter = _counter(enc)
+    counter.count('a b')
+    assert counter.count_many(['a b', 'c d e', '', None, 'c d e', 'f']) == [2, 3, 0, 0, 3, 1]
+    assert enc.batches == [['c d e', 'f']]
+    assert counter.count_many(['f', 'c d e']) == [1, 3] and len(enc.batches) == 1
+
+
+def test_lru_evicts_least_recently_used():
+    enc = FakeEncoding()
+    counter = _counter(enc, max_entries=2)
+    counter.count('a')
+    counter.count('b')
+    counter.count('a')
+    counter.count('c')  # evicts 'b'
+    enc.encoded.clear()
+    counter.count('a')
+    counter.count('b')
+    assert enc.encoded == ['b']
+
+
+def test_counts_are_stored_on_context_objects():
+    enc = FakeEncoding()
+    counter = _counter(enc)
+    a = Ctx({'name': 'a', 'content': 'x y z'})
+    b = Ctx({'name': 'b', 'content': 'p q'})
+    empty = Ctx({'name': 'e', 'content': ''})
+    assert counter.count_contexts([a, b, empty]) == [3, 2, 0]
+    assert a._token_count == ('x y z', 'fake', 3)
+
+    counter.clear()  # counts on the objects survive the LRU
+    assert counter.count_contexts([a, b]) == [3, 2] and len(enc.batches) == 1
+
+    a.data['content'] = 'x y z w'  # e.g. file reloaded
+    assert counter.count_context(a) == 4
+
+
+def test_context_token_counts_supports_plain_counters():
+    class Plain:
+        @staticmethod
+        def count_tiktoken(text):
+            return len(text)
+
+    ctxs = [Ctx({'content': 'abcd'}), Ctx({'content': None}), Ctx({'content': 'xy'})]
+    assert context_token_counts(Plain(), ctxs) == [4, 0, 2]
+    assert context_token_counts(None, ctxs) == [0, 0, 0]
+
+
+def test_count_tokens_action_uses_shared_counter(monkeypatch):
+    enc = FakeEncoding()
+    monkeypatch.setattr(token_counter, '_COUNTER', _counter(enc))
+    messages = [{'role': 'user', 'content': 'hello there'}, {'role': 'assistant', 'content': 'hi'}]
+    # 3 per message + values + 1 per role + 3 priming
+    assert CountTokensAction.count_tiktoken(messages) == 6 + (1 + 2 + 1 + 1) + 2 + 3
+    assert CountTokensAction.count_tiktoken('hello there') == 2
+    assert CountTokensAction.count_tiktoken_many(['a', 'b c']) == [1, 2]
+    assert CountTokensAction.count_contexts([Ctx({'content': 'a b'})]) == [2]
+    assert enc.encoded == [] and len(enc.batches) == 3
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+pytest.importorskip("llama_cpp")
+
+from providers.llamacpp_provider import LlamaCppProvider
+
+
+class FakeEmbedLLM:
+    """Token-level outputs (pooling none): one [dim] vector per token."""
+
+    n_batch = 8
+
+    def __init__(self, fail_batch: bool = False):
+        self.fail_batch = fail_batch
+        self.calls = []
+
+    def n_ctx(self):
+        return 16
+
+    def tokenize(self, text, add_bos=True):
+        return [0] * (len(text.split()) + int(add_bos))
+
+    def _tokens(self, text):
+        return [[float(len(w)), 1.0] for w in text.split()]
+
+    def embed(self, inp, truncate=True):
+        self.calls.append(inp)
+        if isinstance(inp, list):
+            if self.fail_batch and len(inp) > 1:
+                raise RuntimeError('batch decode failed')
+            return [self._tokens(t) for t in inp]
+        return self._tokens(inp)
+
+
+class FakeSession:
+    def __init__(self, **params):
+        self._params = {"context_size": 16, "n_gpu_layers": 0, "verbose": False, "model_path": "m.gguf", **params}
+
+    def get_params(self):
+        return dict(self._params)
+
+
+def _provider(llm, **params):
+    provider = LlamaCppProvider(FakeSession(**params))
+    provider._get_embed_llm = lambda path=None: llm  # type: ignore[method-assign]
+    return provider
+
+
+def test_embed_packs_inputs_per_decode_and_mean_pools():
+    llm = FakeEmbedLLM()
+    texts = ['aa bbbb', 'c', 'dd dd dd', 'eeeeee']  # 3, 2, 4, 2 tokens with BOS
+    out = _provider(llm).embed(texts)
+    assert llm.calls == [['aa bbbb', 'c'], ['dd dd dd', 'eeeeee']]
+    assert out == [[3.0, 1.0], [1.0, 1.0], [2.0, 1.0], [6.0, 1.0]]
+
+
+def test_embed_falls_back_to_per_item_and_remembers():
+    llm = FakeEmbedLLM(fail_batch=True)
+    provider = _provider(llm)
+    texts = ['aa bbbb', 'c']
+    assert provider.embed(texts) == [[3.0, 1.0], [1.0, 1.0]]
+    assert llm.calls == [texts, 'aa bbbb', 'c']
+    llm.calls.clear()
+    provider.embed(texts)
+    assert llm.calls == ['aa bbbb', 'c']
+
+    llm = FakeEmbedLLM()
+    _provider(llm, embed_batch='false').embed(texts)
+    assert llm.calls == ['aa bbbb', 'c']
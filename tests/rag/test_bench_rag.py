@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.bench_rag import HashEmbedder, compare, load_queries, main, make_corpus, parse_mix, write_pdf
+
+
+def _snapshot(root):
+    out = {}
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(dirpath, name)
+            with open(path, 'rb') as f:
+                out[os.path.relpath(path, root)] = f.read()
+    return out
+
+
+def test_corpus_is_reproducible(tmp_path):
+    a = make_corpus(str(tmp_path / 'a'), files=12, words=(50, 120), mix='md:1,txt:1,pdf:1', queries=6, seed=3)
+    b = make_corpus(str(tmp_path / 'b'), files=12, words=(50, 120), mix='md:1,txt:1,pdf:1', queries=6, seed=3)
+    assert a == b and a['files'] == 12 and a['queries'] == 6
+    assert _snapshot(tmp_path / 'a') == _snapshot(tmp_path / 'b')
+    assert len(load_queries(str(tmp_path / 'a'))) == 6
+
+    make_corpus(str(tmp_path / 'c'), files=12, words=(50, 120), mix='md:1,txt:1,pdf:1', queries=6, seed=4)
+    assert _snapshot(tmp_path / 'a') != _snapshot(tmp_path / 'c')
+
+    assert parse_mix('md:3,pdf:1') == {'md': 0.75, 'pdf': 0.25}
+    with pytest.raises(ValueError):
+        parse_mix('html:1')
+
+
+def test_synthetic_pdf_extracts(tmp_path):
+    pypdf = pytest.importorskip('pypdf')
+    path = tmp_path / 'x.pdf'
+    write_pdf(str(path), ['alpha beta (gamma) delta ' * 40, 'second paragraph'], lines_per_page=5)
+    reader = pypdf.PdfReader(str(path))
+    text = '\n'.join(p.extract_text() for p in reader.pages)
+    assert len(reader.pages) > 1 and '(gamma)' in text and 'second paragraph' in text
+
+
+def test_hash_embedder_is_deterministic_and_normalized():
+    emb = HashEmbedder(dim=32)
+    vecs = emb(['alpha beta gamma', 'alpha beta gamma', 'unrelated words here'])
+    assert vecs.shape == (3, 32)
+    assert np.allclose(np.linalg.norm(vecs, axis=1), 1.0, atol=1e-5)
+    assert np.allclose(vecs[0], HashEmbedder(dim=32)(['alpha beta gamma'])[0])
+    assert float(vecs[0] @ vecs[1]) > 0.99 > float(vecs[0] @ vecs[2])
+    assert emb.calls == 1 and emb.texts == 3
+
+
+def test_benchmark_writes_json_results(tmp_path, capsys):
+    out = tmp_path / 'results.json'
+    argv = ['--files', '20', '--words', '80:200', '--mix', 'md:2,txt:1', '--queries', '6', '--k', '3',
+            '--dim', '32', '--workdir', str(tmp_path / 'work'), '--out', str(out)]
+    assert main(argv + ['--no-isolate']) == 0
+    res = json.loads(out.read_text())
+    assert res['corpus']['files'] == 20
+    idx = res['index']
+    assert idx['files'] == 20 and idx['chunks'] >= 20 and idx['embedded'] == idx['chunks']
+    assert idx['files_per_s'] > 0 and idx['chunks_per_s'] > 0 and idx['bytes_extracted'] > 0
+    s = res['search']
+    assert s['queries'] == 6 and s['p50_ms'] is not None and s['p95_ms'] >= s['p50_ms']
+    assert s['recall_at_k'] == 1.0  # exact backend
+    assert json.loads(capsys.readouterr().out)['version'] == res['version']
+
+    # Isolated indexing reports its own peak RSS; --baseline adds a comparison
+    assert main(argv + ['--baseline', str(out), '--out', str(tmp_path / 'second.json')]) == 0
+    second = json.loads((tmp_path / 'second.json').read_text())
+    assert second['index']['chunks'] == idx['chunks']
+    if second['index']['peak_rss_mb'] is not None:
+        assert second['index']['peak_rss_mb'] > 0
+    assert second['comparison']['search.recall_at_k']['change'] == 0.0
+    assert set(second['comparison']) >= {'index.files_per_s', 'search.p95_ms'}
+
+
+def test_compare_signs_changes_as_improvements():
+    base = {'index': {'files_per_s': 100.0}, 'search': {'p50_ms': 2.0}}
+    cur = {'index': {'files_per_s': 150.0}, 'search': {'p50_ms': 1.0}}
+    diff = compare(cur, base)
+    assert diff['index.files_per_s']['change'] == 0.5
+    assert diff['search.p50_ms']['change'] == 0.5
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from rag.chunk_table import ChunkTable, ChunkTableBuilder
+from rag.search import _load_index
+from rag.vector_store import NaiveStore
+
+
+def _records(n, paths=3):
+    out = []
+    for i in range(n):
+        rec = {
+            'path': f'/docs/file{i % paths}.md',
+            'start': 10 * i,
+            'end': 10 * i + 9,
+            'hash': hashlib.sha1(str(i).encode()).hexdigest(),
+        }
+        if i % 2:
+            rec['lines'] = [i + 1, i + 2]
+            rec['bytes'] = [10 * i, 10 * i + 9]
+        if i % 3 == 0:
+            rec['source_path'] = '/docs/archive.zip'
+        out.append(rec)
+    return out
+
+
+def test_round_trip_matches_records(tmp_path):
+    recs = _records(50)
+    table = ChunkTable.from_records(recs)
+    assert len(table.paths) == 4 and table.hash_bin is not None
+    assert list(table) == recs and table[-1] == recs[-1] and table[5:8] == recs[5:8]
+
+    path = str(tmp_path / 'chunks.npz')
+    table.save(path)
+    loaded = ChunkTable.load(path)
+    assert list(loaded) == recs
+    assert loaded.hashes() == [r['hash'] for r in recs]
+
+    # Hashes that are not hex SHA-1 digests are kept verbatim
+    odd = [dict(r, hash=f'h{i}') for i, r in enumerate(recs[:4])]
+    fallback = ChunkTable.from_records(odd)
+    assert fallback.hash_bin is None
+    fallback.rows(1, 4).save(path)
+    assert list(ChunkTable.load(path)) == odd[1:4]
+
+
+def test_builder_reinterns_paths():
+    prev = ChunkTable.from_records(_records(30, paths=10))
+    builder = ChunkTableBuilder()
+    builder.extend_rows(prev, 0, 5)
+    builder.append({'path': '/docs/new.md', 'start': 0, 'end': 4, 'hash': 'a' * 40})
+    builder.extend_rows(prev, 20, 22)
+    assert len(builder) == 8
+    table = builder.build()
+    assert list(table) == prev[0:5] + [{'path': '/docs/new.md', 'start': 0, 'end': 4, 'hash': 'a' * 40}] + prev[20:22]
+    # Only paths still referenced survive
+    assert sorted(table.paths) == sorted({r['path'] for r in table} | {'/docs/archive.zip'})
+
+
+def test_builder_merges_adjacent_carried_ranges():
+    prev = ChunkTable.from_records(_records(30, paths=10))
+    builder = ChunkTableBuilder()
+    for a in range(0, 20, 2):  # one range per unchanged file
+        builder.extend_rows(prev, a, a + 2)
+    builder.extend_rows(prev, 25, 27)
+    assert len(builder._parts) == 2
+    builder.append({'path': '/docs/new.md', 'start': 0, 'end': 4, 'hash': 'a' * 40})
+    builder.extend_rows(prev, 27, 28)
+    assert len(builder._parts) == 4
+    assert list(builder.build()) == prev[0:20] + prev[25:27] + [
+        {'path': '/docs/new.md', 'start': 0, 'end': 4, 'hash': 'a' * 40}] + prev[27:28]
+
+
+def test_table_is_much_smaller_than_dicts():
+    recs = _records(2000, paths=40)
+    table = ChunkTable.from_records(recs)
+    dict_bytes = sum(sys.getsizeof(r) + sum(sys.getsizeof(v) for v in r.values()) for r in recs)
+    assert table.nbytes * 5 < dict_bytes
+
+
+def test_legacy_jsonl_is_converted_on_read(tmp_path):
+    store = NaiveStore(str(tmp_path), 'notes')
+    store.ensure_dirs()
+    recs = _records(3)
+    with open(store.manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({'name': 'notes', 'vector_dim': 2}, f)
+    with open(store.legacy_chunks_path, 'w', encoding='utf-8') as f:
+        for r in recs:
+            f.write(json.dumps(r) + "\n")
+    np.save(store.embeddings_path, np.ones((3, 2), dtype=np.float32))
+    assert store.exists()
+
+    chunks, embs = _load_index(store.index_dir)
+    assert list(chunks) == recs and embs.shape == (3, 2)
+    assert os.path.exists(store.chunks_path)
+    assert not os.path.exists(store.legacy_chunks_path)
+    assert list(store.read_chunks()) == recs
+
+
+def test_unreadable_legacy_jsonl_is_kept(tmp_path):
+    store = NaiveStore(str(tmp_path), 'notes')
+    store.ensure_dirs()
+    recs = _records(2)
+    with open(store.legacy_chunks_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(recs[0]) + "\n" + json.dumps(recs[1])[:20])  # truncated last line
+    assert list(store.read_chunks()) == recs[:1]
+    assert os.path.exists(store.legacy_chunks_path) and not os.path.exists(store.chunks_path)
+
+    os.remove(store.legacy_chunks_path)
+    os.mkdir(store.legacy_chunks_path)  # open() fails
+    assert len(store.read_chunks()) == 0
+    assert os.path.isdir(store.legacy_chunks_path) and not os.path.exists(store.chunks_path)
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from rag.dedup import DedupTable, DedupTableBuilder, assign_duplicates, dedup_row
+from rag.filters import build_filters
+from rag.indexer import update_index
+from rag.search import search
+from rag.vector_store import NaiveStore
+
+
+class _Embed:
+    def __init__(self):
+        self.texts = []
+
+    def __call__(self, texts):
+        self.texts.extend(texts)
+        out = []
+        for t in texts:
+            seed = int(hashlib.sha1(t.encode('utf-8')).hexdigest()[:8], 16)
+            out.append(np.random.default_rng(seed).normal(size=16).tolist())
+        return out
+
+
+def _paragraph(seed: int, words: int = 90) -> str:
+    rng = random.Random(seed)
+    return ' '.join(''.join(rng.choice('abcdefghijklmnop') for _ in range(rng.randint(3, 8))) for _ in range(words))
+
+
+def _tree(tmp_path):
+    base = _paragraph(1)
+    root = tmp_path / 'docs'
+    (root / 'vendor').mkdir(parents=True)
+    (root / 'a.md').write_text(base)
+    (root / 'vendor' / 'a_copy.md').write_text('  ' + base.upper().replace(' ', '\n', 3))  # exact after normalizing
+    words = base.split()
+    words[40] = 'zzzzzz'
+    (root / 'vendor' / 'a_edit.md').write_text(' '.join(words))                           # near duplicate
+    (root / 'c.md').write_text(_paragraph(2))
+    return root
+
+
+def _update(tmp_path, root, embed, dedup='near', **kw):
+    return update_index(index_name='d', root_path=str(root), vector_db=str(tmp_path / 'db'), embed_fn=embed,
+                        embedding_model='M', dedup=dedup, **kw)
+
+
+def test_near_duplicates_share_one_embedding(tmp_path):
+    root = _tree(tmp_path)
+    embed = _Embed()
+    stats = _update(tmp_path, root, embed)
+    assert len(embed.texts) == 2 and stats['deduped'] == 2 and stats['duplicates'] == 2
+
+    store = NaiveStore(str(tmp_path / 'db'), 'd')
+    manifest, chunks, embs = store.read_all()
+    assert manifest['dedup']['mode'] == 'near' and manifest['dedup']['duplicates'] == 2
+    by_name = {os.path.basename(c['path']): i for i, c in enumerate(chunks)}
+    canon = by_name['a.md']
+    for name in ('a_copy.md', 'a_edit.md'):
+        assert chunks[by_name[name]]['dup_of'] == canon
+        assert np.allclose(embs[by_name[name]], embs[canon])
+    assert 'dup_of' not in chunks[by_name['c.md']]
+
+    # Exact-only mode keeps the edited copy
+    embed = _Embed()
+    stats = update_index(index_name='x', root_path=str(root), vector_db=str(tmp_path / 'db'), embed_fn=embed,
+                         embedding_model='M', dedup='exact')
+    assert len(embed.texts) == 3 and stats['duplicates'] == 1
+
+
+@pytest.mark.parametrize('mode', ['vector', 'lexical', 'hybrid'])
+def test_search_collapses_duplicate_hits(tmp_path, mode):
+    root = _tree(tmp_path)
+    _update(tmp_path, root, _Embed())
+    kw = dict(indexes={}, names=['d'], vector_db=str(tmp_path / 'db'), embed_query_fn=_Embed(),
+              query=_paragraph(1), k=10, mode=mode)
+    res = search(**kw)
+    paths = [os.path.basename(r['path']) for r in res['results']]
+    assert sorted(paths) in (['a.md'], ['a.md', 'c.md'])
+    top = res['results'][0]
+    assert sorted(os.path.basename(p) for p in top['duplicates']) == ['a_copy.md', 'a_edit.md']
+    assert res['stats']['indices'][0]['collapsed'] == 2
+
+    # A filter that excludes the canonical file still finds its copies
+    res = search(filters=build_filters(include='vendor/**'), **kw)
+    assert sorted(os.path.basename(r['path']) for r in res['results']) == ['a_copy.md', 'a_edit.md']
+
+
+def test_incremental_updates_reuse_and_regroup(tmp_path):
+    root = _tree(tmp_path)
+    _update(tmp_path, root, _Embed())
+    (root / 'vendor' / 'again.md').write_text(_paragraph(1) + ' ')
+    embed = _Embed()
+    stats = _update(tmp_path, root, embed)
+    assert embed.texts == [] and stats['deduped'] == 1 and stats['duplicates'] == 3
+
+    # Removing the canonical file promotes the first remaining copy
+    (root / 'a.md').unlink()
+    stats = _update(tmp_path, root, _Embed())
+    chunks = NaiveStore(str(tmp_path / 'db'), 'd').read_chunks()
+    canon = [os.path.basename(c['path']) for c in chunks if 'dup_of' not in c]
+    assert sorted(canon) == ['a_copy.md', 'c.md'] and stats['duplicates'] == 2
+
+    # Turning dedup off drops the groups without re-embedding
+    embed = _Embed()
+    update_index(index_name='d', root_path=str(root), vector_db=str(tmp_path / 'db'), embed_fn=embed,
+                 embedding_model='M')
+    manifest, chunks, _ = NaiveStore(str(tmp_path / 'db'), 'd').read_all()
+    assert embed.texts == [] and 'dedup' not in manifest and chunks.dup_of is None
+
+
+def test_assign_duplicates_never_chains():
+    texts = [_paragraph(7), _paragraph(8)]
+    words = texts[0].split()
+    for i in range(0, 90, 30):
+        words[i] = 'qqqqqq'   # a drifted copy, far from the original
+    texts.append(' '.join(words))
+    texts.append(texts[0].upper())
+    rows = [dedup_row(t, 'near') for t in texts]
+    table = DedupTable('near', np.array([k for k, _ in rows], dtype=np.uint64), np.stack([s for _, s in rows]))
+    dup_of = assign_duplicates(table, 0.85)
+    assert dup_of[3] == 0 and dup_of[1] == -1
+    assert all(dup_of[dup_of[r]] == -1 for r in np.flatnonzero(dup_of >= 0))
+
+
+@pytest.mark.parametrize('mode', ['vector', 'lexical', 'hybrid'])
+def test_enabling_near_dedup_keeps_top_k_recall(tmp_path, mode):
+    root = _tree(tmp_path)
+    _update(tmp_path, root, _Embed(), dedup=None)
+    kw = dict(indexes={}, names=['d'], vector_db=str(tmp_path / 'db'), embed_query_fn=_Embed(), k=3, mode=mode)
+    names = ('a.md', 'vendor/a_copy.md', 'vendor/a_edit.md', 'c.md')
+    queries = [(root / n).read_text() for n in names]
+    before = [search(query=q, **kw)['results'] for q in queries]
+    if mode == 'vector':
+        assert [os.path.basename(r[0]['path']) for r in before] == [os.path.basename(n) for n in names]
+
+    # Rows embedded before dedup keep their own vectors: grouped, but none is hidden
+    embed = _Embed()
+    stats = _update(tmp_path, root, embed)
+    chunks = NaiveStore(str(tmp_path / 'db'), 'd').read_chunks()
+    assert embed.texts == [] and stats['duplicates'] == 2 and not chunks.dup_shared.any()
+    for q, b in zip(queries, before):
+        res = search(query=q, **kw)
+        a = res['results']
+        assert a[0]['path'] == b[0]['path']
+        # Fusion now ranks the group by its best row in each ranking, so hybrid scores can only rise
+        assert a[0]['score'] == b[0]['score'] if mode != 'hybrid' else a[0]['score'] >= b[0]['score']
+        found = {r['path'] for r in a} | {p for r in a for p in r.get('duplicates', [])}
+        assert {r['path'] for r in b} <= found
+        assert res['stats']['indices'][0]['collapsed'] == 0
+
+
+def test_builder_merges_adjacent_carried_ranges():
+    rows = [dedup_row(_paragraph(i, 20), 'near') for i in range(6)]
+    prev = DedupTable('near', np.array([k for k, _ in rows], dtype=np.uint64), np.stack([s for _, s in rows]))
+    builder = DedupTableBuilder('near')
+    for a in range(0, 4):
+        builder.extend_rows(prev, a, a + 1)
+    builder.append(*dedup_row('new text', 'near'))
+    builder.extend_rows(prev, 5, 6)
+    assert len(builder._parts) == 3
+    table = builder.build()
+    assert table.keys.tolist() == prev.keys[:4].tolist() + [dedup_row('new text', 'near')[0], int(prev.keys[5])]
+    assert np.array_equal(table.sigs[:4], prev.sigs[:4])
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import configparser
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from rag.embed_scheduler import EmbedScheduler, RateLimiter, is_retryable
+from rag.fs_utils import load_rag_embed_settings
+from rag.indexer import update_index
+from rag.vector_store import NaiveStore
+
+
+class _HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f'HTTP {status_code}')
+        self.status_code = status_code
+
+
+def _slow_embed(texts):
+    # Latency varies per batch so completion order differs from submission order
+    time.sleep(0.02 * (1 + len(texts[0]) % 3))
+    return [[float(len(t)), 1.0] for t in texts]
+
+
+def test_retries_transient_errors_with_backoff():
+    calls = []
+    sleeps = []
+
+    def embed(texts):
+        calls.append(texts)
+        if len(calls) <= 2:
+            raise _HTTPError(429 if len(calls) == 1 else 503)
+        return [[1.0]]
+
+    with EmbedScheduler(embed, backoff=0.5, sleep=sleeps.append) as sched:
+        assert sched.submit(['a']).result() == [[1.0]]
+        assert sched.stats()['retries'] == 2
+    assert len(sleeps) == 2 and 0.25 <= sleeps[0] <= 0.5 and 0.5 <= sleeps[1] <= 1.0
+
+
+def test_non_retryable_errors_fail_fast():
+    def embed(texts):
+        raise _HTTPError(400)
+
+    with EmbedScheduler(embed, sleep=lambda s: None) as sched:
+        with pytest.raises(_HTTPError):
+            sched.submit(['a']).result()
+        assert sched.stats()['retries'] == 0
+    assert is_retryable(TimeoutError()) and not is_retryable(ValueError())
+    # Conflicts and permanent server errors are not transient
+    assert not any(is_retryable(_HTTPError(code)) for code in (409, 501, 505))
+
+
+def test_rate_limiter_spaces_requests_and_tokens():
+    now = [0.0]
+
+    def sleep(s):
+        now[0] += s
+
+    rl = RateLimiter(requests_per_minute=2, clock=lambda: now[0], sleep=sleep)
+    assert rl.acquire() == 0 and rl.acquire() == 0
+    assert rl.acquire() == pytest.approx(30.0)
+
+    now[0] = 0.0
+    tl = RateLimiter(tokens_per_minute=600, clock=lambda: now[0], sleep=sleep)
+    assert tl.acquire(600) == 0
+    assert tl.acquire(100) == pytest.approx(10.0)
+
+
+def test_update_index_with_concurrency_matches_serial(tmp_path):
+    root = tmp_path / 'docs'
+    root.mkdir()
+    for i in range(9):
+        (root / f'doc{i}.md').write_text(f'note {i} ' + 'y' * i)
+    db = tmp_path / 'db'
+    common = dict(root_path=str(root), vector_db=str(db), embed_fn=_slow_embed, embedding_model='M', batch_size=2)
+    serial = update_index(index_name='serial', **common)
+    fast = update_index(index_name='fast', embed_options={'concurrency': 4}, **common)
+    assert fast['embedded'] == serial['embedded'] == 9
+    assert fast['embed']['requests'] == 5
+    a, b = NaiveStore(str(db), 'serial'), NaiveStore(str(db), 'fast')
+    assert [c['hash'] for c in a.read_chunks()] == [c['hash'] for c in b.read_chunks()]
+    assert np.array_equal(a.read_embeddings(), b.read_embeddings())
+
+
+def test_provider_section_overrides_rag_settings():
+    cfg = configparser.ConfigParser()
+    cfg.read_string("[RAG]\nembed_concurrency = 2\nembed_rpm = 100\n[OpenAI]\nembed_concurrency = 8\n")
+    session = SimpleNamespace(config=SimpleNamespace(base_config=cfg))
+    assert load_rag_embed_settings(session) == {'concurrency': 2, 'rpm': 100, 'tpm': None, 'max_retries': 5}
+    assert load_rag_embed_settings(session, 'OpenAI')['concurrency'] == 8
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import configparser
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from actions.rag_cache_action import RagCacheAction
+from rag.embedding_cache import EmbeddingCache, signature_key
+from rag.indexer import update_index
+from rag.vector_store import NaiveStore
+
+
+def _embed(texts):
+    _embed.calls += len(texts)
+    return [[float(len(t)), 1.0, 2.0] for t in texts]
+
+
+_embed.calls = 0
+
+
+def _docs(root, names):
+    root.mkdir()
+    for name in names:
+        (root / name).write_text(f'shared text of {name}')
+
+
+def test_identical_chunks_are_embedded_once_across_indexes(tmp_path):
+    db = tmp_path / 'db'
+    cache = EmbeddingCache.for_vector_db(str(db))
+    a, b = tmp_path / 'a', tmp_path / 'b'
+    _docs(a, ['README.md', 'LICENSE.md'])
+    # Same file names => same chunk text in both roots
+    _docs(b, ['README.md', 'LICENSE.md', 'extra.md'])
+
+    _embed.calls = 0
+    first = update_index(index_name='one', root_path=str(a), vector_db=str(db), embed_fn=_embed,
+                         embedding_model='M', embedding_cache=cache)
+    second = update_index(index_name='two', root_path=str(b), vector_db=str(db), embed_fn=_embed,
+                          embedding_model='M', embedding_cache=cache)
+    assert first['embedded'] == 2 and first['cached'] == 0
+    assert second['embedded'] == 1 and second['cached'] == 2
+    assert _embed.calls == 3
+
+    # Vectors served from the cache match a direct embedding
+    one = NaiveStore(str(db), 'one')
+    two = NaiveStore(str(db), 'two')
+    by_hash = {c['hash']: one.read_embeddings()[i] for i, c in enumerate(one.read_chunks())}
+    for i, c in enumerate(two.read_chunks()):
+        if c['hash'] in by_hash:
+            assert np.allclose(two.read_embeddings()[i], by_hash[c['hash']])
+
+    # A different embedding signature never reads those vectors
+    other = update_index(index_name='three', root_path=str(a), vector_db=str(db), embed_fn=_embed,
+                         embedding_model='other', embedding_cache=cache)
+    assert other['cached'] == 0 and other['embedded'] == 2
+    cache.close()
+
+
+def test_prune_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / 'cache.sqlite'), max_bytes=10 ** 9)
+    sig = signature_key({'embedding_model': 'M'})
+    vecs = np.ones((4, 8), dtype=np.float32)
+    cache.put_many(sig, ['h0', 'h1'], vecs[:2])
+    cache._db().execute('UPDATE embeddings SET last_used = 1')
+    cache.put_many(sig, ['h2', 'h3'], vecs[2:])
+    assert cache.stats()['entries'] == 4 and cache.stats()['bytes'] == 4 * 32
+
+    assert cache.prune(64) == 2
+    assert set(cache.get_many(sig, ['h0', 'h1', 'h2', 'h3'])) == {'h2', 'h3'}
+    assert cache.prune(0) == 2 and cache.stats()['entries'] == 0
+    cache.close()
+
+
+def test_prune_at_cap_evicts_to_low_water(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / 'cache.sqlite'), max_bytes=300)
+    sig = signature_key({'embedding_model': 'M'})
+    cache.put_many(sig, [f'h{i}' for i in range(10)], np.ones((10, 8), dtype=np.float32))
+    assert cache.prune() == 2 and cache.stats()['bytes'] == 8 * 32
+    # Headroom below the cap: the next additions do not evict again
+    cache.put_many(sig, ['h10'], np.ones((1, 8), dtype=np.float32))
+    assert cache.prune() == 0
+    cache.close()
+
+
+class _UI:
+    def __init__(self):
+        self.events = []
+
+    def emit(self, kind, data):
+        self.events.append((kind, data.get('message')))
+
+
+class _Out:
+    def __init__(self):
+        self.blocks = []
+
+    def write(self, s, *a, **k):
+        self.blocks.append(s)
+
+
+class _Session:
+    def __init__(self, vector_db):
+        cfg = configparser.ConfigParser()
+        cfg['RAG'] = {'vector_db': vector_db, 'indexes': 'notes', 'embedding_cache_mb': '1'}
+        cfg['RAG.notes'] = {'path': vector_db}
+        self.config = type('C', (), {'base_config': cfg, 'overrides': {}})()
+        self.ui = _UI()
+        self.utils = type('U', (), {'output': _Out()})()
+
+    def get_tools(self):
+        return {}
+
+    def get_params(self):
+        return {}
+
+
+def test_rag_cache_action_stats_and_prune(tmp_path):
+    db = tmp_path / 'db'
+    cache = EmbeddingCache.for_vector_db(str(db))
+    cache.put_many('s', ['h0'], np.ones((1, 4), dtype=np.float32))
+    cache.close()
+
+    session = _Session(str(db))
+    assert RagCacheAction(session).run(['stats']) is True
+    assert 'entries:    1' in session.utils.output.blocks[-1]
+
+    assert RagCacheAction(session).run(['prune', '0']) is True
+    assert ('status', 'Pruned 1 cached embedding(s)') in session.ui.events
+    assert 'entries:    0' in session.utils.output.blocks[-1]
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from rag.cache import IndexCache, get_index_cache
+from rag.indexer import update_index
+from rag.search import search
+from rag.vector_store import NaiveStore
+
+
+def _write(tmp_path, name, n):
+    store = NaiveStore(str(tmp_path / 'db'), name)
+    chunks = [{'path': 'x', 'start': 0, 'end': 1, 'hash': str(i)} for i in range(n)]
+    store.write(manifest={'name': name}, chunks=chunks, embeddings=[[1.0, 0.0]] * n)
+    return store.index_dir
+
+
+def test_cache_hits_until_artifacts_change(tmp_path):
+    cache = IndexCache()
+    calls = []
+
+    def loader(d):
+        calls.append(d)
+        return NaiveStore.from_index_dir(d).read_all()[1:]
+
+    idx = _write(tmp_path, 'a', 2)
+    cache.get(idx, loader)
+    cache.get(idx, loader)
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+    # Rewriting the index changes the stamp and forces a reload
+    _write(tmp_path, 'a', 3)
+    chunks, embs = cache.get(idx, loader)
+    assert len(calls) == 2 and len(chunks) == 3
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_cache_lru_eviction_respects_cap(tmp_path):
+    a = _write(tmp_path, 'a', 4)
+    b = _write(tmp_path, 'b', 4)
+    loader = lambda d: NaiveStore.from_index_dir(d).read_all()[1:]
+    cache = IndexCache()
+    cache.get(a, loader)
+    one = cache.stats()['bytes']
+    cache.set_max_bytes(one + one // 2)
+    cache.get(b, loader)
+    st = cache.stats()
+    assert st['entries'] == 1 and st['evictions'] == 1
+    cache.get(b, loader)
+    assert cache.stats()['hits'] == 1
+
+    # A zero cap disables caching entirely
+    cache.set_max_bytes(0)
+    assert cache.stats()['entries'] == 0
+    cache.get(a, loader)
+    assert cache.stats()['entries'] == 0
+
+
+def test_memory_mapped_vectors_do_not_fill_the_budget(tmp_path):
+    store = NaiveStore(str(tmp_path / 'db'), 'big')
+    n = 2000
+    store.write(manifest={'name': 'big'}, chunks=[{'path': 'x', 'start': 0, 'end': 1, 'hash': str(i)} for i in range(n)],
+                embeddings=[[1.0] * 256] * n)  # ~2 MB of float32 vectors
+    small = _write(tmp_path, 'small', 2)
+    loader = lambda d: NaiveStore.from_index_dir(d).read_all()[1:]
+    cache = IndexCache(max_bytes=1024 * 1024)
+    cache.get(small, loader)
+    cache.get(store.index_dir, loader)
+    st = cache.stats()
+    assert st['entries'] == 2 and st['evictions'] == 0
+    assert st['mapped_bytes'] >= n * 256 * 4 and st['bytes'] < 1024 * 1024
+
+
+def test_search_uses_cache_and_update_invalidates(tmp_path):
+    root = tmp_path / 'docs'
+    root.mkdir()
+    (root / 'a.md').write_text('hello world')
+    vector_db = str(tmp_path / 'db')
+    emb = lambda texts: [[1.0, 0.0, 0.0] for _ in texts]
+    update_index(index_name='notes', root_path=str(root), vector_db=vector_db, embed_fn=emb, embedding_model='M')
+
+    cache = get_index_cache()
+    before = cache.stats()
+    for _ in range(3):
+        res = search(indexes={}, names=['notes'], vector_db=vector_db, embed_query_fn=emb, query='q', k=2)
+        assert len(res['results']) == 1
+    after = cache.stats()
+    assert after['misses'] - before['misses'] == 1
+    assert after['hits'] - before['hits'] == 2
+
+    (root / 'b.md').write_text('second file')
+    update_index(index_name='notes', root_path=str(root), vector_db=vector_db, embed_fn=emb, embedding_model='M')
+    res = search(indexes={}, names=['notes'], vector_db=vector_db, embed_query_fn=emb, query='q', k=5)
+    assert len(res['results']) == 2
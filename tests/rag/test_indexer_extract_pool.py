@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import rag.indexer as indexer
+from rag.indexer import update_index
+
+
+pytestmark = pytest.mark.skipif(
+    multiprocessing.get_start_method(allow_none=False) != 'fork',
+    reason='patched extractor is inherited by pool workers only with fork',
+)
+
+
+def _fake_extract(path):
+    name = os.path.basename(path)
+    if name.startswith('slow'):
+        time.sleep(5)
+    return f'extracted text of {name}\n' * 3, {'kind': 'pdf'}
+
+
+def _embed(texts):
+    return [[float(len(t)), 1.0] for t in texts]
+
+
+def test_pool_matches_serial_and_times_out_slow_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(indexer, 'extract_text_for_file', _fake_extract)
+    root = tmp_path / 'docs'
+    root.mkdir()
+    for i in range(6):
+        (root / f'doc{i}.pdf').write_bytes(b'%PDF fake ' + str(i).encode())
+
+    exts = {'.pdf'}
+    serial = update_index(index_name='serial', root_path=str(root), vector_db=str(tmp_path / 'db'),
+                          embed_fn=_embed, embedding_model='M', exts=exts,
+                          extract_workers=1)
+    assert serial['extract_timeouts'] == []
+
+    (root / 'slow.pdf').write_bytes(b'%PDF slow')
+
+    t0 = time.time()
+    pooled = update_index(index_name='pooled', root_path=str(root), vector_db=str(tmp_path / 'db'),
+                          embed_fn=_embed, embedding_model='M', exts=exts,
+                          extract_workers=3, extract_timeout=0.5)
+    assert time.time() - t0 < 4
+    assert [os.path.basename(p) for p in pooled['extract_timeouts']] == ['slow.pdf']
+    assert pooled['chunks'] == serial['chunks']
+
+    from rag.vector_store import NaiveStore
+    s_chunks = NaiveStore(str(tmp_path / 'db'), 'serial').read_chunks()
+    p_chunks = NaiveStore(str(tmp_path / 'db'), 'pooled').read_chunks()
+    assert [(os.path.basename(c['source_path']), c['hash']) for c in s_chunks] == \
+        [(os.path.basename(c['source_path']), c['hash']) for c in p_chunks]
+    # Preview cache written by the workers
+    assert all(os.path.exists(c['path']) for c in p_chunks)
+
+
+def _fake_load(path, root_path, index_extract_dir):
+    if os.path.basename(path).startswith('stuck'):
+        time.sleep(60)
+    return f'text of {path}', path
+
+
+def test_stuck_workers_are_killed_and_later_files_proceed(monkeypatch):
+    monkeypatch.setattr(indexer, '_load_file_text', _fake_load)
+    paths = ['stuck_a.pdf', 'stuck_b.pdf', 'f1.pdf', 'f2.pdf', 'f3.pdf']
+    pool = indexer._open_pool(2, len(paths), window=4)
+    t0 = time.time()
+    it = indexer._iter_extracted(paths, '/', '/', pool=pool, timeout=0.5)
+    time.sleep(1.0)  # a slow consumer does not extend the deadlines
+    out = list(it)
+    assert time.time() - t0 < 5
+    assert [p for p, _ in out] == paths
+    assert [r for _, r in out[:2]] == [None, None]
+    assert [r[0] for _, r in out[2:]] == ['text of f1.pdf', 'text of f2.pdf', 'text of f3.pdf']
+
+
+def test_timeout_applies_to_a_single_file_without_workers(tmp_path, monkeypatch):
+    # `rag watch` updates one saved file at a time; the default extract_workers is 1
+    monkeypatch.setattr(indexer, 'extract_text_for_file', _fake_extract)
+    root = tmp_path / 'docs'
+    root.mkdir()
+    (root / 'slow.pdf').write_bytes(b'%PDF slow')
+    assert indexer._open_pool(1, 1, window=2) is None
+
+    t0 = time.time()
+    stats = update_index(index_name='one', root_path=str(root), vector_db=str(tmp_path / 'db'),
+                         embed_fn=_embed, embedding_model='M', exts={'.pdf'},
+                         extract_workers=1, extract_timeout=0.5)
+    assert time.time() - t0 < 4
+    assert [os.path.basename(p) for p in stats['extract_timeouts']] == ['slow.pdf']
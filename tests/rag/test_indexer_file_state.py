@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import rag.indexer as indexer
+from rag.indexer import update_index
+from rag.vector_store import NaiveStore
+
+
+def _embed(texts):
+    return [[float(len(t)), 1.0, 0.0] for t in texts]
+
+
+def _run(root, vector_db):
+    return update_index(index_name='notes', root_path=str(root), vector_db=str(vector_db),
+                        embed_fn=_embed, embedding_model='M')
+
+
+def test_only_changed_files_are_read(tmp_path, monkeypatch):
+    root = tmp_path / 'docs'
+    root.mkdir()
+    for name in ('a.md', 'b.md', 'c.md'):
+        (root / name).write_text(f'contents of {name}')
+    vector_db = tmp_path / 'db'
+    first = _run(root, vector_db)
+    assert first['embedded'] == 3 and first['files_changed'] == 3
+    files = NaiveStore(str(vector_db), 'notes').read_files()
+    assert sorted(os.path.basename(f['path']) for f in files) == ['a.md', 'b.md', 'c.md']
+    assert all(f['rows'][1] - f['rows'][0] == 1 for f in files)
+
+    reads = []
+    real_read = indexer.read_text
+    monkeypatch.setattr(indexer, 'read_text', lambda p, *a, **k: reads.append(os.path.basename(p)) or real_read(p, *a, **k))
+
+    # No changes: nothing opened, nothing rewritten
+    again = _run(root, vector_db)
+    assert again['skipped'] is True and reads == []
+
+    # Edit one file: only that file is read and embedded
+    (root / 'b.md').write_text('new text for b')
+    edited = _run(root, vector_db)
+    assert reads == ['b.md']
+    assert edited['embedded'] == 1 and edited['files_changed'] == 1
+
+    # Touch without content change: content hash matches, no extraction
+    reads.clear()
+    st = os.stat(root / 'c.md')
+    os.utime(root / 'c.md', ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000))
+    touched = _run(root, vector_db)
+    assert reads == [] and touched['skipped'] is True and touched['embedded'] == 0
+
+
+def test_deleted_files_are_pruned(tmp_path):
+    root = tmp_path / 'docs'
+    root.mkdir()
+    (root / 'a.md').write_text('alpha')
+    (root / 'b.md').write_text('beta')
+    vector_db = tmp_path / 'db'
+    _run(root, vector_db)
+
+    (root / 'a.md').unlink()
+    stats = _run(root, vector_db)
+    assert stats['files_removed'] == 1 and stats['embedded'] == 0
+    store = NaiveStore(str(vector_db), 'notes')
+    chunks = store.read_chunks()
+    assert [os.path.basename(c['path']) for c in chunks] == ['b.md']
+    assert len(store.read_embeddings()) == 1
+    assert [os.path.basename(f['path']) for f in store.read_files()] == ['b.md']
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import rag.indexer as indexer
+from rag.indexer import update_index
+from rag.vector_store import NaiveStore
+
+
+def _embed(texts):
+    return [[float(len(t)), 1.0, float(t.count('x'))] for t in texts]
+
+
+def _make_docs(root, n):
+    root.mkdir()
+    for i in range(n):
+        (root / f'doc{i:02d}.md').write_text(f'document {i} ' + 'x' * i)
+
+
+def _run(root, vector_db, embed_fn, name='notes', **kw):
+    return update_index(index_name=name, root_path=str(root), vector_db=str(vector_db),
+                        embed_fn=embed_fn, embedding_model='M', batch_size=2, **kw)
+
+
+def test_interrupted_update_resumes_from_flushed_segments(tmp_path):
+    root = tmp_path / 'docs'
+    _make_docs(root, 7)
+    vector_db = tmp_path / 'db'
+
+    calls = []
+
+    def flaky(texts):
+        calls.append(len(texts))
+        if len(calls) == 3:
+            raise RuntimeError('rate limited')
+        return _embed(texts)
+
+    with pytest.raises(RuntimeError):
+        _run(root, vector_db, flaky)
+    store = NaiveStore(str(vector_db), 'notes')
+    assert not store.exists()
+    staging = os.path.join(store.index_dir, 'staging')
+    assert len([n for n in os.listdir(staging) if n.endswith('.npy')]) == 2
+
+    resumed = _run(root, vector_db, _embed)
+    assert resumed['resumed'] == 4 and resumed['embedded'] == 3
+    assert not os.path.exists(staging)
+
+    clean = _run(root, vector_db, _embed, name='clean')
+    a = NaiveStore(str(vector_db), 'notes')
+    b = NaiveStore(str(vector_db), 'clean')
+    assert [c['hash'] for c in a.read_chunks()] == [c['hash'] for c in b.read_chunks()]
+    assert np.allclose(a.read_embeddings(), b.read_embeddings())
+    assert clean['resumed'] == 0
+
+
+def test_staged_segments_from_other_signature_are_discarded(tmp_path):
+    root = tmp_path / 'docs'
+    _make_docs(root, 3)
+    vector_db = tmp_path / 'db'
+
+    def failing(texts):
+        if len(texts) == 1:
+            raise RuntimeError('boom')
+        return _embed(texts)
+
+    with pytest.raises(RuntimeError):
+        _run(root, vector_db, failing)
+    stats = update_index(index_name='notes', root_path=str(root), vector_db=str(vector_db),
+                         embed_fn=_embed, embedding_model='other', batch_size=2)
+    assert stats['resumed'] == 0 and stats['embedded'] == 3
+
+
+def test_embedding_overlaps_reading(tmp_path, monkeypatch):
+    root = tmp_path / 'docs'
+    _make_docs(root, 12)
+    reads = []
+    real_read = indexer.read_text
+    monkeypatch.setattr(indexer, 'read_text', lambda p, *a, **k: reads.append(p) or real_read(p, *a, **k))
+    seen_at_first_embed = []
+
+    def embed(texts):
+        if not seen_at_first_embed:
+            seen_at_first_embed.append(len(reads))
+        return _embed(texts)
+
+    update_index(index_name='notes', root_path=str(root), vector_db=str(tmp_path / 'db'),
+                 embed_fn=embed, embedding_model='M', batch_size=1)
+    # The reader can only run ahead by the queue depth (plus the batch in hand)
+    assert seen_at_first_embed[0] <= indexer._QUEUE_DEPTH + 2
+    assert len(reads) == 12
@@ -65,3 +65,24 @@ def test_update_index_reuse_and_reembed(tmp_path):
     assert man2 and man2.get('embedding_signature') == sig2
     assert man2.get('vector_dim') == 3  # dim persists with same embedder output shape
 
+
+
+def test_removal_only_update_is_not_skipped(tmp_path):
+    root = tmp_path / 'docs'
+    root.mkdir()
+    (root / 'a.md').write_text('alpha file\nfirst')
+    (root / 'b.md').write_text('beta file\nsecond')
+    vector_db = tmp_path / 'db'
+
+    def embed(texts):
+        return [[1.0, 0.0] for _ in texts]
+
+    kwargs = dict(index_name='notes', root_path=str(root), vector_db=str(vector_db), embed_fn=embed,
+                  embedding_model='M', embedding_signature={'provider': 'P', 'embedding_model': 'M'})
+    first = update_index(**kwargs)
+    (root / 'a.md').unlink()
+    stats = update_index(**kwargs)
+    assert stats['files_removed'] == 1 and stats['embedded'] == 0
+    assert stats['skipped'] is False
+    assert stats['chunks'] < first['chunks']
+    assert update_index(**kwargs)['skipped'] is True
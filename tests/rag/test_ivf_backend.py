@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from rag.indexer import update_index
+from rag.ivf import IVFIndex
+from rag.scoring import normalize_rows
+from rag.search import search
+from rag.vector_store import NaiveStore
+
+
+def _embed(texts):
+    out = []
+    for t in texts:
+        seed = int(hashlib.sha1(t.encode('utf-8')).hexdigest()[:8], 16)
+        out.append(np.random.default_rng(seed).normal(size=16).tolist())
+    return out
+
+
+def test_ivf_candidates_cover_all_rows_with_full_probe():
+    rng = np.random.default_rng(0)
+    m = normalize_rows(rng.normal(size=(500, 8)))
+    ivf = IVFIndex.build(m, nlist=10)
+    assert ivf.offsets[-1] == 500
+    assert sorted(ivf.lists.tolist()) == list(range(500))
+    q = normalize_rows(rng.normal(size=(1, 8)))[0]
+    assert ivf.candidates(q, nprobe=10).tolist() == list(range(500))
+    assert len(ivf.candidates(q, nprobe=2)) < 500
+
+
+def test_update_index_builds_ivf_and_search_uses_it(tmp_path):
+    root = tmp_path / 'docs'
+    root.mkdir()
+    for i in range(120):
+        (root / f'f{i:03d}.md').write_text(f'document number {i}')
+    vector_db = str(tmp_path / 'db')
+
+    update_index(index_name='big', root_path=str(root), vector_db=vector_db, embed_fn=_embed,
+                 embedding_model='M', backend='ivf', ann_options={'nlist': 8, 'min_chunks': 50})
+    store = NaiveStore(vector_db, 'big')
+    man = store.read_manifest()
+    assert man['backend'] == 'ivf' and man['ann']['nlist'] == 8
+    assert os.path.exists(os.path.join(store.index_dir, 'ivf_centroids.npy'))
+
+    q = 'document number 7'
+    exact = search(indexes={}, names=['big'], vector_db=vector_db, embed_query_fn=_embed, query=q, k=5,
+                   ann_options={'big': {'exact': True}})
+    full = search(indexes={}, names=['big'], vector_db=vector_db, embed_query_fn=_embed, query=q, k=5,
+                  ann_options={'big': {'nprobe': 8}})
+    approx = search(indexes={}, names=['big'], vector_db=vector_db, embed_query_fn=_embed, query=q, k=5,
+                    ann_options={'big': {'nprobe': 2}})
+    assert exact['stats']['indices'][0]['backend'] == 'exact'
+    assert approx['stats']['indices'][0]['backend'] == 'ivf'
+    assert approx['stats']['indices'][0]['scanned'] < 120
+    # Probing every list is exact; the query's own chunk is always found
+    assert [r['path'] for r in full['results']] == [r['path'] for r in exact['results']]
+    assert approx['results'][0]['path'].endswith('f007.md')
+
+    # Switching back to naive rebuilds without re-embedding and drops the lists
+    stats = update_index(index_name='big', root_path=str(root), vector_db=vector_db, embed_fn=_embed,
+                         embedding_model='M', backend='naive')
+    assert stats['embedded'] == 0
+    assert store.read_manifest()['backend'] == 'naive'
+    assert not os.path.exists(os.path.join(store.index_dir, 'ivf_centroids.npy'))
+
+
+def test_small_index_stays_exact(tmp_path):
+    root = tmp_path / 'docs'
+    root.mkdir()
+    (root / 'a.md').write_text('tiny')
+    vector_db = str(tmp_path / 'db')
+    update_index(index_name='small', root_path=str(root), vector_db=vector_db, embed_fn=_embed,
+                 embedding_model='M', backend='ivf')
+    assert NaiveStore(vector_db, 'small').read_manifest()['backend'] == 'naive'
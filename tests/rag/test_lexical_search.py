@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from rag.indexer import update_index
+from rag.lexical import BM25Index, tokenize
+from rag.search import search, _fuse_rrf
+from rag.vector_store import NaiveStore
+
+
+def _embed(texts):
+    return [[1.0, float(len(t) % 7), 0.5] for t in texts]
+
+
+def _build(root, db, name='notes'):
+    return update_index(index_name=name, root_path=str(root), vector_db=str(db),
+                        embed_fn=_embed, embedding_model='M')
+
+
+def _lexical(db, query, names=('notes',), **kw):
+    return search(indexes={n: '' for n in names}, names=list(names), vector_db=str(db),
+                  embed_query_fn=None, query=query, mode='lexical', **kw)
+
+
+def _docs(root):
+    root.mkdir()
+    (root / 'net.md').write_text('connection failed with ERR_CONN_RESET while fetching\n')
+    (root / 'db.md').write_text('database migration ran; the connection pool was resized\n')
+    (root / 'misc.md').write_text('unrelated notes about gardening and tomatoes\n')
+
+
+def test_lexical_search_answers_without_embedding(tmp_path):
+    root = tmp_path / 'docs'
+    _docs(root)
+    db = tmp_path / 'db'
+    _build(root, db)
+    man = NaiveStore(str(db), 'notes').read_manifest()
+    assert man['lexical']['type'] == 'bm25' and man['lexical']['terms'] > 0
+
+    res = _lexical(db, 'err_conn_reset')
+    assert [os.path.basename(r['path']) for r in res['results']] == ['net.md']
+    assert res['stats']['mode'] == 'lexical' and res['stats']['indices'][0]['lexical'] is True
+
+    # Both documents mention "connection"; gardening never matches
+    names = [os.path.basename(r['path']) for r in _lexical(db, 'connection')['results']]
+    assert sorted(names) == ['db.md', 'net.md']
+
+
+def test_incremental_update_matches_fresh_build(tmp_path):
+    root = tmp_path / 'docs'
+    _docs(root)
+    db = tmp_path / 'db'
+    _build(root, db)
+    (root / 'db.md').write_text('schema changes for tomatoes table\n')
+    (root / 'misc.md').unlink()
+    (root / 'new.md').write_text('ERR_CONN_RESET again, connection retried\n')
+    _build(root, db)
+    _build(root, db, name='fresh')
+
+    a = BM25Index.load(NaiveStore(str(db), 'notes').index_dir)
+    b = BM25Index.load(NaiveStore(str(db), 'fresh').index_dir)
+    assert sorted(a.terms) == sorted(b.terms)
+    chunks_a = [c['hash'] for c in NaiveStore(str(db), 'notes').read_chunks()]
+    chunks_b = [c['hash'] for c in NaiveStore(str(db), 'fresh').read_chunks()]
+    assert chunks_a == chunks_b
+    for q in ('connection', 'tomatoes', 'err_conn_reset gardening'):
+        assert np.allclose(a.scores(q), b.scores(q))
+
+
+def test_index_without_lexical_is_backfilled(tmp_path):
+    root = tmp_path / 'docs'
+    _docs(root)
+    db = tmp_path / 'db'
+    _build(root, db)
+    store = NaiveStore(str(db), 'notes')
+    man = store.read_manifest()
+    man.pop('lexical')
+    store._write_manifest(man)
+    BM25Index.remove(store.index_dir)
+
+    stats = _build(root, db)
+    assert stats['embedded'] == 0
+    assert [os.path.basename(r['path']) for r in _lexical(db, 'tomatoes')['results']] == ['misc.md']
+
+
+def test_hybrid_fuses_vector_and_lexical_rankings(tmp_path):
+    root = tmp_path / 'docs'
+    _docs(root)
+    db = tmp_path / 'db'
+    _build(root, db)
+    res = search(indexes={'notes': ''}, names=['notes'], vector_db=str(db), embed_query_fn=_embed,
+                 query='ERR_CONN_RESET', mode='hybrid', k=3)
+    assert os.path.basename(res['results'][0]['path']) == 'net.md'
+    assert len(res['results']) == 3
+
+    with pytest.raises(ValueError):
+        search(indexes={}, names=[], vector_db=str(db), embed_query_fn=None, query='x', mode='fuzzy')
+
+
+def test_fuse_rrf_orders_by_reciprocal_rank_and_caps():
+    vec = [(0, 1, 0.9), (0, 2, 0.8), (1, 5, 0.7)]
+    lex = [(1, 5, 12.0), (0, 1, 3.0)]
+    fused = _fuse_rrf([vec, lex], 3, rrf_k=60)
+    assert [(s, r) for s, r, _ in fused] == [(0, 1), (1, 5), (0, 2)]
+    assert fused[0][2] == pytest.approx(1 / 61 + 1 / 62)
+    capped = _fuse_rrf([vec, lex], 3, rrf_k=60, cap=1)
+    assert [(s, r) for s, r, _ in capped] == [(0, 1), (1, 5)]
+
+
+def test_tokenize_keeps_identifiers_whole():
+    assert tokenize('Call foo_bar(x) -> ERR_42; naïve') == ['call', 'foo_bar', 'x', 'err_42', 'naïve']
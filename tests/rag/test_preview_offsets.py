@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import os
+import random
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import rag.search as search_mod
+from rag.indexer import update_index
+from rag.search import _char_to_line_range, _chunk_lines
+from rag.vector_store import NaiveStore
+
+
+def _embed(texts):
+    return [[float(len(t)), 1.0] for t in texts]
+
+
+def _random_text(rng, n_lines):
+    words = ['alpha', 'beta', 'γάμμα', 'delta', 'naïve', '日本語', 'x' * 40, '']
+    lines = [' '.join(rng.choice(words) for _ in range(rng.randint(0, 30))) for _ in range(n_lines)]
+    return '\n'.join(lines) + ('\n' if rng.random() < 0.5 else '')
+
+
+def _index(tmp_path, files):
+    root = tmp_path / 'docs'
+    root.mkdir()
+    for name, text in files.items():
+        (root / name).write_bytes(text.encode('utf-8'))
+    update_index(index_name='notes', root_path=str(root), vector_db=str(tmp_path / 'db'),
+                 embed_fn=_embed, embedding_model='M')
+    return list(NaiveStore(str(tmp_path / 'db'), 'notes').read_chunks())
+
+
+def test_seek_previews_match_full_scan(tmp_path, monkeypatch):
+    rng = random.Random(7)
+    files = {f'f{i}.md': _random_text(rng, rng.randint(1, 400)) for i in range(6)}
+    files['one_line.md'] = 'no newline at all'
+    files['blank_lines.md'] = '\n\n\nabc\n\n'
+    chunks = _index(tmp_path, files)
+    assert chunks and all('lines' in c and 'bytes' in c for c in chunks)
+
+    expected = {(id(c), p): _char_to_line_range(c['path'], c['start'], c['end'], p)
+                for c in chunks for p in (0, 1, 3, 9)}
+
+    def _no_scan(*a, **k):
+        raise AssertionError('full scan used')
+
+    monkeypatch.setattr(search_mod, '_char_to_line_range', _no_scan)
+    for c in chunks:
+        for p in (0, 1, 3, 9):
+            assert _chunk_lines(c, p) == expected[(id(c), p)]
+
+
+def test_crlf_files_fall_back_to_scanning(tmp_path):
+    chunks = _index(tmp_path, {'win.md': 'first\r\nsecond\r\nthird\r\n'})
+    assert chunks[0]['lines'] == [1, 4] and 'bytes' not in chunks[0]
+    assert _chunk_lines(chunks[0], 1) == _char_to_line_range(chunks[0]['path'], chunks[0]['start'], chunks[0]['end'], 1)
+
+
+def test_chunks_without_positions_use_legacy_scan(tmp_path):
+    path = tmp_path / 'a.md'
+    path.write_text('one\ntwo\nthree\n')
+    legacy = {'path': str(path), 'start': 4, 'end': 7, 'hash': 'h'}
+    assert _chunk_lines(legacy, 1) == (2, 2, ['one', 'two', 'three'])
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from rag.indexer import update_index
+from rag.quantize import QuantizedCodes, encode_int8, fit_int8, measure_recall
+from rag.scoring import normalize_rows
+from rag.search import search
+from rag.vector_store import NaiveStore
+
+
+def _embed(texts):
+    out = []
+    for t in texts:
+        seed = int(hashlib.sha1(t.encode('utf-8')).hexdigest()[:8], 16)
+        out.append(np.random.default_rng(seed).normal(size=32).tolist())
+    return out
+
+
+def test_codes_approximate_scores_and_shortlist(tmp_path):
+    rng = np.random.default_rng(0)
+    # Clustered, like real embeddings (isotropic noise has no meaningful neighbours)
+    centers = rng.normal(size=(40, 96))
+    m = normalize_rows(centers[rng.integers(0, 40, 2000)] + 0.5 * rng.normal(size=(2000, 96)))
+    params = fit_int8(m)
+    deq = params[0] + params[1] * (encode_int8(m, params).astype(np.float32) + 128)
+    assert np.abs(deq - m).max() <= params[1].max() / 2 + 1e-6
+
+    store = NaiveStore(str(tmp_path), 'q')
+    for kinds in (('int8',), ('binary',), ('binary', 'int8')):
+        codes = QuantizedCodes.build(store, m, kinds)
+        assert codes.kinds == kinds and codes.count == 2000
+        q = m[17]
+        short = codes.shortlist(q, 50)
+        assert len(short) == 50 and 17 in short.tolist()
+        assert codes.shortlist(q, 5000).tolist() == list(range(2000))
+        # Restricting to a subset never returns rows outside it
+        subset = np.arange(0, 2000, 3)
+        assert set(codes.shortlist(q, 40, subset).tolist()) <= set(subset.tolist())
+        assert measure_recall(m, codes, rescore=100) >= 0.9
+    store.remove_codes()
+    assert QuantizedCodes.load(store.index_dir) is None
+
+
+def test_quantized_index_rescoring_matches_exact(tmp_path):
+    root = tmp_path / 'docs'
+    root.mkdir()
+    for i in range(300):
+        (root / f'f{i:03d}.md').write_text(f'document number {i}')
+    vector_db = str(tmp_path / 'db')
+    update_index(index_name='big', root_path=str(root), vector_db=vector_db, embed_fn=_embed,
+                 embedding_model='M', quantization='int8,binary', ann_options={'rescore': 40})
+    store = NaiveStore(vector_db, 'big')
+    quant = store.read_manifest()['quantization']
+    assert quant['kinds'] == ['binary', 'int8'] and quant['rescore'] == 40
+    assert 0.0 <= quant['recall'] <= 1.0
+    assert os.path.exists(store.codes_path('int8')) and os.path.exists(store.codes_path('binary'))
+
+    q = 'document number 123'
+    exact = search(indexes={}, names=['big'], vector_db=vector_db, embed_query_fn=_embed, query=q, k=5,
+                   ann_options={'big': {'exact': True}})
+    approx = search(indexes={}, names=['big'], vector_db=vector_db, embed_query_fn=_embed, query=q, k=5,
+                    ann_options={'big': {'rescore': 40}})
+    st = approx['stats']['indices'][0]
+    assert st['quantized'] == 'binary+int8' and st['rescored'] == 40
+    assert 'quantized' not in exact['stats']['indices'][0]
+    # Scores are exact cosine values for whatever the shortlist kept
+    assert approx['results'][0] == exact['results'][0]
+    assert approx['results'][0]['path'].endswith('f123.md')
+
+    # Same settings: nothing to do; dropping quantization rebuilds without re-embedding
+    assert update_index(index_name='big', root_path=str(root), vector_db=vector_db, embed_fn=_embed,
+                        embedding_model='M', quantization='int8,binary',
+                        ann_options={'rescore': 40})['skipped']
+    stats = update_index(index_name='big', root_path=str(root), vector_db=vector_db, embed_fn=_embed,
+                         embedding_model='M')
+    assert stats['embedded'] == 0
+    assert 'quantization' not in store.read_manifest()
+    assert not os.path.exists(store.codes_path('int8'))
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from rag.query_cache import QueryEmbeddingCache, get_query_cache, normalize_query
+
+
+class _Embed:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0, 0.5] for t in texts]
+
+
+def test_repeated_queries_skip_the_embedder(tmp_path):
+    cache = QueryEmbeddingCache.for_vector_db(str(tmp_path))
+    embed = _Embed()
+    fn = cache.wrap(embed, 'OpenAI', 'small')
+    first = fn(['alpha', 'beta'])
+    again = fn([' alpha\n', 'gamma', 'beta'])
+    assert embed.calls == [['alpha', 'beta'], ['gamma']]
+    assert np.allclose(again[0], first[0]) and np.allclose(again[2], first[1])
+    assert (fn.hits, fn.misses) == (2, 3)
+
+    # Persistent across instances; provider and model are part of the key
+    cache.close()
+    reopened = QueryEmbeddingCache.for_vector_db(str(tmp_path))
+    fn2 = reopened.wrap(embed, 'OpenAI', 'small')
+    fn2(['gamma'])
+    reopened.wrap(embed, 'OpenAI', 'large')(['gamma'])
+    assert embed.calls[2:] == [['gamma']]
+    assert fn2.event()['hit_rate'] == 0.5
+
+
+def test_ttl_and_lru_eviction(tmp_path, monkeypatch):
+    import rag.query_cache as qc
+    now = [1000.0]
+    monkeypatch.setattr(qc.time, 'time', lambda: now[0])
+    cache = QueryEmbeddingCache(str(tmp_path / 'q.sqlite'), max_entries=2, ttl=60)
+    embed = _Embed()
+    fn = cache.wrap(embed, 'p', 'm')
+    fn(['a'])
+    now[0] += 1
+    fn(['b'])
+    now[0] += 1
+    fn(['a'])          # refreshes 'a'
+    now[0] += 1
+    fn(['c'])          # evicts 'b', the least recently used
+    assert cache.stats()['entries'] == 2
+    fn(['b', 'a'])
+    assert embed.calls == [['a'], ['b'], ['c'], ['b']]
+
+    now[0] += 120      # everything expired
+    fn(['a'])
+    assert embed.calls[-1] == ['a']
+
+
+def test_normalization_and_disabled_cache(tmp_path):
+    assert normalize_query('  find\tthe  Config\n') == 'find the Config'
+    assert get_query_cache(str(tmp_path), 0) is None
+    assert get_query_cache(str(tmp_path)) is get_query_cache(str(tmp_path / '.'))
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from rag.filters import build_filters, filter_rows, parse_modified_after
+from rag.indexer import update_index
+from rag.search import search
+from rag.vector_store import NaiveStore
+
+
+def _embed(texts):
+    out = []
+    for t in texts:
+        seed = int(hashlib.sha1(t.encode('utf-8')).hexdigest()[:8], 16)
+        out.append(np.random.default_rng(seed).normal(size=16).tolist())
+    return out
+
+
+def _build(tmp_path, **kw):
+    root = tmp_path / 'docs'
+    for sub in ('api', 'guide', 'api/v2'):
+        (root / sub).mkdir(parents=True)
+    for i in range(40):
+        sub = ('api', 'guide', 'api/v2')[i % 3]
+        ext = '.md' if i % 2 else '.txt'
+        (root / sub / f'f{i:02d}{ext}').write_text(f'topic {i} shared words')
+    old = datetime(2020, 1, 1).timestamp()
+    for p in (root / 'guide').iterdir():
+        os.utime(p, (old, old))
+    vector_db = str(tmp_path / 'db')
+    update_index(index_name='notes', root_path=str(root), vector_db=vector_db, embed_fn=_embed,
+                 embedding_model='M', exts={'.md', '.txt'}, **kw)
+    return vector_db
+
+
+def test_build_filters_normalizes_and_validates():
+    assert build_filters() is None
+    f = build_filters(include='docs/**, src/*', exts=['MD', '.py'], modified_after='2024-01-02')
+    assert f['include'] == ['docs/**', 'src/*'] and f['exts'] == ['.md', '.py']
+    assert f['modified_after'] == datetime(2024, 1, 2).timestamp()
+    assert parse_modified_after('2d', now=1_000_000.0) == 1_000_000.0 - 2 * 86400
+    with pytest.raises(ValueError):
+        build_filters(modified_after='last tuesday')
+
+
+@pytest.mark.parametrize('mode', ['vector', 'lexical', 'hybrid'])
+def test_filters_restrict_rows_before_scoring(tmp_path, mode):
+    vector_db = _build(tmp_path)
+    kw = dict(indexes={}, names=['notes'], vector_db=vector_db, embed_query_fn=_embed,
+              query='topic 5 shared words', k=50, mode=mode)
+
+    res = search(filters=build_filters(include='api/**', exts='md'), **kw)
+    st = res['stats']['indices'][0]
+    paths = [r['path'] for r in res['results']]
+    assert paths and all('/api/' in p and p.endswith('.md') for p in paths)
+    assert st['filtered'] == len(set(paths)) < st['loaded']
+    if mode != 'lexical':
+        assert st['scanned'] == st['filtered']
+
+    res = search(filters=build_filters(exclude='api/v2/**', modified_after='2021-01-01'), **kw)
+    paths = [r['path'] for r in res['results']]
+    assert paths and all('/api/' in p and '/v2/' not in p for p in paths)
+
+    res = search(filters=build_filters(include='nothing/**'), **kw)
+    assert res['results'] == [] and res['stats']['indices'][0]['reason'] == 'filtered'
+
+
+def test_filters_compose_with_ivf_and_quantized(tmp_path):
+    vector_db = _build(tmp_path, backend='ivf', quantization='int8', ann_options={'nlist': 4, 'min_chunks': 10})
+    chunks = NaiveStore(vector_db, 'notes').read_chunks()
+    rows = filter_rows(chunks, build_filters(include='api/**'), root=str(tmp_path / 'docs'))
+    assert 0 < len(rows) < len(chunks)
+
+    filters = build_filters(include='guide/*')
+    for ann in ({'nprobe': 4, 'rescore': 1}, {'exact': True}):
+        res = search(indexes={}, names=['notes'], vector_db=vector_db, embed_query_fn=_embed,
+                     query='topic 7', k=20, ann_options={'notes': ann}, filters=filters)
+        assert res['results'] and all('/guide/' in r['path'] for r in res['results'])
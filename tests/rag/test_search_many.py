@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from rag.indexer import update_index
+from rag.search import search, search_many
+
+
+class _Embed:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        out = []
+        for t in texts:
+            seed = int(hashlib.sha1(t.encode('utf-8')).hexdigest()[:8], 16)
+            out.append(np.random.default_rng(seed).normal(size=16).tolist())
+        return out
+
+
+def _build(tmp_path, name, **kw):
+    root = tmp_path / name
+    root.mkdir()
+    for i in range(150):
+        (root / f'f{i:03d}.md').write_text(f'document number {i} in {name}')
+    update_index(index_name=name, root_path=str(root), vector_db=str(tmp_path / 'db'), embed_fn=_Embed(),
+                 embedding_model='M', **kw)
+
+
+def test_search_many_matches_individual_searches(tmp_path):
+    _build(tmp_path, 'plain')
+    _build(tmp_path, 'ivf', backend='ivf', ann_options={'nlist': 6, 'min_chunks': 50})
+    _build(tmp_path, 'quant', quantization='int8,binary', ann_options={'rescore': 20})
+    vector_db = str(tmp_path / 'db')
+    names = ['plain', 'ivf', 'quant']
+    queries = ['document number 7 in plain', 'document number 42 in ivf', 'number 99 in quant']
+    ann = {'ivf': {'nprobe': 2}, 'quant': {'rescore': 20}}
+
+    for mode in ('vector', 'lexical', 'hybrid'):
+        embed = _Embed()
+        many = search_many(indexes={}, names=names, vector_db=vector_db, embed_query_fn=embed, queries=queries,
+                           k=5, preview_lines=1, per_index_cap=3, ann_options=ann, mode=mode)
+        # One embedding call for the whole batch (none for lexical)
+        assert embed.calls == ([] if mode == 'lexical' else [queries])
+        assert many['queries'] == queries and len(many['results']) == 3
+        for q, got in zip(queries, many['results']):
+            one = search(indexes={}, names=names, vector_db=vector_db, embed_query_fn=_Embed(), query=q,
+                         k=5, preview_lines=1, per_index_cap=3, ann_options=ann, mode=mode)
+            assert got == one['results']
+            assert got
+
+
+def test_search_many_handles_empty_inputs(tmp_path):
+    embed = _Embed()
+    res = search_many(indexes={}, names=['missing'], vector_db=str(tmp_path), embed_query_fn=embed, queries=['a', 'b'])
+    assert res['results'] == [[], []] and embed.calls == []
+    _build(tmp_path, 'plain')
+    res = search_many(indexes={}, names=['plain'], vector_db=str(tmp_path / 'db'), embed_query_fn=embed, queries=[])
+    assert res['results'] == [] and embed.calls == []
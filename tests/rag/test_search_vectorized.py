@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import math
+import os
+import random
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from rag.search import search
+from rag.vector_store import NaiveStore
+
+
+def _reference(items, q, k, per_index_cap=None, threshold=None):
+    """Scalar reference: normalize, score, stable full sort, cap, slice."""
+    def norm(v):
+        s = math.sqrt(sum(x * x for x in v)) or 1.0
+        return [x / s for x in v]
+    qn = norm(q)
+    scored = [(sum(a * b for a, b in zip(qn, norm(vec))), name, i) for name, i, vec in items]
+    scored.sort(key=lambda x: x[0], reverse=True)
+    if per_index_cap:
+        counts = {}
+        capped = []
+        for s, name, i in scored:
+            if counts.get(name, 0) < per_index_cap:
+                capped.append((s, name, i))
+                counts[name] = counts.get(name, 0) + 1
+        scored = capped
+    if threshold:
+        scored = [x for x in scored if x[0] >= threshold]
+    return [(name, i) for _, name, i in scored[:k]]
+
+
+def _build(tmp_path, name, vecs, src):
+    store = NaiveStore(str(tmp_path / 'db'), name)
+    chunks = [{'path': str(src), 'start': 0, 'end': 1, 'hash': f'{name}{i}'} for i in range(len(vecs))]
+    # Tag each chunk with its row so results can be mapped back
+    for i, ch in enumerate(chunks):
+        ch['start'] = i
+        ch['end'] = i
+    store.write(manifest={'name': name}, chunks=chunks, embeddings=vecs)
+
+
+def test_vectorized_search_matches_scalar_reference(tmp_path, monkeypatch):
+    rng = random.Random(7)
+    src = tmp_path / 'src.md'
+    src.write_text('x')
+    data = {
+        'a': [[rng.uniform(-1, 1) for _ in range(8)] for _ in range(40)],
+        'b': [[rng.uniform(-1, 1) for _ in range(8)] for _ in range(25)],
+    }
+    for name, vecs in data.items():
+        _build(tmp_path, name, vecs, src)
+    q = [rng.uniform(-1, 1) for _ in range(8)]
+    items = [(name, i, v) for name, vecs in data.items() for i, v in enumerate(vecs)]
+
+    # Record which chunk each hit came from via its start offset
+    import rag.search as rs
+    monkeypatch.setattr(rs, '_char_to_line_range', lambda path, start, end, n: (start, end, []))
+
+    for cap, thr in [(None, None), (3, None), (None, 0.2), (2, 0.1)]:
+        res = search(indexes={}, names=['a', 'b'], vector_db=str(tmp_path / 'db'),
+                     embed_query_fn=lambda batch: [q], query='q', k=10,
+                     per_index_cap=cap, threshold=thr)
+        got = [(r['index'], r['line_start']) for r in res['results']]
+        assert got == _reference(items, q, 10, per_index_cap=cap, threshold=thr)
+        assert res['stats']['total_items'] == 65
+
+
+def test_ties_keep_index_order(tmp_path):
+    src = tmp_path / 'src.md'
+    src.write_text('x')
+    _build(tmp_path, 'a', [[1.0, 0.0]] * 3, src)
+    _build(tmp_path, 'b', [[1.0, 0.0]] * 3, src)
+    res = search(indexes={}, names=['b', 'a'], vector_db=str(tmp_path / 'db'),
+                 embed_query_fn=lambda batch: [[2.0, 0.0]], query='q', k=4)
+    assert [r['index'] for r in res['results']] == ['b', 'b', 'b', 'a']
+    assert all(r['score'] == 1.0 for r in res['results'])
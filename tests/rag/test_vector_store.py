@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from rag.vector_store import NaiveStore
+from rag.search import _load_index
+
+
+def test_write_stores_float32_matrix_and_records_manifest(tmp_path):
+    store = NaiveStore(str(tmp_path), 'notes')
+    chunks = [{'path': 'a.md', 'start': 0, 'end': 3, 'hash': 'h1'}, {'path': 'a.md', 'start': 3, 'end': 6, 'hash': 'h2'}]
+    store.write(manifest={'name': 'notes'}, chunks=chunks, embeddings=[[1.0, 0.0, 0.0], [0.0, 2.0, 0.0]])
+
+    assert os.path.exists(store.embeddings_path)
+    assert not os.path.exists(store.legacy_embeddings_path)
+    man = store.read_manifest()
+    assert man['vectors'] == {'format': 'npy', 'dtype': 'float32', 'file': 'embeddings.npy', 'count': 2, 'dim': 3, 'normalized': True}
+
+    embs = store.read_embeddings()
+    assert isinstance(embs, np.memmap)
+    assert embs.dtype == np.float32 and embs.shape == (2, 3)
+    # Rows are stored L2-normalized
+    assert embs[1, 1] == 1.0
+
+
+def test_legacy_json_embeddings_are_migrated_once(tmp_path):
+    store = NaiveStore(str(tmp_path), 'notes')
+    store.ensure_dirs()
+    with open(store.manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({'name': 'notes', 'vector_dim': 2}, f)
+    with open(store.legacy_chunks_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'path': 'a.md', 'start': 0, 'end': 1, 'hash': 'h'}) + "\n")
+    with open(store.legacy_embeddings_path, 'w', encoding='utf-8') as f:
+        json.dump([[0.5, 0.25]], f)
+    assert store.exists()
+
+    chunks, embs = _load_index(store.index_dir)
+    assert len(chunks) == 1
+    assert embs.shape == (1, 2) and embs.dtype == np.float32
+    assert os.path.exists(store.embeddings_path)
+    assert not os.path.exists(store.legacy_embeddings_path)
+    assert store.read_manifest()['vectors']['count'] == 1
+
+
+def test_unreadable_legacy_embeddings_are_kept(tmp_path):
+    store = NaiveStore(str(tmp_path), 'notes')
+    store.ensure_dirs()
+    with open(store.legacy_embeddings_path, 'w', encoding='utf-8') as f:
+        f.write('[[0.5, 0.25], [0.1')  # truncated
+    assert store.migrate_legacy() is False
+    assert store.read_embeddings().shape[0] == 0
+    assert os.path.exists(store.legacy_embeddings_path)
+    assert not os.path.exists(store.embeddings_path)
+
+
+def test_read_embeddings_missing_returns_empty(tmp_path):
+    store = NaiveStore(str(tmp_path), 'missing')
+    embs = store.read_embeddings()
+    assert embs.shape == (0, 0)
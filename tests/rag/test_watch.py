@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from rag.cache import IndexCache
+from rag.indexer import update_index
+from rag.vector_store import NaiveStore
+from rag.watch import InotifyWatcher, PollingWatcher, watch
+
+
+class _Embed:
+    def __init__(self):
+        self.texts = []
+
+    def __call__(self, texts):
+        self.texts.extend(texts)
+        out = []
+        for t in texts:
+            seed = int(hashlib.sha1(t.encode('utf-8')).hexdigest()[:8], 16)
+            out.append(np.random.default_rng(seed).normal(size=8).tolist())
+        return out
+
+
+def _by_path(store):
+    out = {}
+    for c in store.read_chunks():
+        out.setdefault(c['path'], []).append(c['hash'])
+    return out
+
+
+def test_changed_paths_update_matches_full_update(tmp_path):
+    root = tmp_path / 'docs'
+    (root / 'sub').mkdir(parents=True)
+    for i in range(6):
+        (root / f'f{i}.md').write_text(f'file {i}')
+    (root / 'sub' / 'old.md').write_text('old tree')
+    db = str(tmp_path / 'db')
+    update_index(index_name='w', root_path=str(root), vector_db=db, embed_fn=_Embed(), embedding_model='M')
+    gen0 = NaiveStore(db, 'w').read_generation()
+
+    (root / 'f1.md').write_text('file 1 edited')
+    (root / 'f2.md').unlink()
+    (root / 'f9.md').write_text('brand new')
+    (root / 'sub' / 'old.md').unlink()
+    (root / 'sub').rmdir()
+    (root / 'moved').mkdir()
+    (root / 'moved' / 'in.md').write_text('moved in')
+    (root / 'skip.bin').write_text('not indexed')
+    changed = [root / 'f1.md', root / 'f2.md', root / 'f9.md', root / 'sub', root / 'moved', root / 'skip.bin']
+
+    embed = _Embed()
+    stats = update_index(index_name='w', root_path=str(root), vector_db=db, embed_fn=embed, embedding_model='M',
+                         changed_paths=[str(p) for p in changed])
+    assert sorted(embed.texts) == ['brand new', 'file 1 edited', 'moved in']
+    assert stats['files_changed'] == 3 and stats['files_removed'] == 2
+
+    update_index(index_name='full', root_path=str(root), vector_db=db, embed_fn=_Embed(), embedding_model='M')
+    watched, full = NaiveStore(db, 'w'), NaiveStore(db, 'full')
+    assert _by_path(watched) == _by_path(full)
+    assert watched.read_generation() == gen0 + 2 == watched.read_manifest()['generation']
+
+
+def test_watch_debounces_bursts(tmp_path):
+    class FakeWatcher:
+        def __init__(self, script):
+            self.script = list(script)
+
+        def poll(self, timeout):
+            time.sleep(min(timeout, 0.01))
+            return self.script.pop(0) if self.script else set()
+
+        def close(self):
+            pass
+
+    a, b = str(tmp_path / 'a'), str(tmp_path / 'b')
+    os.makedirs(a)
+    os.makedirs(b)
+    burst = [{os.path.join(a, 'x.md')}, {os.path.join(a, 'y.md'), os.path.join(b, 'z.md')}, {os.path.join(a, 'x.md')}]
+    batches = []
+    stop = threading.Event()
+
+    def on_batch(name, paths):
+        batches.append((name, sorted(os.path.basename(p) for p in paths)))
+        if len(batches) == 2:
+            stop.set()
+
+    watch({'A': a, 'B': b}, on_batch, debounce=0.05, stop=stop, watcher=FakeWatcher(burst))
+    assert sorted(batches) == [('A', ['x.md', 'y.md']), ('B', ['z.md'])]
+
+
+def _collect(w, want, timeout=3.0):
+    seen = set()
+    end = time.monotonic() + timeout
+    while time.monotonic() < end and not want <= seen:
+        seen |= w.poll(0.05)
+    return seen
+
+
+def test_watchers_report_changes(tmp_path):
+    root = tmp_path / 'r'
+    root.mkdir()
+    (root / 'keep.md').write_text('a')
+    (root / 'gone.md').write_text('b')
+    watchers = [PollingWatcher([str(root)], interval=0.05)]
+    if InotifyWatcher.available():
+        watchers.append(InotifyWatcher([str(root)]))
+    (root / 'keep.md').write_text('changed size')
+    (root / 'gone.md').unlink()
+    (root / 'nested').mkdir()
+    (root / 'nested' / 'new.md').write_text('c')
+    real = os.path.realpath(str(root))
+    want = {os.path.join(real, 'keep.md'), os.path.join(real, 'gone.md'), os.path.join(real, 'nested', 'new.md')}
+    for w in watchers:
+        try:
+            assert want <= _collect(w, want), type(w).__name__
+        finally:
+            w.close()
+
+
+def test_cache_loads_never_straddle_a_publish(tmp_path):
+    store = NaiveStore(str(tmp_path), 'idx')
+    cache = IndexCache()
+    with store.publishing() as gen:
+        done = threading.Timer(0.1, lambda: None)
+        calls = []
+
+        def loader(path):
+            calls.append(store.read_generation())
+            return 'value'
+
+        # A load started mid-publish waits for the generation to settle
+        t = threading.Thread(target=lambda: calls.append(cache.get(store.index_dir, loader, kind='x')))
+        t.start()
+        time.sleep(0.1)
+        assert calls == []
+    t.join(2)
+    assert calls == [gen, 'value']
+    # Artifacts from another generation are refused
+    assert cache.get(store.index_dir, loader, kind='x', generation=gen) == 'value'
+    assert cache.get(store.index_dir, loader, kind='x', generation=gen - 2) is None
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from component_registry import ComponentRegistry
+from config_manager import ConfigManager
+from session import Session
+
+
+def _make_session() -> Session:
+    sc = ConfigManager().create_session_config()
+    return Session(sc, ComponentRegistry(sc))
+
+
+def test_reusable_actions_are_shared_per_session():
+    sess = _make_session()
+    pc = sess.get_action('process_contexts')
+    assert sess.get_action('process_contexts') is pc
+    # Nested lookups share the instance too
+    assert pc.token_counter is sess.get_action('count_tokens')
+    assert _make_session().get_action('count_tokens') is not pc.token_counter
+
+    # Stateful actions keep per-call construction
+    assert sess.get_action('assistant_output') is not sess.get_action('assistant_output')
+
+
+def test_reloaded_action_class_replaces_shared_instance():
+    sess = _make_session()
+    first = sess.get_action('count_tokens')
+    sess._registry.forget_actions(['count_tokens'])
+    second = sess.get_action('count_tokens')
+    assert second is not first and type(second) is not type(first)
+    assert sess.get_action('count_tokens') is second
+
+
+class _Provider:
+    def __init__(self):
+        self.calls = 0
+
+    def get_usage(self):
+        self.calls += 1
+        return {}
+
+
+def test_persist_stats_uses_the_current_provider():
+    sess = _make_session()
+    action = sess.get_action('persist_stats')
+    assert action.run() is None  # no provider yet
+    sess.provider = _Provider()
+    assert sess.get_action('persist_stats') is action
+    action.run()
+    assert sess.provider.calls == 1